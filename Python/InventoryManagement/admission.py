@@ -0,0 +1,206 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+
+"""
+Admission control in front of the routes. Nothing here is registered unless it is enabled (ADMISSION_ENABLED).
+
+Every route belongs to a route class, writes or reads (ROUTE_CLASSES), and each class runs at most its limit of
+requests at a time, so a burst of writes queueing on the database lock can not take the threads reads need. A request
+finding its class busy waits in a bounded queue, ordered by priority (cheap lookups before listings and exports) and
+then arrival. It is rejected without waiting when the queue is full (429) or when the wait expected from the queue
+length and recent service times would outlast its deadline (503), and with 503 when its deadline passes while
+waiting. The deadline is ADMISSION_MAX_WAIT_MS, or less when the client sends X-Request-Deadline-Ms. Rejections carry
+Retry-After, the seconds the queue is expected to take to drain.
+
+GET /admission_stats (and the inventory_admission gauge of /metrics) report in flight requests, queue depth and
+admitted/rejected counts per route class.
+"""
+
+WRITE = 'write'
+READ = 'read'
+# rule -> (route class, priority), lower priorities are admitted first. Rules not listed are reads of priority 1
+ROUTE_CLASSES = {
+    '/create_purchase_agreement': (WRITE, 0),
+    '/create_purchase_order': (WRITE, 0),
+    '/allocate_purchase_order': (WRITE, 0),
+    '/create_purchase_orders': (WRITE, 0),
+    '/receive_purchase_order': (WRITE, 0),
+    '/get_purchase_agreement': (READ, 0),
+    '/get_purchase_order': (READ, 0),
+    '/agreements/<int:agreement_id>': (READ, 0),
+    '/orders/<int:order_id>': (READ, 0),
+    '/plants/<int:plant_id>/earliest_order': (READ, 0),
+    '/get_agreement_utilization': (READ, 0),
+    '/get_vendor_open_quantity': (READ, 0),
+}
+# never queued: monitoring has to answer while the service is overloaded
+EXEMPT_PREFIXES = ('/metrics', '/admission_stats', '/cache_stats', '/admin/')
+DEADLINE_HEADER = 'X-Request-Deadline-Ms'
+# weight of the latest request in the average service time of a route class
+SERVICE_TIME_SMOOTHING = 0.1
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message, status, retry_after):
+        self.message = message
+        self.status = status
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+
+class _Waiter:
+    __slots__ = ('admitted', 'cancelled', 'event')
+
+    def __init__(self):
+        self.admitted = False
+        self.cancelled = False
+        self.event = threading.Event()
+
+
+class RouteClass:
+    """
+    Concurrency limit and wait queue of one route class, guarded by the lock of its AdmissionController
+    """
+
+    def __init__(self, name, limit, queue_size):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.waiting = 0
+        # (priority, arrival, _Waiter), cancelled waiters are dropped when they come up
+        self.queue = []
+        self.service_time = 0.0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+
+    def expected_wait(self, waiting):
+        return waiting * self.service_time / self.limit
+
+    def retry_after(self):
+        return max(1, math.ceil(self.expected_wait(self.waiting + 1)))
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'limit': self.limit,
+            'queue_depth': self.waiting,
+            'queue_size': self.queue_size,
+            'service_time_ms': self.service_time * 1000,
+            'admitted': self.admitted,
+            'rejected_queue_full': self.rejected_queue_full,
+            'rejected_deadline': self.rejected_deadline,
+        }
+
+
+class AdmissionController:
+    """
+    Admits requests of route classes: limits and queue_sizes are {route class: value}, max_wait_ms the longest a
+    request waits for a slot
+    """
+
+    def __init__(self, limits, queue_sizes, max_wait_ms):
+        self.route_classes = {
+            name: RouteClass(name, limit, queue_sizes[name]) for name, limit in limits.items()
+        }
+        self.max_wait = max_wait_ms / 1000
+        self._lock = threading.Lock()
+        self._arrivals = itertools.count()
+
+    def acquire(self, route_class, priority=0, deadline_ms=None):
+        """
+        Waits for a slot of route_class, returns the admission time to pass to release() or raises AdmissionRejected
+        """
+        route_class = self.route_classes[route_class]
+        max_wait = self.max_wait if deadline_ms is None else min(self.max_wait, deadline_ms / 1000)
+        with self._lock:
+            if route_class.in_flight < route_class.limit and not route_class.waiting:
+                return self._admit(route_class)
+            if route_class.waiting >= route_class.queue_size:
+                route_class.rejected_queue_full += 1
+                raise AdmissionRejected(
+                    f'{route_class.waiting} {route_class.name} requests are queued already', 429,
+                    route_class.retry_after()
+                )
+            if route_class.expected_wait(route_class.waiting + 1) > max_wait:
+                route_class.rejected_deadline += 1
+                raise AdmissionRejected(
+                    f'{route_class.name} requests would wait longer than {max_wait * 1000:.0f} ms', 503,
+                    route_class.retry_after()
+                )
+            waiter = _Waiter()
+            heapq.heappush(route_class.queue, (priority, next(self._arrivals), waiter))
+            route_class.waiting += 1
+
+        waiter.event.wait(max_wait)
+        with self._lock:
+            if waiter.admitted:
+                return time.perf_counter()
+            waiter.cancelled = True
+            route_class.waiting -= 1
+            route_class.rejected_deadline += 1
+            raise AdmissionRejected(
+                f'{route_class.name} request waited {max_wait * 1000:.0f} ms for a slot', 503, route_class.retry_after()
+            )
+
+    def release(self, route_class, admitted_at):
+        """
+        Frees the slot of a request admitted at admitted_at, handing it to the first waiter in priority order
+        """
+        route_class = self.route_classes[route_class]
+        elapsed = time.perf_counter() - admitted_at
+        with self._lock:
+            route_class.service_time += SERVICE_TIME_SMOOTHING * (elapsed - route_class.service_time)
+            route_class.in_flight -= 1
+            while route_class.queue:
+                _, _, waiter = heapq.heappop(route_class.queue)
+                if waiter.cancelled:
+                    continue
+                route_class.waiting -= 1
+                self._admit(route_class)
+                waiter.admitted = True
+                waiter.event.set()
+                break
+
+    def stats(self):
+        with self._lock:
+            return {name: route_class.stats() for name, route_class in self.route_classes.items()}
+
+    @staticmethod
+    def _admit(route_class):
+        route_class.in_flight += 1
+        route_class.admitted += 1
+        return time.perf_counter()
+
+    def init_app(self, app):
+        """
+        Admits the requests of a Flask app by route class and serves /admission_stats
+        """
+        from flask import Response, g, jsonify, request
+
+        @app.before_request
+        def admit():
+            rule = request.url_rule.rule if request.url_rule else None
+            if rule is None or rule.startswith(EXEMPT_PREFIXES):
+                return None
+            route_class, priority = ROUTE_CLASSES.get(rule, (READ, 1))
+            try:
+                admitted_at = self.acquire(
+                    route_class, priority, request.headers.get(DEADLINE_HEADER, type=float)
+                )
+            except AdmissionRejected as e:
+                return Response(e.message, status=e.status, headers={'Retry-After': str(e.retry_after)})
+            g.admission = (route_class, admitted_at)
+            return None
+
+        @app.teardown_request
+        def release(exception):
+            admission = g.pop('admission', None)
+            if admission:
+                self.release(*admission)
+
+        app.add_url_rule('/admission_stats', 'admission_stats', lambda: jsonify(self.stats()))
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+from admission import READ, WRITE, AdmissionController, AdmissionRejected
+from app import create_app, init_db
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.controller = AdmissionController({WRITE: 1, READ: 1}, {WRITE: 2, READ: 2}, max_wait_ms=2000)
+
+    def _wait_for_queue_depth(self, depth):
+        while self.controller.stats()[WRITE]['queue_depth'] != depth:
+            time.sleep(0.001)
+
+    def test_waiters_admitted_by_priority_until_queue_full(self):
+        admitted_at = self.controller.acquire(WRITE)
+        order = []
+
+        def wait(priority):
+            admitted = self.controller.acquire(WRITE, priority)
+            order.append(priority)
+            self.controller.release(WRITE, admitted)
+
+        threads = []
+        for depth, priority in enumerate((1, 0), start=1):
+            threads.append(threading.Thread(target=wait, args=(priority,)))
+            threads[-1].start()
+            self._wait_for_queue_depth(depth)
+        with self.assertRaises(AdmissionRejected) as rejected:
+            self.controller.acquire(WRITE)
+        self.assertEqual((rejected.exception.status, rejected.exception.retry_after), (429, 1))
+        # the read class is not affected by the writes
+        self.controller.release(READ, self.controller.acquire(READ))
+
+        self.controller.release(WRITE, admitted_at)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, [0, 1])
+        self.assertEqual(self.controller.stats()[WRITE]['rejected_queue_full'], 1)
+
+    def test_rejects_what_would_miss_its_deadline(self):
+        admitted_at = self.controller.acquire(WRITE)
+        self.controller.route_classes[WRITE].service_time = 0.5
+
+        started = time.perf_counter()
+        with self.assertRaises(AdmissionRejected) as rejected:
+            self.controller.acquire(WRITE, deadline_ms=100)
+        # rejected up front, without waiting
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertEqual(rejected.exception.status, 503)
+
+        self.controller.route_classes[WRITE].service_time = 0.0
+        with self.assertRaises(AdmissionRejected):
+            self.controller.acquire(WRITE, deadline_ms=20)
+        self.controller.release(WRITE, admitted_at)
+        self.assertEqual(self.controller.stats()[WRITE], dict(self.controller.stats()[WRITE], in_flight=0, queue_depth=0,
+                                                               rejected_deadline=2))
+
+
+class OverloadTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = create_app({
+            'DATABASE_URL': 'sqlite:///admission_test.db', 'CACHE_ENABLED': False, 'DB_POOL_SIZE': 32,
+            'ADMISSION_ENABLED': True, 'ADMISSION_WRITE_CONCURRENCY': 1, 'ADMISSION_WRITE_QUEUE_SIZE': 4,
+            'ADMISSION_READ_CONCURRENCY': 8, 'ADMISSION_MAX_WAIT_MS': 200,
+        })
+        init_db(self.app)
+
+    def tearDown(self) -> None:
+        self.app.extensions['inventory_session'].remove()
+        self.app.extensions['inventory_engine'].dispose()
+
+        for db_file in ["admission_test.db", "admission_test.db-wal", "admission_test.db-shm"]:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_admitted_latency_bounded_above_capacity(self):
+        client = self.app.test_client()
+        agreement_id = client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2023-12-31', 'quantity': 10 ** 6
+        }).json['agreement_id']
+        order_id = client.post('/create_purchase_order', json={
+            'agreement_id': agreement_id, 'order_date': '2023-02-01', 'quantity': 1
+        }).json['order_id']
+
+        @event.listens_for(self.app.extensions['inventory_engine'], 'before_cursor_execute')
+        def slow_writes(conn, cursor, statement, parameters, context, executemany):
+            # a write holds the database for a while, 12 writers offer far more than 1 slot serves
+            if not statement.lstrip().upper().startswith('SELECT'):
+                time.sleep(0.005)
+
+        def request(index):
+            started = time.perf_counter()
+            if index % 4:
+                response = self.app.test_client().post('/create_purchase_order', json={
+                    'agreement_id': agreement_id, 'order_date': '2023-02-01', 'quantity': 1
+                })
+            else:
+                response = self.app.test_client().post('/get_purchase_order', json={'order_id': order_id})
+            elapsed = time.perf_counter() - started
+            if response.status_code in (429, 503):
+                # a client backing off briefly, still offering several times the write capacity
+                time.sleep(0.01)
+            return index % 4 != 0, response.status_code, response.headers.get('Retry-After'), elapsed
+
+        with ThreadPoolExecutor(16) as executor:
+            results = list(executor.map(request, range(1200)))
+
+        admitted_writes = sorted(elapsed for write, status, _, elapsed in results if write and status == 201)
+        rejected = [(status, retry_after) for write, status, retry_after, _ in results if status in (429, 503)]
+        reads = [status for write, status, _, _ in results if not write]
+        self.assertTrue(rejected)
+        self.assertTrue(all(retry_after for status, retry_after in rejected))
+        self.assertEqual(len(admitted_writes) + len(rejected) + len(reads), len(results))
+        # cheap lookups keep flowing during the write storm
+        self.assertEqual(set(reads), {200})
+        # admitted writes waited at most ADMISSION_MAX_WAIT_MS on top of their own service time
+        p99 = admitted_writes[int(0.99 * len(admitted_writes)) - 1]
+        self.assertLess(p99, 0.2 + 0.3)
+
+        stats = self.app.test_client().get('/admission_stats').json
+        self.assertEqual(stats[WRITE]['rejected_queue_full'] + stats[WRITE]['rejected_deadline'], len(rejected))
+        self.assertEqual(stats[WRITE]['queue_depth'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
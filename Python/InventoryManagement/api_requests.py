@@ -0,0 +1,63 @@
+from datetime import datetime
+
+"""
+Parsing of JSON request bodies shared by the WSGI (app.py) and ASGI (asgi_app.py) apps
+"""
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_optional_date(data, name):
+    return parse_date(data[name]) if data.get(name) else None
+
+
+def parse_purchase_order_request(data):
+    return {
+        'agreement_id': int(data['agreement_id']) if 'agreement_id' in data else None,
+        'vendor_id': int(data['vendor_id']) if 'vendor_id' in data else None,
+        'plant_id': int(data['plant_id']) if 'plant_id' in data else None,
+        'order_date': parse_date(data['order_date']),
+        'quantity': int(data['quantity']),
+    }
+
+
+def parse_purchase_orders_request(data):
+    """
+    Parses a batch create request, returns (batch, batch_indexes, results) where batch holds the parsed items to create,
+    batch_indexes their positions in the request and results the error result of every item that could not be parsed
+    """
+    results, batch, batch_indexes = [None] * len(data['orders']), [], []
+    for index, item in enumerate(data['orders']):
+        try:
+            batch.append(parse_purchase_order_request(item))
+            batch_indexes.append(index)
+        except (KeyError, TypeError, ValueError) as e:
+            results[index] = {'error': f'invalid purchase order request: {e!r}', 'error_type': type(e).__name__}
+    return batch, batch_indexes, results
+
+
+def parse_list_orders_request(data):
+    """
+    InventoryManager.list_orders keyword arguments of a list_purchase_orders request
+    """
+    return {
+        'plant_id': data.get('plant_id'), 'vendor_id': data.get('vendor_id'), 'agreement_id': data.get('agreement_id'),
+        'delivered': data.get('delivered'), 'order_date_from': parse_optional_date(data, 'order_date_from'),
+        'order_date_to': parse_optional_date(data, 'order_date_to'),
+        'delivery_date_from': parse_optional_date(data, 'delivery_date_from'),
+        'delivery_date_to': parse_optional_date(data, 'delivery_date_to'), 'cursor': data.get('cursor'),
+        'limit': int(data.get('limit', 100)),
+    }
+
+
+def parse_list_agreements_request(data):
+    """
+    InventoryManager.list_agreements keyword arguments of a list_purchase_agreements request
+    """
+    return {
+        'plant_id': data.get('plant_id'), 'vendor_id': data.get('vendor_id'),
+        'date_from': parse_optional_date(data, 'date_from'), 'date_to': parse_optional_date(data, 'date_to'),
+        'cursor': data.get('cursor'), 'limit': int(data.get('limit', 100)),
+    }
@@ -1,113 +1,175 @@
-import atexit
-import os
-from datetime import datetime
-
-from flask import Flask, request, jsonify
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-from inventory_manager import InventoryManager
-from models.database import Base
-from models.plant import Plant
-from models.vendor import Vendor
-
-app = Flask(__name__)
-
-# Create the database connection
-engine = create_engine('sqlite:///inventory.db', echo=True)
-# Create tables in the database
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-session = Session()
-
-if not session.query(Plant).filter(Plant.plant_id == 1).first():
-    plant = Plant(plant_id=1, name='Plant A')
-    session.add(plant)
-    session.commit()
-
-if not session.query(Vendor).filter(Vendor.vendor_id == 1).first():
-    vendor = Vendor(vendor_id=1, name='Vendor A')
-    session.add(vendor)
-    session.commit()
-
-inventory_manager = InventoryManager(session)
-
-
-@app.route('/create_purchase_agreement', methods=['POST'])
-def create_purchase_agreement():
-    data = request.json
-    plant_id = int(data['plant_id'])
-    vendor_id = int(data['vendor_id'])
-    start_date = datetime.strptime(data['start'], '%Y-%m-%d').date()
-    end_date = datetime.strptime(data['end'], '%Y-%m-%d').date()
-    quantity = int(data['quantity'])
-    agreement = inventory_manager.create_purchase_agreement(
-        plant_id=plant_id, vendor_id=vendor_id, start=start_date, end=end_date, quantity=quantity
-    )
-    return jsonify(agreement.serialize()), 201
-
-
-@app.route('/create_purchase_order', methods=['POST'])
-def create_purchase_order():
-    data = request.json
-    agreement_id = int(data['agreement_id']) if 'agreement_id' in data else None
-    vendor_id = int(data['vendor_id']) if 'vendor_id' in data else None
-    plant_id = int(data['plant_id']) if 'plant_id' in data else None
-    order_date = datetime.strptime(data['order_date'], '%Y-%m-%d').date()
-    quantity = int(data['quantity'])
-    order = inventory_manager.create_purchase_order(
-        agreement_id=agreement_id, order_date=order_date, vendor_id=vendor_id, plant_id=plant_id, quantity=quantity
-    )
-    return jsonify(order.serialize()), 201
-
-
-@app.route('/receive_purchase_order', methods=['POST'])
-def receive_purchase_order():
-    data = request.json
-    order_id = int(data['order_id'])
-    delivery_date = datetime.strptime(data['delivery_date'], '%Y-%m-%d').date()
-    order = inventory_manager.receive_purchase_order(order_id=order_id, delivery_date=delivery_date)
-    return jsonify(order.serialize()), 201
-
-
-@app.route('/get_purchase_agreement', methods=['POST'])
-def get_purchase_agreement():
-    data = request.json
-    agreement_id = int(data['agreement_id'])
-    agreement = inventory_manager.get_purchase_agreement(agreement_id)
-    if agreement:
-        return jsonify(agreement.serialize()), 200
-    else:
-        return f'Agreement not found for agreement_id: {agreement_id}', 404
-
-
-@app.route('/get_purchase_order', methods=['POST'])
-def get_purchase_order():
-    data = request.json
-    order_id = int(data['order_id']) if 'order_id' in data else None
-    plant_id = int(data['plant_id']) if 'plant_id' in data else None
-    order = None
-    if order_id:
-        order = inventory_manager.get_purchase_order(order_id)
-    else:
-        if plant_id:
-            order = inventory_manager.get_earliest_plant_order(plant_id)
-    if order:
-        return jsonify(order.serialize()), 200
-    else:
-        return f'Order not found for order_id: {order_id} or plant_id: {plant_id}', 404
-
-
-def cleanup():
-    session.close_all()
-    engine.dispose()
-
-    db_file = "inventory.db"
-    if os.path.exists(db_file):
-        os.remove(db_file)
-
-
-atexit.register(cleanup)
+import sys
+
+from config import Config
+
+"""
+Flask app factory. Importing this module is cheap: Flask, SQLAlchemy, the models and the routes are imported by
+create_app(), and optional parts (cache, metrics, profiling) only when enabled. create_app() does not touch the
+database, the schema and reference data are set up once by `python app.py init-db` (or `python manage.py init-db`)
+before serving.
+"""
+
+
+def create_app(config=None):
+    """
+    Creates the Flask app. config is a dict overriding settings of config.Config
+    """
+    from flask import Flask
+    from sqlalchemy.orm import scoped_session, sessionmaker
+
+    from models.database import make_engine_from_config
+    from routes import api
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+
+    admission = None
+    if app.config['ADMISSION_ENABLED']:
+        from admission import READ, WRITE, AdmissionController
+        admission = AdmissionController(
+            {WRITE: app.config['ADMISSION_WRITE_CONCURRENCY'], READ: app.config['ADMISSION_READ_CONCURRENCY']},
+            {WRITE: app.config['ADMISSION_WRITE_QUEUE_SIZE'], READ: app.config['ADMISSION_READ_QUEUE_SIZE']},
+            app.config['ADMISSION_MAX_WAIT_MS']
+        )
+    app.extensions['inventory_admission'] = admission
+
+    metrics = None
+    if app.config['METRICS_ENABLED']:
+        from metrics import Metrics, TimedQueuePool
+        metrics = Metrics()
+    # Create the database connection(s), one per shard when sharded, connections are opened by the first request
+    database_urls = app.config['SHARD_DATABASE_URLS'] or [app.config['DATABASE_URL']]
+    engine_kwargs = {'poolclass': TimedQueuePool} if metrics else {}
+    single_writer = app.config['SINGLE_WRITER_ENABLED']
+    if single_writer:
+        if app.config['SHARD_DATABASE_URLS']:
+            raise ValueError('single writer is not supported with sharded storage')
+        # requests only read, writes go through the writer's connection
+        engine_kwargs['sqlite_query_only'] = True
+    engines = [make_engine_from_config(dict(app.config, DATABASE_URL=url), **engine_kwargs) for url in database_urls]
+    # every request (thread) gets its own session, removed on teardown
+    sessions = [scoped_session(sessionmaker(bind=engine)) for engine in engines]
+    engine, Session = engines[0], sessions[0]
+    app.extensions['inventory_engines'] = engines
+    app.extensions['inventory_sessions'] = sessions
+    app.extensions['inventory_engine'] = engine
+    app.extensions['inventory_session'] = Session
+    app.extensions['inventory_shard_executor'] = None
+    if app.config['SHARD_DATABASE_URLS']:
+        from concurrent.futures import ThreadPoolExecutor
+        app.extensions['inventory_shard_executor'] = ThreadPoolExecutor(
+            app.config['SHARD_FAN_OUT_WORKERS'], thread_name_prefix='shard-fan-out'
+        )
+    app.extensions['inventory_cache'] = None
+    if app.config['CACHE_ENABLED']:
+        from cache import LRUTTLCache
+        app.extensions['inventory_cache'] = LRUTTLCache(
+            max_size=app.config['CACHE_MAX_SIZE'], ttl_seconds=app.config['CACHE_TTL_SECONDS']
+        )
+
+    app.extensions['inventory_agreement_indexes'] = [None] * len(engines)
+    if app.config['AGREEMENT_INDEX_ENABLED']:
+        from interval_index import AgreementIntervalIndex
+        app.extensions['inventory_agreement_indexes'] = [AgreementIntervalIndex() for _ in engines]
+
+    app.extensions['inventory_writer'] = None
+    app.extensions['inventory_writer_engine'] = None
+    if single_writer:
+        from group_commit import GroupCommitWriter
+        writer_engine = make_engine_from_config(
+            dict(app.config, DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0), **({'poolclass': TimedQueuePool} if metrics else {})
+        )
+        app.extensions['inventory_writer_engine'] = writer_engine
+        app.extensions['inventory_writer'] = GroupCommitWriter(
+            sessionmaker(bind=writer_engine),
+            max_delay_ms=app.config['GROUP_COMMIT_MAX_DELAY_MS'] if app.config['GROUP_COMMIT_ENABLED'] else 0,
+            max_batch_size=app.config['GROUP_COMMIT_MAX_BATCH_SIZE'], cache=app.extensions['inventory_cache'],
+            agreement_index=app.extensions['inventory_agreement_indexes'][0],
+            max_queue_size=app.config['SINGLE_WRITER_QUEUE_SIZE'],
+            queue_timeout_ms=app.config['SINGLE_WRITER_QUEUE_TIMEOUT_MS']
+        )
+    elif app.config['GROUP_COMMIT_ENABLED']:
+        if app.config['SHARD_DATABASE_URLS']:
+            raise ValueError('group commit is not supported with sharded storage')
+        from group_commit import GroupCommitWriter
+        app.extensions['inventory_writer'] = GroupCommitWriter(
+            Session.session_factory, max_delay_ms=app.config['GROUP_COMMIT_MAX_DELAY_MS'],
+            max_batch_size=app.config['GROUP_COMMIT_MAX_BATCH_SIZE'], cache=app.extensions['inventory_cache'],
+            agreement_index=app.extensions['inventory_agreement_indexes'][0]
+        )
+
+    if metrics:
+        from metrics import Gauge
+        for shard_engine, shard_session in zip(engines, sessions):
+            metrics.instrument_engine(shard_engine)
+            metrics.instrument_sessions(shard_session.session_factory)
+        if app.extensions['inventory_writer_engine']:
+            metrics.instrument_engine(app.extensions['inventory_writer_engine'])
+        cache = app.extensions['inventory_cache']
+        if cache:
+            metrics.add_collector(Gauge(
+                'inventory_cache', 'Read-through cache counters by stat', lambda: {
+                    (stat,): value for stat, value in cache.stats().items()
+                }, ('stat',)
+            ))
+        if admission:
+            metrics.add_collector(Gauge(
+                'inventory_admission', 'Admission control state and counters by route class', lambda: {
+                    (route_class, stat): value for route_class, stats in admission.stats().items()
+                    for stat, value in stats.items()
+                }, ('route_class', 'stat')
+            ))
+        metrics.init_app(app)
+    app.extensions['inventory_metrics'] = metrics
+    if admission:
+        # after metrics, which times rejected requests too, and before profiling, which profiles admitted ones
+        admission.init_app(app)
+
+    app.extensions['inventory_profiler'] = None
+    if app.config['PROFILING_ENABLED']:
+        from profiling import RequestProfiler
+        profiler = RequestProfiler(
+            app.config['PROFILING_DIRECTORY'], secret=app.config['PROFILING_SECRET'],
+            sample_rate=app.config['PROFILING_SAMPLE_RATE'], slow_ms=app.config['PROFILING_SLOW_MS'],
+            max_profiles=app.config['PROFILING_MAX_PROFILES'],
+            sample_interval_ms=app.config['PROFILING_SAMPLE_INTERVAL_MS']
+        )
+        for shard_engine in engines:
+            profiler.instrument_engine(shard_engine)
+        profiler.init_app(app)
+        app.extensions['inventory_profiler'] = profiler
+
+    app.register_blueprint(api)
+    app.teardown_appcontext(lambda exception: [shard_session.remove() for shard_session in sessions])
+    return app
+
+
+def init_db(app):
+    """
+    Creates/migrates the schema of the app database (every shard database when sharded) and inserts the reference
+    data, returns the migrations applied
+    """
+    if app.config['SHARD_DATABASE_URLS']:
+        import sharding
+        return sharding.init_shards(app.extensions['inventory_engines'])
+
+    import migrations
+    # request connections are read-only with a single writer
+    return migrations.init_db(app.extensions['inventory_writer_engine'] or app.extensions['inventory_engine'])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    app = create_app()
+    if argv[:1] == ['init-db']:
+        applied = init_db(app)
+        database_urls = app.config['SHARD_DATABASE_URLS'] or [app.config['DATABASE_URL']]
+        print(f'Initialized {", ".join(database_urls)}' + (f', applied {", ".join(applied)}' if applied else ''))
+        return
+    app.run(host=app.config['HOST'], port=app.config['PORT'])
+
 
 if __name__ == '__main__':
-    app.run()
+    main()
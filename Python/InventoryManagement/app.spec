@@ -9,7 +9,12 @@ a = Analysis(
     pathex=['venv/lib/python3.10/site-packages'],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # create_app() imports these lazily, the SQLite dialect and optional encoders are loaded dynamically
+    hiddenimports=[
+        'routes', 'cache', 'metrics', 'migrations', 'rollups', 'serializers', 'group_commit', 'sharding',
+        'interval_index', 'profiling',
+        'sqlalchemy.dialects.sqlite', 'orjson', 'msgpack',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
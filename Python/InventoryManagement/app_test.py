@@ -0,0 +1,287 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import msgpack
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, init_db
+
+
+class AppTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = create_app({'DATABASE_URL': 'sqlite:///app_test.db', 'DB_POOL_SIZE': 8, 'CACHE_ENABLED': False})
+        init_db(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self) -> None:
+        self.app.extensions['inventory_session'].remove()
+        self.app.extensions['inventory_engine'].dispose()
+
+        for db_file in ["app_test.db", "app_test.db-wal", "app_test.db-shm"]:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_sqlite_pragmas(self):
+        with self.app.extensions['inventory_engine'].connect() as connection:
+            self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+            self.assertEqual(connection.exec_driver_sql('PRAGMA busy_timeout').scalar(), 5000)
+
+    def test_export_orders(self):
+        agreement = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        }).json
+        orders = [self.client.post('/create_purchase_order', json=order).json for order in [
+            {'agreement_id': agreement['agreement_id'], 'order_date': '2023-02-01', 'quantity': 100},
+            {'vendor_id': 1, 'plant_id': 1, 'order_date': '2023-03-01', 'quantity': 50},
+            {'vendor_id': 1, 'plant_id': 1, 'order_date': '2023-04-01', 'quantity': 25},
+        ]]
+        self.client.post('/receive_purchase_order', json={'order_id': orders[1]['order_id'],
+                                                          'delivery_date': '2023-03-05'})
+
+        response = self.client.get('/export/orders?plant_id=1&delivered=false')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        exported = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(exported, [orders[0], orders[2]])
+
+        response = self.client.get('/export/orders?format=csv&order_date_from=2023-03-01&order_date_to=2023-03-31')
+        self.assertEqual(response.get_data(as_text=True).splitlines(), [
+            'order_id,agreement_id,vendor_id,plant_id,order_date,delivery_date,quantity',
+            f'{orders[1]["order_id"]},,1,1,2023-03-01,2023-03-05,50',
+        ])
+
+        response = self.client.get('/export/agreements?vendor_id=1&date_from=2023-12-31')
+        self.assertEqual([json.loads(line)['agreement_id'] for line in response.get_data(as_text=True).splitlines()],
+                         [agreement['agreement_id']])
+        self.assertEqual(self.client.get('/export/orders?order_date_from=01-01-2023').status_code, 400)
+
+    def test_msgpack_response(self):
+        agreement = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        }).json
+
+        response = self.client.post('/list_purchase_agreements', json={'plant_id': 1},
+                                    headers={'Accept': 'application/msgpack'})
+        self.assertEqual(response.mimetype, 'application/msgpack')
+        listed = msgpack.unpackb(response.data)['agreements']
+        self.assertEqual([(row['agreement_id'], row['agreement_start']) for row in listed],
+                         [(agreement['agreement_id'], '2023-01-01')])
+
+        response = self.client.post('/get_purchase_agreement', json={'agreement_id': agreement['agreement_id']},
+                                    headers={'Accept': 'application/json, application/msgpack;q=0.5'})
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.json, agreement)
+
+    def test_allocate_purchase_order(self):
+        agreements = [self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': end, 'quantity': 100
+        }).json for end in ('2023-12-31', '2023-06-30')]
+
+        order = self.client.post('/create_purchase_order', json={
+            'plant_id': 1, 'vendor_id': 1, 'order_date': '2023-02-01', 'quantity': 60,
+            'allocation_policy': 'earliest_expiring'
+        }).json
+        self.assertEqual(order['agreement_id'], agreements[1]['agreement_id'])
+
+        orders = self.client.post('/allocate_purchase_order', json={
+            'plant_id': 1, 'vendor_id': 1, 'order_date': '2023-02-01', 'quantity': 100, 'allocation_policy': 'split'
+        }).json['orders']
+        self.assertEqual([(order['agreement_id'], order['quantity']) for order in orders],
+                         [(agreements[1]['agreement_id'], 40), (agreements[0]['agreement_id'], 60)])
+
+    def test_conditional_get(self):
+        agreement = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2023-12-31', 'quantity': 100
+        }).json
+        order = self.client.post('/create_purchase_order', json={
+            'agreement_id': agreement['agreement_id'], 'order_date': '2023-02-01', 'quantity': 10
+        }).json
+
+        response = self.client.get(f'/orders/{order["order_id"]}')
+        self.assertEqual((response.status_code, response.json), (200, order))
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(f'/orders/{order["order_id"]}', headers={'If-None-Match': etag}).status_code,
+                         304)
+        # the msgpack representation has an ETag of its own
+        msgpack_etag = self.client.get(f'/orders/{order["order_id"]}', headers={
+            'Accept': 'application/msgpack'
+        }).headers['ETag']
+        self.assertNotEqual(msgpack_etag, etag)
+
+        self.assertEqual(self.client.get('/plants/1/earliest_order').status_code, 404)
+        self.client.post('/receive_purchase_order', json={'order_id': order['order_id'], 'delivery_date': '2023-03-01'})
+        response = self.client.get(f'/orders/{order["order_id"]}', headers={'If-None-Match': etag})
+        self.assertEqual((response.status_code, response.json['delivery_date']), (200, '2023-03-01'))
+        self.assertNotEqual(response.headers['ETag'], etag)
+        earliest = self.client.get('/plants/1/earliest_order')
+        self.assertEqual(earliest.json['order_id'], order['order_id'])
+        self.assertEqual(self.client.get('/plants/1/earliest_order', headers={
+            'If-None-Match': earliest.headers['ETag']
+        }).status_code, 304)
+
+        # the order bumped the version of its agreement
+        agreement_etag = self.client.get(f'/agreements/{agreement["agreement_id"]}').headers['ETag']
+        self.assertIn('-2-', agreement_etag)
+        self.assertEqual(self.client.get('/agreements/999').status_code, 404)
+
+    def test_requests_use_their_own_sessions(self):
+        response = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        })
+        self.assertEqual(response.status_code, 201)
+        agreement_id = response.json['agreement_id']
+
+        sessions = set()
+
+        @event.listens_for(self.app.extensions['inventory_engine'], 'before_cursor_execute')
+        def simulate_network_latency(conn, cursor, statement, parameters, context, executemany):
+            # stands in for a database server round trip, during which other requests are free to run
+            time.sleep(0.005)
+
+        @event.listens_for(self.app.extensions['inventory_session'].session_factory, 'after_begin')
+        def record_session(session, transaction, connection):
+            sessions.add(id(session))
+
+        def get_agreements(requests):
+            client = self.app.test_client()
+            for _ in range(requests):
+                self.assertEqual(
+                    client.post('/get_purchase_agreement', json={'agreement_id': agreement_id}).status_code, 200
+                )
+
+        def throughput(threads, requests=40):
+            started = time.perf_counter()
+            with ThreadPoolExecutor(threads) as executor:
+                list(executor.map(get_agreements, [requests // threads] * threads))
+            return requests / (time.perf_counter() - started)
+
+        single_thread, four_threads = throughput(1), throughput(4)
+        # with one shared session requests would be serialized (or corrupt each other) instead of overlapping
+        self.assertGreater(four_threads, 2 * single_thread)
+        self.assertGreater(len(sessions), 1)
+
+
+class SingleWriterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = create_app({'DATABASE_URL': 'sqlite:///single_writer_test.db', 'SINGLE_WRITER_ENABLED': True})
+        init_db(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self) -> None:
+        self.app.extensions['inventory_writer'].close()
+        self.app.extensions['inventory_session'].remove()
+        self.app.extensions['inventory_engine'].dispose()
+        self.app.extensions['inventory_writer_engine'].dispose()
+
+        for db_file in ["single_writer_test.db", "single_writer_test.db-wal", "single_writer_test.db-shm"]:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_requests_read_through_read_only_connections(self):
+        with self.app.extensions['inventory_engine'].connect() as connection:
+            self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+            with self.assertRaises(OperationalError):
+                connection.exec_driver_sql('DELETE FROM agreement')
+
+        agreement = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2023-12-31', 'quantity': 100
+        })
+        self.assertEqual(agreement.status_code, 201)
+        orders = self.client.post('/allocate_purchase_order', json={
+            'plant_id': 1, 'vendor_id': 1, 'order_date': '2023-02-01', 'quantity': 40
+        })
+        self.assertEqual(orders.status_code, 201)
+        utilization = self.client.post(
+            '/get_agreement_utilization', json={'agreement_id': agreement.json['agreement_id']},
+            headers={'X-Read-Your-Writes': '1'}
+        )
+        self.assertEqual(utilization.json['ordered_quantity'], 40)
+
+    def test_mixed_reads_and_writes_without_lock_errors(self):
+        agreement_id = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2023-12-31', 'quantity': 100000
+        }).json['agreement_id']
+
+        def request(index):
+            client = self.app.test_client()
+            if index % 2:
+                return client.post('/create_purchase_order', json={
+                    'agreement_id': agreement_id, 'order_date': '2023-02-01', 'quantity': 1
+                }).status_code
+            return client.post('/get_agreement_utilization', json={'agreement_id': agreement_id}).status_code
+
+        with ThreadPoolExecutor(8) as executor:
+            statuses = list(executor.map(request, range(200)))
+
+        self.assertEqual(sorted(set(statuses)), [200, 201])
+        self.assertEqual(self.client.post('/get_agreement_utilization', json={'agreement_id': agreement_id}).json[
+                             'ordered_quantity'], 100)
+
+
+class MetricsTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        self.app.extensions['inventory_session'].remove()
+        self.app.extensions['inventory_engine'].dispose()
+
+        for db_file in ["metrics_test.db", "metrics_test.db-wal", "metrics_test.db-shm"]:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_metrics_endpoint(self):
+        self.app = create_app({'DATABASE_URL': 'sqlite:///metrics_test.db', 'METRICS_ENABLED': True})
+        init_db(self.app)
+        client = self.app.test_client()
+        agreement = client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        }).json
+        client.post('/get_purchase_agreement', json={'agreement_id': agreement['agreement_id']})
+
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.get_data(as_text=True)
+        self.assertIn(
+            'inventory_http_requests_total{route="/create_purchase_agreement",method="POST",status="201"} 1', text
+        )
+        self.assertIn(
+            'inventory_http_request_duration_seconds_count{route="/get_purchase_agreement",method="POST"} 1', text
+        )
+        self.assertIn('inventory_sql_statements_per_request_count{route="/create_purchase_agreement"} 1', text)
+        self.assertIn('inventory_db_session_commit_seconds_count 1', text)
+        self.assertIn('inventory_db_pool_checkout_wait_seconds_count', text)
+        self.assertIn('inventory_cache{stat="hits"} 1', text)
+
+    def test_metrics_disabled(self):
+        self.app = create_app({'DATABASE_URL': 'sqlite:///metrics_test.db'})
+        init_db(self.app)
+        self.assertEqual(self.app.test_client().get('/metrics').status_code, 404)
+
+
+class AppFactoryTest(unittest.TestCase):
+    def tearDown(self) -> None:
+        if os.path.exists('factory_test.db'):
+            os.remove('factory_test.db')
+
+    def test_import_is_lazy(self):
+        imported = subprocess.run(
+            [sys.executable, '-c', 'import sys, app; print(sorted({"flask", "sqlalchemy"} & set(sys.modules)))'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        self.assertEqual(imported, '[]')
+
+    def test_create_app_does_not_touch_database(self):
+        app = create_app({'DATABASE_URL': 'sqlite:///factory_test.db'})
+        self.assertFalse(os.path.exists('factory_test.db'))
+
+        init_db(app)
+        self.assertEqual(app.test_client().post('/get_vendor_open_quantity', json={'vendor_id': 1}).status_code, 200)
+        app.extensions['inventory_session'].remove()
+        app.extensions['inventory_engine'].dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
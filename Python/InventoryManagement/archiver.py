@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+
+from sqlalchemy import delete, exists, func, insert, literal, select
+
+from models.agreement import Agreement
+from models.archived_agreement import ArchivedAgreement
+from models.archived_order import ArchivedOrder
+from models.order import Order
+
+"""
+Moves delivered orders and closed agreements older than a retention window out of the order and agreement tables
+into archived_order and archived_agreement, so the tables every request reads stay as small as the open business.
+
+Rows are moved in batches of ids, each batch in a short transaction of its own (copy, then delete what was copied),
+so writers wait for one batch at most instead of the whole run. Conditions are checked again within the batch
+transaction, an order received again or ordered against in the meantime stays where it is.
+
+What is derived from archived rows stays where it was: agreement.consumed_quantity, the rollup tables and
+plant_earliest_delivery keep counting them, rollups.rebuild() and InventoryManager read both tables, and
+InventoryManager.get_purchase_order/get_purchase_agreement fall back to the archive.
+
+The row with the highest id of each table is never archived: SQLite hands out max(id) + 1 to new rows, archiving the
+newest row would hand its id out again (and agreement_index expects agreement ids to only grow).
+"""
+
+
+def archive(engine, older_than_days, batch_size=1000, today=None):
+    """
+    Archives orders delivered and agreements ended more than older_than_days before today, returns (archived orders,
+    archived agreements)
+    """
+    today = today or date.today()
+    cutoff = today - timedelta(days=older_than_days)
+    orders = archive_orders(engine, cutoff, batch_size, today)
+    # agreements after orders, an agreement is archived once none of its orders is left in the order table
+    return orders, archive_agreements(engine, cutoff, batch_size, today)
+
+
+def archive_orders(engine, cutoff, batch_size=1000, today=None):
+    """
+    Moves orders delivered before cutoff to archived_order, returns how many were moved
+    """
+    order = Order.__table__
+    return _move(
+        engine, order, ArchivedOrder.__table__, order.c.order_id,
+        [order.c.delivery_date != None, order.c.delivery_date < cutoff], batch_size, today or date.today()
+    )
+
+
+def archive_agreements(engine, cutoff, batch_size=1000, today=None):
+    """
+    Moves agreements that ended before cutoff and have no orders left in the order table to archived_agreement,
+    returns how many were moved
+    """
+    agreement, order = Agreement.__table__, Order.__table__
+    return _move(
+        engine, agreement, ArchivedAgreement.__table__, agreement.c.agreement_id,
+        [agreement.c.agreement_end < cutoff, ~exists().where(order.c.agreement_id == agreement.c.agreement_id)],
+        batch_size, today or date.today()
+    )
+
+
+def _move(engine, table, archive_table, key, criteria, batch_size, today):
+    with engine.connect() as connection:
+        newest_id = connection.execute(select(func.max(key))).scalar()
+    if newest_id is None:
+        return 0
+
+    columns = [column for column in table.columns if column.name in archive_table.columns]
+    moved, after_id = 0, 0
+    while True:
+        with engine.begin() as connection:
+            ids = connection.execute(select(key).where(
+                key > after_id, key < newest_id, *criteria
+            ).order_by(key).limit(batch_size)).scalars().all()
+            if not ids:
+                return moved
+            batch_criteria = [key.in_(ids), *criteria]
+            connection.execute(insert(archive_table).from_select(
+                [column.name for column in columns] + ['archived_date'],
+                select(*columns, literal(today, archive_table.c.archived_date.type)).where(*batch_criteria)
+            ))
+            moved += connection.execute(delete(table).where(*batch_criteria)).rowcount
+        after_id = ids[-1]
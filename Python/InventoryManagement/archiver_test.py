@@ -0,0 +1,111 @@
+import os
+import unittest
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+import archiver
+import migrations
+import rollups
+from inventory_manager import InventoryManager
+from models.agreement import Agreement
+from models.archived_order import ArchivedOrder
+from models.database import make_engine
+from models.order import Order
+
+
+class ArchiverTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = make_engine('sqlite:///archiver_test.db', sqlite_journal_mode='WAL')
+        migrations.init_db(self.engine)
+        self.session = sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self.inventory_manager = InventoryManager(self.session)
+        self.today = date(2024, 6, 1)
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+
+        for db_file in ('archiver_test.db', 'archiver_test.db-wal', 'archiver_test.db-shm'):
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_archive_moves_old_delivered_orders_and_closed_agreements(self):
+        old_agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=1, vendor_id=1, start=date(2022, 1, 1), end=date(2022, 12, 31), quantity=1000
+        )
+        open_agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=1, vendor_id=1, start=date(2022, 1, 1), end=date(2022, 12, 31), quantity=1000
+        )
+        current_agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=1, vendor_id=1, start=date(2024, 1, 1), end=date(2024, 12, 31), quantity=1000
+        )
+        earliest = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date(2022, 2, 1), agreement_id=old_agreement.agreement_id
+        )
+        old_standalone = self.inventory_manager.create_purchase_order(
+            quantity=20, order_date=date(2022, 3, 1), vendor_id=1, plant_id=1
+        )
+        not_received = self.inventory_manager.create_purchase_order(
+            quantity=30, order_date=date(2022, 3, 1), agreement_id=open_agreement.agreement_id
+        )
+        recent = self.inventory_manager.create_purchase_order(
+            quantity=40, order_date=date(2024, 2, 1), agreement_id=current_agreement.agreement_id
+        )
+        self.inventory_manager.receive_purchase_order(earliest.order_id, delivery_date=date(2022, 2, 10))
+        self.inventory_manager.receive_purchase_order(old_standalone.order_id, delivery_date=date(2022, 3, 10))
+        self.inventory_manager.receive_purchase_order(recent.order_id, delivery_date=date(2024, 2, 10))
+        # the newest order, never archived
+        newest = self.inventory_manager.create_purchase_order(
+            quantity=1, order_date=date(2022, 3, 1), vendor_id=1, plant_id=1
+        )
+        self.inventory_manager.receive_purchase_order(newest.order_id, delivery_date=date(2022, 3, 2))
+        self.session.close()
+
+        self.assertEqual(archiver.archive(self.engine, older_than_days=365, batch_size=1, today=self.today), (2, 1))
+
+        with self.engine.connect() as connection:
+            hot_orders = connection.execute(select(Order.order_id).order_by(Order.order_id)).scalars().all()
+            hot_agreements = connection.execute(select(Agreement.agreement_id)).scalars().all()
+            self.assertEqual(rollups.check_consistency(connection), [])
+        self.assertEqual(hot_orders, [not_received.order_id, recent.order_id, newest.order_id])
+        self.assertEqual(sorted(hot_agreements), [open_agreement.agreement_id, current_agreement.agreement_id])
+
+        # reads fall back to the archive
+        self.assertEqual(self.inventory_manager.get_purchase_order(earliest.order_id).serialize(), {
+            'order_id': earliest.order_id, 'agreement_id': old_agreement.agreement_id, 'vendor_id': 1,
+            'plant_id': 1, 'order_date': '2022-02-01', 'delivery_date': '2022-02-10', 'quantity': 100
+        })
+        self.assertEqual(self.inventory_manager.get_purchase_agreement(old_agreement.agreement_id).agreement_id,
+                         old_agreement.agreement_id)
+        self.assertEqual(self.inventory_manager.get_earliest_plant_order(1).order_id, earliest.order_id)
+        self.assertEqual(self.inventory_manager.get_agreement_utilization(old_agreement.agreement_id)[
+                             'ordered_quantity'], 100)
+
+        # nothing left to archive
+        self.assertEqual(archiver.archive(self.engine, older_than_days=365, today=self.today), (0, 0))
+
+    def test_earliest_plant_order_recomputed_from_archive(self):
+        archived = self.inventory_manager.create_purchase_order(
+            quantity=10, order_date=date(2022, 1, 1), vendor_id=1, plant_id=1
+        )
+        # the newest order stays in the order table
+        newest = self.inventory_manager.create_purchase_order(
+            quantity=10, order_date=date(2022, 1, 1), vendor_id=1, plant_id=1
+        )
+        self.inventory_manager.receive_purchase_order(archived.order_id, delivery_date=date(2022, 1, 20))
+        self.inventory_manager.receive_purchase_order(newest.order_id, delivery_date=date(2022, 1, 10))
+        self.session.close()
+        self.assertEqual(archiver.archive_orders(self.engine, cutoff=date(2023, 1, 1)), 1)
+
+        # received again after the archived order, which is the earliest now
+        self.inventory_manager.receive_purchase_order(newest.order_id, delivery_date=date(2022, 1, 25))
+        self.assertEqual(self.inventory_manager.get_earliest_plant_order(1).order_id, archived.order_id)
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(select(func.count()).select_from(ArchivedOrder)).scalar(), 1)
+            self.assertEqual(rollups.check_consistency(connection), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
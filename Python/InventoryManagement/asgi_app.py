@@ -0,0 +1,318 @@
+import json
+import re
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from api_requests import parse_date, parse_list_agreements_request, parse_list_orders_request, parse_optional_date, \
+    parse_purchase_order_request, parse_purchase_orders_request
+from async_inventory_manager import AsyncInventoryManager
+from config import Config
+from inventory_manager import InvalidListRequestException, PlantNotFoundException, PurchaseAgreementNotFound, \
+    PurchaseOrderNotFound
+from models.database import make_async_engine, make_engine_from_config
+from serializers import encode, etag, negotiate
+
+"""
+ASGI app serving the inventory routes of the Flask app in app.py, with the same JSON shapes, from an event loop, backed
+by AsyncInventoryManager: the POST routes and the conditional GET resources (ETag/If-None-Match). The streaming
+/export routes, the writer (group commit/single writer) and the optional extras of app.py (cache, metrics, admission
+control, profiling, admin routes) are Flask only. Run it with any ASGI server, e.g. `uvicorn asgi_app:app`
+"""
+
+
+class InventoryASGIApp:
+
+    def __init__(self, config=None):
+        self.config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+        if config:
+            self.config.update(config)
+        self.engine = make_engine_from_config(self.config, engine_factory=make_async_engine)
+        self.Session = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+        self.routes = {
+            '/create_purchase_agreement': self.create_purchase_agreement,
+            '/create_purchase_order': self.create_purchase_order,
+            '/allocate_purchase_order': self.allocate_purchase_order,
+            '/create_purchase_orders': self.create_purchase_orders,
+            '/receive_purchase_order': self.receive_purchase_order,
+            '/get_purchase_agreement': self.get_purchase_agreement,
+            '/get_purchase_order': self.get_purchase_order,
+            '/list_purchase_orders': self.list_purchase_orders,
+            '/list_purchase_agreements': self.list_purchase_agreements,
+            '/get_plant_daily_deliveries': self.get_plant_daily_deliveries,
+            '/get_vendor_open_quantity': self.get_vendor_open_quantity,
+            '/get_agreement_utilization': self.get_agreement_utilization,
+        }
+        # GET resources, path pattern -> handler(inventory_manager, id in the path, If-None-Match ETags, mimetype)
+        self.resources = [
+            (re.compile(r'/agreements/(\d+)'), self.get_agreement),
+            (re.compile(r'/orders/(\d+)'), self.get_order),
+            (re.compile(r'/plants/(\d+)/earliest_order'), self.get_plant_earliest_order),
+        ]
+
+    def init_db(self):
+        """
+        One-time schema setup and seeding of the app database (migrations.init_db), run before serving
+        """
+        import migrations
+
+        engine = make_engine_from_config(self.config)
+        try:
+            return migrations.init_db(engine)
+        finally:
+            engine.dispose()
+
+    async def shutdown(self):
+        await self.engine.dispose()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        headers = dict(scope.get('headers', ()))
+        mimetype = negotiate(headers.get(b'accept', b'').decode('latin-1'))
+        handler, entity_id = self._resource(scope['path'])
+        if handler:
+            if scope['method'] != 'GET':
+                await _respond(send, 405, 'Method Not Allowed')
+                return
+            try:
+                async with self.Session() as session:
+                    status, payload, resource_etag = await handler(
+                        AsyncInventoryManager(session), entity_id,
+                        _if_none_match(headers.get(b'if-none-match', b'').decode('latin-1')), mimetype
+                    )
+            except Exception:
+                status, payload, resource_etag = 500, 'Internal Server Error', None
+            await _respond(send, status, payload, mimetype, _resource_headers(resource_etag))
+            return
+
+        handler = self.routes.get(scope['path'])
+        if not handler:
+            await _respond(send, 404, 'Not Found')
+            return
+        if scope['method'] != 'POST':
+            await _respond(send, 405, 'Method Not Allowed')
+            return
+
+        try:
+            data = json.loads(await _read_body(receive))
+        except json.JSONDecodeError:
+            # like Flask's request.json
+            await _respond(send, 400, 'Bad Request')
+            return
+        try:
+            async with self.Session() as session:
+                status, payload = await handler(AsyncInventoryManager(session), data)
+        except Exception:
+            status, payload = 500, 'Internal Server Error'
+        await _respond(send, status, payload, mimetype)
+
+    def _resource(self, path):
+        for pattern, handler in self.resources:
+            match = pattern.fullmatch(path)
+            if match:
+                return handler, int(match.group(1))
+        return None, None
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def create_purchase_agreement(inventory_manager, data):
+        agreement = await inventory_manager.create_purchase_agreement(
+            plant_id=int(data['plant_id']), vendor_id=int(data['vendor_id']), start=parse_date(data['start']),
+            end=parse_date(data['end']), quantity=int(data['quantity'])
+        )
+        return 201, agreement.serialize()
+
+    @staticmethod
+    async def create_purchase_order(inventory_manager, data):
+        order_request = parse_purchase_order_request(data)
+        if 'allocation_policy' in data:
+            order_request['allocation_policy'] = data['allocation_policy']
+        order = await inventory_manager.create_purchase_order(**order_request)
+        return 201, order.serialize()
+
+    @staticmethod
+    async def allocate_purchase_order(inventory_manager, data):
+        orders = await inventory_manager.allocate_purchase_order(
+            quantity=int(data['quantity']), plant_id=int(data['plant_id']), vendor_id=int(data['vendor_id']),
+            order_date=parse_date(data['order_date']),
+            allocation_policy=data.get('allocation_policy', 'earliest_expiring')
+        )
+        return 201, {'orders': [order.serialize() for order in orders]}
+
+    @staticmethod
+    async def create_purchase_orders(inventory_manager, data):
+        batch, batch_indexes, results = parse_purchase_orders_request(data)
+        for index, result in zip(batch_indexes, await inventory_manager.create_purchase_orders(batch)):
+            results[index] = result
+        return 201 if all('order' in result for result in results) else 207, {'results': results}
+
+    @staticmethod
+    async def receive_purchase_order(inventory_manager, data):
+        order = await inventory_manager.receive_purchase_order(
+            order_id=int(data['order_id']), delivery_date=parse_date(data['delivery_date'])
+        )
+        return 201, order.serialize()
+
+    @staticmethod
+    async def get_purchase_agreement(inventory_manager, data):
+        agreement_id = int(data['agreement_id'])
+        agreement = await inventory_manager.get_purchase_agreement(agreement_id)
+        if agreement:
+            return 200, agreement.serialize()
+        return 404, f'Agreement not found for agreement_id: {agreement_id}'
+
+    @staticmethod
+    async def get_purchase_order(inventory_manager, data):
+        order_id = int(data['order_id']) if 'order_id' in data else None
+        plant_id = int(data['plant_id']) if 'plant_id' in data else None
+        order = None
+        if order_id:
+            order = await inventory_manager.get_purchase_order(order_id)
+        elif plant_id:
+            order = await inventory_manager.get_earliest_plant_order(plant_id)
+        if order:
+            return 200, order.serialize()
+        return 404, f'Order not found for order_id: {order_id} or plant_id: {plant_id}'
+
+    @staticmethod
+    async def list_purchase_orders(inventory_manager, data):
+        try:
+            orders, next_cursor = await inventory_manager.list_orders(**parse_list_orders_request(data))
+        except InvalidListRequestException as e:
+            return 400, e.message
+        return 200, {'orders': orders, 'next_cursor': next_cursor}
+
+    @staticmethod
+    async def list_purchase_agreements(inventory_manager, data):
+        try:
+            agreements, next_cursor = await inventory_manager.list_agreements(**parse_list_agreements_request(data))
+        except InvalidListRequestException as e:
+            return 400, e.message
+        return 200, {'agreements': agreements, 'next_cursor': next_cursor}
+
+    @staticmethod
+    async def get_plant_daily_deliveries(inventory_manager, data):
+        deliveries = await inventory_manager.get_plant_daily_deliveries(
+            int(data['plant_id']), date_from=parse_optional_date(data, 'date_from'),
+            date_to=parse_optional_date(data, 'date_to')
+        )
+        return 200, {'deliveries': deliveries}
+
+    @staticmethod
+    async def get_vendor_open_quantity(inventory_manager, data):
+        return 200, await inventory_manager.get_vendor_open_quantity(int(data['vendor_id']))
+
+    @staticmethod
+    async def get_agreement_utilization(inventory_manager, data):
+        agreement_id = int(data['agreement_id'])
+        try:
+            return 200, await inventory_manager.get_agreement_utilization(agreement_id)
+        except PurchaseAgreementNotFound:
+            return 404, f'Agreement not found for agreement_id: {agreement_id}'
+
+    @staticmethod
+    async def get_agreement(inventory_manager, agreement_id, if_none_match, mimetype):
+        async def version_key():
+            return 'agreement', agreement_id, await inventory_manager.get_purchase_agreement_version(agreement_id)
+
+        async def load():
+            agreement = await inventory_manager.get_purchase_agreement(agreement_id)
+            return ('agreement', agreement_id, agreement.version), agreement.serialize()
+
+        try:
+            return await _conditional_get(version_key, load, if_none_match, mimetype)
+        except PurchaseAgreementNotFound:
+            return 404, f'Agreement not found for agreement_id: {agreement_id}', None
+
+    @staticmethod
+    async def get_order(inventory_manager, order_id, if_none_match, mimetype):
+        async def version_key():
+            return 'order', order_id, await inventory_manager.get_purchase_order_version(order_id)
+
+        async def load():
+            order = await inventory_manager.get_purchase_order(order_id)
+            return ('order', order_id, order.version), order.serialize()
+
+        try:
+            return await _conditional_get(version_key, load, if_none_match, mimetype)
+        except PurchaseOrderNotFound:
+            return 404, f'Order not found for order_id: {order_id}', None
+
+    @staticmethod
+    async def get_plant_earliest_order(inventory_manager, plant_id, if_none_match, mimetype):
+        async def version_key():
+            return ('plant', plant_id, 'order', *await inventory_manager.get_earliest_plant_order_version(plant_id))
+
+        async def load():
+            order = await inventory_manager.get_earliest_plant_order(plant_id)
+            return ('plant', plant_id, 'order', order.order_id, order.version), order.serialize()
+
+        try:
+            return await _conditional_get(version_key, load, if_none_match, mimetype)
+        except PlantNotFoundException:
+            return 404, f'Order not found for plant_id: {plant_id}', None
+
+
+async def _conditional_get(version_key, load, if_none_match, mimetype):
+    """
+    (status, payload, ETag) of a versioned GET resource, like routes._conditional_get: a 304 without loading the
+    resource when if_none_match has the ETag of the parts await version_key() returns, otherwise await load() returns
+    (ETag parts, serialized resource) read together
+    """
+    key = await version_key()
+    if '*' in if_none_match or etag(key, mimetype) in if_none_match:
+        return 304, None, etag(key, mimetype)
+    key, payload = await load()
+    return 200, payload, etag(key, mimetype)
+
+
+def _if_none_match(header):
+    """
+    Strong ETags of an If-None-Match header value, the ones a GET is compared with (as in Flask)
+    """
+    tags = (tag.strip() for tag in header.split(','))
+    return {'*' if tag == '*' else tag.strip('"') for tag in tags if tag and not tag.startswith('W/')}
+
+
+def _resource_headers(resource_etag):
+    if resource_etag is None:
+        return []
+    # representations differ by Accept, clients and caches revalidate before reusing them
+    return [(b'etag', f'"{resource_etag}"'.encode()), (b'vary', b'Accept'), (b'cache-control', b'no-cache')]
+
+
+async def _read_body(receive):
+    body, more_body = b'', True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return body
+
+
+async def _respond(send, status, payload, mimetype=None, headers=()):
+    if payload is None:
+        body, headers = b'', list(headers)
+    else:
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), b'text/html; charset=utf-8'
+        else:
+            body, content_type = encode(payload, mimetype), mimetype.encode()
+        headers = [(b'content-type', content_type), (b'content-length', str(len(body)).encode()), *headers]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = InventoryASGIApp()
@@ -0,0 +1,81 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from inventory_manager import InventoryManager
+from models.agreement import Agreement
+from models.order import Order
+
+"""
+asyncio counterpart of InventoryManager for serving requests from an event loop. Each method runs the InventoryManager
+business logic on the sync view of an AsyncSession (AsyncSession.run_sync), so all database IO, including lazy loads,
+is awaited on the async driver (aiosqlite for SQLite) instead of blocking the loop, and both managers share one
+implementation of the business rules. The AsyncSession needs expire_on_commit=False so returned objects can be
+serialized outside of the session.
+"""
+
+
+class AsyncInventoryManager:
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create_purchase_agreement(self, plant_id, vendor_id, start, end, quantity) -> Agreement:
+        return await self._run(InventoryManager.create_purchase_agreement, plant_id, vendor_id, start, end, quantity)
+
+    async def create_purchase_order(
+            self, quantity, order_date=None, agreement_id=None, vendor_id=None, plant_id=None,
+            allocation_policy=None
+    ) -> Order:
+        return await self._run(
+            InventoryManager.create_purchase_order, quantity, order_date=order_date, agreement_id=agreement_id,
+            vendor_id=vendor_id, plant_id=plant_id, allocation_policy=allocation_policy
+        )
+
+    async def allocate_purchase_order(
+            self, quantity, plant_id, vendor_id, order_date=None, allocation_policy='earliest_expiring'
+    ) -> list:
+        return await self._run(
+            InventoryManager.allocate_purchase_order, quantity, plant_id, vendor_id, order_date=order_date,
+            allocation_policy=allocation_policy
+        )
+
+    async def create_purchase_orders(self, batch) -> list:
+        return await self._run(InventoryManager.create_purchase_orders, batch)
+
+    async def receive_purchase_order(self, order_id, delivery_date=None) -> Order:
+        return await self._run(InventoryManager.receive_purchase_order, order_id, delivery_date=delivery_date)
+
+    async def get_purchase_agreement(self, agreement_id: int) -> Agreement:
+        return await self._run(InventoryManager.get_purchase_agreement, agreement_id)
+
+    async def get_purchase_order(self, order_id: int) -> Order:
+        return await self._run(InventoryManager.get_purchase_order, order_id)
+
+    async def get_earliest_plant_order(self, plant_id: int) -> Order:
+        return await self._run(InventoryManager.get_earliest_plant_order, plant_id)
+
+    async def get_purchase_agreement_version(self, agreement_id: int) -> int:
+        return await self._run(InventoryManager.get_purchase_agreement_version, agreement_id)
+
+    async def get_purchase_order_version(self, order_id: int) -> int:
+        return await self._run(InventoryManager.get_purchase_order_version, order_id)
+
+    async def get_earliest_plant_order_version(self, plant_id: int) -> tuple:
+        return await self._run(InventoryManager.get_earliest_plant_order_version, plant_id)
+
+    async def list_orders(self, **filters) -> tuple:
+        return await self._run(InventoryManager.list_orders, **filters)
+
+    async def list_agreements(self, **filters) -> tuple:
+        return await self._run(InventoryManager.list_agreements, **filters)
+
+    async def get_plant_daily_deliveries(self, plant_id: int, date_from=None, date_to=None) -> list:
+        return await self._run(InventoryManager.get_plant_daily_deliveries, plant_id, date_from, date_to)
+
+    async def get_vendor_open_quantity(self, vendor_id: int) -> dict:
+        return await self._run(InventoryManager.get_vendor_open_quantity, vendor_id)
+
+    async def get_agreement_utilization(self, agreement_id: int) -> dict:
+        return await self._run(InventoryManager.get_agreement_utilization, agreement_id)
+
+    async def _run(self, method, *args, **kwargs):
+        return await self.session.run_sync(lambda session: method(InventoryManager(session), *args, **kwargs))
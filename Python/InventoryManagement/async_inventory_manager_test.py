@@ -0,0 +1,153 @@
+import json
+import os
+import unittest
+from datetime import date, timedelta
+
+from asgi_app import InventoryASGIApp
+from async_inventory_manager import AsyncInventoryManager
+from inventory_manager import OrderQuantityExceedsAgreementException
+
+
+class AsyncInventoryManagerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.app = InventoryASGIApp({'DATABASE_URL': 'sqlite:///async_inventory_test.db'})
+        self.app.init_db()
+        self.session = self.app.Session()
+        self.inventory_manager = AsyncInventoryManager(self.session)
+
+    async def asyncTearDown(self) -> None:
+        await self.session.close()
+        await self.app.shutdown()
+
+        for db_file in ["async_inventory_test.db", "async_inventory_test.db-wal", "async_inventory_test.db-shm"]:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    async def test_get_oldest_received_plant(self):
+        agreement = await self.inventory_manager.create_purchase_agreement(
+            plant_id=1, vendor_id=1, start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365),
+            quantity=150
+        )
+        order_1 = await self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today() - timedelta(days=5), agreement_id=agreement.agreement_id
+        )
+        await self.inventory_manager.receive_purchase_order(
+            order_1.order_id, delivery_date=date.today() - timedelta(days=5)
+        )
+        order_2 = await self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today() - timedelta(days=20), vendor_id=1, plant_id=1
+        )
+        await self.inventory_manager.receive_purchase_order(
+            order_2.order_id, delivery_date=date.today() - timedelta(days=20)
+        )
+
+        order = await self.inventory_manager.get_earliest_plant_order(1)
+        self.assertEqual(order.order_id, order_2.order_id)
+
+        with self.assertRaises(OrderQuantityExceedsAgreementException):
+            await self.inventory_manager.create_purchase_order(
+                quantity=100, order_date=date.today(), agreement_id=agreement.agreement_id
+            )
+
+    async def test_asgi_routes(self):
+        status, agreement = await self._post('/create_purchase_agreement', {
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        })
+        self.assertEqual(status, 201)
+        status, order = await self._post('/create_purchase_order', {
+            'agreement_id': agreement['agreement_id'], 'order_date': '2023-01-01', 'quantity': 100
+        })
+        self.assertEqual(status, 201)
+        status, received = await self._post('/receive_purchase_order', {
+            'order_id': order['order_id'], 'delivery_date': '2023-05-01'
+        })
+        self.assertEqual((status, received['delivery_date']), (201, '2023-05-01'))
+
+        self.assertEqual(await self._post('/get_purchase_order', {'plant_id': 1}), (200, received))
+        self.assertEqual(
+            await self._post('/get_purchase_agreement', {'agreement_id': agreement['agreement_id']}), (200, agreement)
+        )
+
+    async def test_asgi_allocation(self):
+        agreements = [(await self._post('/create_purchase_agreement', {
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': end, 'quantity': 100
+        }))[1] for end in ('2023-12-31', '2023-06-30')]
+
+        status, order = await self._post('/create_purchase_order', {
+            'plant_id': 1, 'vendor_id': 1, 'order_date': '2023-03-01', 'quantity': 60,
+            'allocation_policy': 'earliest_expiring'
+        })
+        self.assertEqual((status, order['agreement_id']), (201, agreements[1]['agreement_id']))
+
+        status, allocated = await self._post('/allocate_purchase_order', {
+            'plant_id': 1, 'vendor_id': 1, 'order_date': '2023-03-01', 'quantity': 100, 'allocation_policy': 'split'
+        })
+        self.assertEqual(status, 201)
+        self.assertEqual(
+            [(order['agreement_id'], order['quantity']) for order in allocated['orders']],
+            [(agreements[1]['agreement_id'], 40), (agreements[0]['agreement_id'], 60)]
+        )
+
+    async def test_asgi_list_and_conditional_get_routes(self):
+        _, agreement = await self._post('/create_purchase_agreement', {
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        })
+        orders = [(await self._post('/create_purchase_order', {
+            'agreement_id': agreement['agreement_id'], 'order_date': '2023-01-01', 'quantity': 100
+        }))[1] for _ in range(3)]
+
+        status, page = await self._post('/list_purchase_orders', {'plant_id': 1, 'limit': 2})
+        self.assertEqual((status, [order['order_id'] for order in page['orders']]), (200, [1, 2]))
+        status, page = await self._post('/list_purchase_orders', {'plant_id': 1, 'cursor': page['next_cursor']})
+        self.assertEqual((status, page['orders'][0]['order_id'], page['next_cursor']), (200, 3, None))
+        self.assertEqual((await self._post('/list_purchase_agreements', {'limit': 0}))[0], 400)
+        status, utilization = await self._post('/get_agreement_utilization', {'agreement_id': agreement['agreement_id']})
+        self.assertEqual((status, utilization['ordered_quantity'], utilization['remaining_quantity']), (200, 300, 700))
+        self.assertEqual((await self._post('/get_vendor_open_quantity', {'vendor_id': 1}))[1]['open_orders'], 3)
+
+        order_id = orders[0]['order_id']
+        status, headers, body = await self._request('GET', f'/orders/{order_id}')
+        self.assertEqual((status, json.loads(body)), (200, orders[0]))
+        self.assertEqual((headers[b'vary'], headers[b'cache-control']), (b'Accept', b'no-cache'))
+        status, _, body = await self._request('GET', f'/orders/{order_id}', {b'if-none-match': headers[b'etag']})
+        self.assertEqual((status, body), (304, b''))
+
+        await self._post('/receive_purchase_order', {'order_id': order_id, 'delivery_date': '2023-05-01'})
+        status, received_headers, body = await self._request(
+            'GET', f'/orders/{order_id}', {b'if-none-match': headers[b'etag']}
+        )
+        self.assertEqual((status, json.loads(body)['delivery_date']), (200, '2023-05-01'))
+        self.assertNotEqual(received_headers[b'etag'], headers[b'etag'])
+
+        status, _, body = await self._request('GET', '/plants/1/earliest_order')
+        self.assertEqual((status, json.loads(body)['order_id']), (200, order_id))
+        self.assertEqual((await self._request('GET', '/plants/2/earliest_order'))[0], 404)
+        self.assertEqual((await self._request('GET', f'/agreements/{agreement["agreement_id"]}'))[0], 200)
+        self.assertEqual((await self._request('POST', f'/agreements/{agreement["agreement_id"]}'))[0], 405)
+
+    async def test_asgi_malformed_body(self):
+        status, _, body = await self._request('POST', '/create_purchase_order', body=b'{bad')
+        self.assertEqual((status, body), (400, b'Bad Request'))
+
+    async def _post(self, path, data):
+        status, headers, body = await self._request('POST', path, body=json.dumps(data).encode())
+        return status, json.loads(body) if headers[b'content-type'] == b'application/json' else body.decode()
+
+    async def _request(self, method, path, headers=None, body=b''):
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app({
+            'type': 'http', 'method': method, 'path': path, 'headers': list((headers or {}).items())
+        }, receive, send)
+        return sent[0]['status'], dict(sent[0]['headers']), sent[1]['body']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import print_results, summarize, temporary_database_url
+
+"""
+A write storm above capacity with and without admission control (ADMISSION_ENABLED): concurrency threads send
+create_purchase_order requests with a get_purchase_order lookup every --read-every requests. Without admission every
+write queues on the database lock; with it writes beyond the write limit and queue are rejected (429/503, counted as
+errors below) and the latency of admitted writes and of the lookups stays bounded. A rejected client backs off for
+--backoff-ms (standing in for Retry-After) before its next request, clients retrying at once would spend the CPU the
+admitted requests need.
+
+    python -m benchmarks.admission --requests 4000 --concurrency 64
+"""
+
+
+def make_app(admission, write_concurrency, max_wait_ms):
+    from app import create_app, init_db
+
+    app = create_app({
+        'DATABASE_URL': temporary_database_url('admission' if admission else 'no-admission'), 'DB_POOL_SIZE': 64,
+        'CACHE_ENABLED': False, 'ADMISSION_ENABLED': admission, 'ADMISSION_WRITE_CONCURRENCY': write_concurrency,
+        'ADMISSION_MAX_WAIT_MS': max_wait_ms,
+    })
+    init_db(app)
+    client = app.test_client()
+    agreement_id = client.post('/create_purchase_agreement', json={
+        'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 10 ** 9
+    }).json['agreement_id']
+    order_id = client.post('/create_purchase_order', json={
+        'agreement_id': agreement_id, 'order_date': '2023-02-01', 'quantity': 1
+    }).json['order_id']
+    return app, agreement_id, order_id
+
+
+def run(requests, concurrency, read_every, write_concurrency, max_wait_ms, backoff_ms):
+    rows = []
+    for admission in (False, True):
+        app, agreement_id, order_id = make_app(admission, write_concurrency, max_wait_ms)
+        latencies = {'writes': [], 'lookups': []}
+        errors = {'writes': 0, 'lookups': 0}
+        lock = threading.Lock()
+
+        def request(i):
+            kind = 'lookups' if i % read_every == 0 else 'writes'
+            client = app.test_client()
+            started = time.perf_counter()
+            if kind == 'lookups':
+                response = client.post('/get_purchase_order', json={'order_id': order_id})
+            else:
+                response = client.post('/create_purchase_order', json={
+                    'agreement_id': agreement_id, 'order_date': '2023-02-01', 'quantity': 1
+                })
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code < 300:
+                    latencies[kind].append(elapsed)
+                else:
+                    errors[kind] += 1
+            if response.status_code in (429, 503):
+                time.sleep(backoff_ms / 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            list(executor.map(request, range(requests)))
+        elapsed = time.perf_counter() - started
+
+        name = 'admission' if admission else 'no admission'
+        for kind in ('writes', 'lookups'):
+            rows.append((f'{name} {kind}', summarize(latencies[kind], elapsed, errors[kind])))
+        app.extensions['inventory_engine'].dispose()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Admission control overload benchmark')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per case')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--read-every', type=int, default=5, help='every Nth request is a lookup')
+    parser.add_argument('--write-concurrency', type=int, default=4)
+    parser.add_argument('--max-wait-ms', type=float, default=200)
+    parser.add_argument('--backoff-ms', type=float, default=200, help='pause of a client after a rejection')
+    args = parser.parse_args(argv)
+
+    print_results('write storm, admitted requests', run(
+        args.requests, args.concurrency, args.read_every, args.write_concurrency, args.max_wait_ms, args.backoff_ms
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import threading
+
+from benchmarks.common import print_results, run_async, run_threaded, temporary_database_url
+
+"""
+Side by side benchmark of the Flask/WSGI app (app.py, one thread per in-flight request) and the ASGI app (asgi_app.py,
+one event loop) serving the same routes at increasing concurrency. Both apps are driven in-process, the WSGI app
+through Flask test clients and the ASGI app through direct ASGI calls, so the numbers compare the app and database
+layers without HTTP server overhead.
+
+    python -m benchmarks.asgi_vs_wsgi --requests 2000 --concurrency 1 16 64 256
+"""
+
+
+def wsgi_app(agreements):
+    from app import create_app, init_db
+
+    app = create_app({'DATABASE_URL': temporary_database_url('wsgi')})
+    init_db(app)
+    client = app.test_client()
+    for _ in range(agreements):
+        client.post('/create_purchase_agreement', json=_agreement_request())
+    return app
+
+
+async def asgi_app(agreements):
+    from asgi_app import InventoryASGIApp
+
+    app = InventoryASGIApp({'DATABASE_URL': temporary_database_url('asgi')})
+    app.init_db()
+    for _ in range(agreements):
+        await _asgi_post(app, '/create_purchase_agreement', _agreement_request())
+    return app
+
+
+def _agreement_request():
+    return {'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 10 ** 9}
+
+
+def _order_request(i, agreements):
+    return {'agreement_id': i % agreements + 1, 'order_date': '2023-06-01', 'quantity': 1}
+
+
+async def _asgi_post(app, path, data):
+    messages = [{'type': 'http.request', 'body': json.dumps(data).encode(), 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app({'type': 'http', 'method': 'POST', 'path': path}, receive, send)
+    if sent[0]['status'] >= 400:
+        raise RuntimeError(f'{path} failed with {sent[0]["status"]}')
+    return json.loads(sent[1]['body'])
+
+
+def run(requests, concurrency_levels, agreements):
+    wsgi = wsgi_app(agreements)
+    clients = {}
+
+    def wsgi_post(path, data):
+        client = clients.setdefault(threading.get_ident(), wsgi.test_client())
+        response = client.post(path, json=data)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{path} failed with {response.status_code}')
+
+    loop = asyncio.new_event_loop()
+    asgi = loop.run_until_complete(asgi_app(agreements))
+
+    rows = []
+    for concurrency in concurrency_levels:
+        rows.append((f'wsgi create_purchase_order c={concurrency}', run_threaded(
+            lambda i: wsgi_post('/create_purchase_order', _order_request(i, agreements)), requests, concurrency
+        )))
+        rows.append((f'asgi create_purchase_order c={concurrency}', loop.run_until_complete(run_async(
+            lambda i: _asgi_post(asgi, '/create_purchase_order', _order_request(i, agreements)), requests, concurrency
+        ))))
+        rows.append((f'wsgi get_purchase_order c={concurrency}', run_threaded(
+            lambda i: wsgi_post('/get_purchase_order', {'order_id': i % requests + 1}), requests, concurrency
+        )))
+        rows.append((f'asgi get_purchase_order c={concurrency}', loop.run_until_complete(run_async(
+            lambda i: _asgi_post(asgi, '/get_purchase_order', {'order_id': i % requests + 1}), requests, concurrency
+        ))))
+
+    loop.run_until_complete(asgi.shutdown())
+    loop.close()
+    wsgi.extensions['inventory_engine'].dispose()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64, 256])
+    parser.add_argument('--agreements', type=int, default=10)
+    args = parser.parse_args(argv)
+    print_results('WSGI vs ASGI', run(args.requests, args.concurrency, args.agreements))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+Helpers shared by the benchmarks: running an operation at a given concurrency and summarizing its latencies
+"""
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(latencies, elapsed, errors=0):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_threaded(operation, count, concurrency):
+    """
+    Calls operation(i) for i in range(count) from concurrency threads, returns the summary of their latencies
+    """
+    latencies, errors, lock = [], [0], threading.Lock()
+
+    def timed(i):
+        started = time.perf_counter()
+        try:
+            operation(i)
+        except Exception:
+            with lock:
+                errors[0] += 1
+            return
+        latency = time.perf_counter() - started
+        with lock:
+            latencies.append(latency)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(timed, range(count)))
+    return summarize(latencies, time.perf_counter() - started, errors[0])
+
+
+async def run_async(operation, count, concurrency):
+    """
+    Awaits operation(i) for i in range(count) with at most concurrency in flight, returns the summary of their latencies
+    """
+    latencies, errors, semaphore = [], [0], asyncio.Semaphore(concurrency)
+
+    async def timed(i):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await operation(i)
+            except Exception:
+                errors[0] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(count)))
+    return summarize(latencies, time.perf_counter() - started, errors[0])
+
+
+def temporary_database_url(name):
+    """
+    sqlite url of a fresh database file in the temp directory
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix='inventory-benchmark-'), f'{name}.db')
+    return f'sqlite:///{path}'
+
+
+def print_results(title, rows):
+    print(title)
+    print(f'{"case":<48}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+    for case, result in rows:
+        print(
+            f'{case:<48}{result["throughput"]:>10.1f}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+            f'{result["p99_ms"]:>10.2f}{result["errors"]:>8}'
+        )
@@ -0,0 +1,82 @@
+import argparse
+
+from benchmarks.common import print_results, run_threaded, temporary_database_url
+
+"""
+Clients polling orders that rarely change: POST /get_purchase_order (the full payload every time) against
+GET /orders/<order_id> revalidated with If-None-Match, answered 304 from a version lookup while the order is unchanged.
+Every --change-every polls one order is received (a new version), so some revalidations download it again. Reports
+throughput, latency and the response bytes per poll of each case.
+
+    python -m benchmarks.conditional_get --orders 200 --polls 5000 --concurrency 8
+"""
+
+
+def make_app(orders, cache):
+    from app import create_app, init_db
+
+    app = create_app({'DATABASE_URL': temporary_database_url('conditional-get'), 'CACHE_ENABLED': cache})
+    init_db(app)
+    client = app.test_client()
+    agreement = client.post('/create_purchase_agreement', json={
+        'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 10 ** 9
+    }).json
+    order_ids = [client.post('/create_purchase_order', json={
+        'agreement_id': agreement['agreement_id'], 'order_date': '2023-02-01', 'quantity': 1
+    }).json['order_id'] for _ in range(orders)]
+    return app, order_ids
+
+
+def run(orders, polls, concurrency, change_every, cache):
+    app, order_ids = make_app(orders, cache)
+    rows = []
+
+    def receive(i):
+        if change_every and i % change_every == 0:
+            app.test_client().post('/receive_purchase_order', json={
+                'order_id': order_ids[i % len(order_ids)], 'delivery_date': '2023-03-01'
+            })
+
+    def post_poll(i):
+        receive(i)
+        response = app.test_client().post('/get_purchase_order', json={'order_id': order_ids[i % len(order_ids)]})
+        if response.status_code != 200:
+            raise RuntimeError(response.status_code)
+        received_bytes[0] += len(response.data)
+
+    etags = {}
+
+    def conditional_poll(i):
+        receive(i)
+        order_id = order_ids[i % len(order_ids)]
+        headers = {'If-None-Match': etags[order_id]} if order_id in etags else {}
+        response = app.test_client().get(f'/orders/{order_id}', headers=headers)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(response.status_code)
+        etags[order_id] = response.headers['ETag']
+        received_bytes[0] += len(response.data)
+
+    for name, poll in (('POST /get_purchase_order', post_poll), ('GET /orders/<id> If-None-Match', conditional_poll)):
+        received_bytes = [0]
+        result = run_threaded(poll, polls, concurrency)
+        rows.append((f'{name} ({received_bytes[0] / polls:.0f} B/poll)', result))
+
+    app.extensions['inventory_engine'].dispose()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Conditional GET polling benchmark')
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--polls', type=int, default=5000, help='polls per case')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--change-every', type=int, default=100, help='receive an order every N polls, 0 never')
+    parser.add_argument('--no-cache', action='store_true', help='disable the read-through cache of the POST reads')
+    args = parser.parse_args(argv)
+
+    print_results('polling orders', run(args.orders, args.polls, args.concurrency, args.change_every,
+                                        not args.no_cache))
+
+
+if __name__ == '__main__':
+    main()
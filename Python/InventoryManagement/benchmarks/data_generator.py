@@ -0,0 +1,93 @@
+import random
+from datetime import date, timedelta
+
+import rollups
+from models.agreement import Agreement
+from models.order import Order
+from models.plant import Plant
+from models.plant_earliest_delivery import PlantEarliestDelivery
+from models.vendor import Vendor
+
+"""
+Synthetic data for benchmarks. Rows obey the InventoryManager business rules (order/delivery dates inside agreement
+windows, agreement quantities not exceeded) and maintained columns/tables, rollups included, are filled in, so the
+generated database looks like one built through InventoryManager, only much faster (Core executemany and one rollups
+rebuild)
+"""
+
+
+class GeneratedData:
+
+    def __init__(self, plant_ids, vendor_ids, agreements, undelivered_orders):
+        self.plant_ids = plant_ids
+        self.vendor_ids = vendor_ids
+        # (agreement_id, plant_id, vendor_id, agreement_start, agreement_end) of every agreement
+        self.agreements = agreements
+        # (order_id, order_date) of orders that are not received yet
+        self.undelivered_orders = undelivered_orders
+
+
+def generate(engine, plants=10, vendors=10, agreements=100, orders=10000, delivered_fraction=0.8, seed=0):
+    """
+    Inserts plants, vendors, agreements and orders (a third of them standalone) into an empty database
+    """
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    plant_ids, vendor_ids = list(range(1, plants + 1)), list(range(1, vendors + 1))
+
+    agreement_rows = []
+    for agreement_id in range(1, agreements + 1):
+        agreement_start = start + timedelta(days=rng.randrange(365))
+        agreement_rows.append({
+            'agreement_id': agreement_id, 'plant_id': rng.choice(plant_ids), 'vendor_id': rng.choice(vendor_ids),
+            'agreement_date': agreement_start, 'agreement_start': agreement_start,
+            'agreement_end': agreement_start + timedelta(days=365 + rng.randrange(365)),
+            'quantity': 10 ** 9, 'consumed_quantity': 0,
+        })
+
+    order_rows, undelivered_orders, earliest = [], [], {}
+    for order_id in range(1, orders + 1):
+        quantity = rng.randint(1, 100)
+        if agreement_rows and rng.random() < 2 / 3:
+            agreement = rng.choice(agreement_rows)
+            agreement['consumed_quantity'] += quantity
+            window = (agreement['agreement_end'] - agreement['agreement_start']).days
+            order_date = agreement['agreement_start'] + timedelta(days=rng.randrange(window // 2))
+            delivery_date = order_date + timedelta(days=rng.randrange(window // 2))
+            plant_id = agreement['plant_id']
+            order = {'agreement_id': agreement['agreement_id'], 'vendor_id': agreement['vendor_id'], 'plant_id': plant_id}
+        else:
+            order_date = start + timedelta(days=rng.randrange(730))
+            delivery_date = order_date + timedelta(days=rng.randrange(60))
+            plant_id = rng.choice(plant_ids)
+            order = {'agreement_id': None, 'vendor_id': rng.choice(vendor_ids), 'plant_id': plant_id}
+
+        if rng.random() < delivered_fraction:
+            if (delivery_date, order_id) < earliest.get(plant_id, (date.max, 0)):
+                earliest[plant_id] = (delivery_date, order_id)
+        else:
+            delivery_date = None
+            undelivered_orders.append((order_id, order_date))
+        order.update(order_id=order_id, order_date=order_date, delivery_date=delivery_date, quantity=quantity)
+        order_rows.append(order)
+
+    with engine.begin() as connection:
+        connection.execute(Plant.__table__.insert(), [{'plant_id': i, 'name': f'Plant {i}'} for i in plant_ids])
+        connection.execute(Vendor.__table__.insert(), [{'vendor_id': i, 'name': f'Vendor {i}'} for i in vendor_ids])
+        if agreement_rows:
+            connection.execute(Agreement.__table__.insert(), agreement_rows)
+        if order_rows:
+            connection.execute(Order.__table__.insert(), order_rows)
+        if earliest:
+            connection.execute(PlantEarliestDelivery.__table__.insert(), [
+                {'plant_id': plant_id, 'order_id': order_id, 'delivery_date': delivery_date}
+                for plant_id, (delivery_date, order_id) in earliest.items()
+            ])
+        rollups.rebuild(connection)
+
+    return GeneratedData(
+        plant_ids, vendor_ids,
+        [(row['agreement_id'], row['plant_id'], row['vendor_id'], row['agreement_start'], row['agreement_end'])
+         for row in agreement_rows],
+        undelivered_orders
+    )
@@ -0,0 +1,65 @@
+import argparse
+
+from benchmarks.common import print_results, run_threaded, temporary_database_url
+
+"""
+Throughput and latency of create_purchase_order requests with and without group commit (GROUP_COMMIT_ENABLED) at
+increasing concurrency. Requests go through Flask test clients in-process, so the difference is the commit path:
+one transaction (and fsync) per request against one per group.
+
+    python -m benchmarks.group_commit --requests 2000 --concurrency 1 8 32 --max-delay-ms 2
+"""
+
+
+def make_app(group_commit, max_delay_ms, max_batch_size):
+    from app import create_app, init_db
+
+    app = create_app({
+        'DATABASE_URL': temporary_database_url('group-commit' if group_commit else 'commit-per-request'),
+        'DB_POOL_SIZE': 64, 'CACHE_ENABLED': False, 'GROUP_COMMIT_ENABLED': group_commit,
+        'GROUP_COMMIT_MAX_DELAY_MS': max_delay_ms, 'GROUP_COMMIT_MAX_BATCH_SIZE': max_batch_size,
+    })
+    init_db(app)
+    agreement = app.test_client().post('/create_purchase_agreement', json={
+        'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 10 ** 9
+    }).json
+    return app, agreement['agreement_id']
+
+
+def run(requests, concurrency_levels, max_delay_ms, max_batch_size):
+    rows = []
+    for group_commit in (False, True):
+        app, agreement_id = make_app(group_commit, max_delay_ms, max_batch_size)
+
+        def create_order(i):
+            response = app.test_client().post('/create_purchase_order', json={
+                'agreement_id': agreement_id, 'order_date': '2023-02-01', 'quantity': 1
+            })
+            if response.status_code != 201:
+                raise RuntimeError(response.status_code)
+
+        for concurrency in concurrency_levels:
+            name = 'group commit' if group_commit else 'commit per request'
+            rows.append((f'{name} c={concurrency}', run_threaded(create_order, requests, concurrency)))
+
+        writer = app.extensions['inventory_writer']
+        if writer:
+            writer.close()
+        app.extensions['inventory_engine'].dispose()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Group commit benchmark')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per case')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--max-delay-ms', type=float, default=2.0)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    args = parser.parse_args(argv)
+
+    print_results('create_purchase_order', run(args.requests, args.concurrency, args.max_delay_ms,
+                                               args.max_batch_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import http.client
+import json
+import logging
+import threading
+import time
+
+from benchmarks.common import print_results, run_threaded, summarize, temporary_database_url
+
+"""
+The gRPC service (grpc_service.py) against the REST endpoints (app.py), both served on localhost over real sockets
+from the same database, so the numbers include serialization and connection handling:
+
+- create_purchase_order: one REST POST per order against one unary gRPC call per order on a shared channel
+- bulk create: REST /create_purchase_orders requests of --batch-size orders against one CreatePurchaseOrders stream of
+  messages of --batch-size orders
+- listing every order: REST /list_purchase_orders pages of 1000 against one ListOrders stream
+
+Bulk and listing rows are one request each, their req/s column is orders per second.
+
+    python -m benchmarks.grpc_vs_rest --requests 2000 --concurrency 1 8 --bulk-orders 20000
+"""
+
+
+def start_servers(database_url):
+    import grpc
+    from werkzeug.serving import make_server
+
+    import inventory_pb2_grpc
+    from app import create_app, init_db
+    from grpc_service import create_server
+
+    config = {'DATABASE_URL': database_url, 'DB_POOL_SIZE': 32, 'CACHE_ENABLED': False, 'GRPC_PORT': 0}
+    app = create_app(config)
+    init_db(app)
+    # no access log line per request
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    http_server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    grpc_server, grpc_port = create_server(config)
+    grpc_server.start()
+    channel = grpc.insecure_channel(f'127.0.0.1:{grpc_port}')
+    return app, http_server, grpc_server, channel, inventory_pb2_grpc.InventoryServiceStub(channel)
+
+
+def rest_post(port, path, data):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    try:
+        connection.request('POST', path, json.dumps(data), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        body = response.read()
+    finally:
+        connection.close()
+    if response.status >= 400:
+        raise RuntimeError(f'{path} failed with {response.status}')
+    return json.loads(body)
+
+
+def timed_bulk(function, orders):
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    result = summarize([elapsed], elapsed)
+    result['throughput'] = orders / elapsed
+    return result
+
+
+def run(requests, concurrency_levels, bulk_orders, batch_size):
+    import inventory_pb2
+
+    app, http_server, grpc_server, channel, stub = start_servers(temporary_database_url('grpc-vs-rest'))
+    port = http_server.server_port
+    agreement_id = rest_post(port, '/create_purchase_agreement', {
+        'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 10 ** 9
+    })['agreement_id']
+    order = {'agreement_id': agreement_id, 'order_date': '2023-06-01', 'quantity': 1}
+
+    rows = []
+    for concurrency in concurrency_levels:
+        rows.append((f'rest create_purchase_order c={concurrency}', run_threaded(
+            lambda i: rest_post(port, '/create_purchase_order', order), requests, concurrency
+        )))
+        rows.append((f'grpc CreatePurchaseOrder c={concurrency}', run_threaded(
+            lambda i: stub.CreatePurchaseOrder(inventory_pb2.CreatePurchaseOrderRequest(**order)), requests,
+            concurrency
+        )))
+
+    def rest_bulk():
+        for start in range(0, bulk_orders, batch_size):
+            rest_post(port, '/create_purchase_orders', {'orders': [order] * min(batch_size, bulk_orders - start)})
+
+    def grpc_bulk():
+        stub.CreatePurchaseOrders(
+            inventory_pb2.CreatePurchaseOrderRequests(orders=[
+                inventory_pb2.CreatePurchaseOrderRequest(**order) for _ in range(min(batch_size, bulk_orders - start))
+            ]) for start in range(0, bulk_orders, batch_size)
+        )
+
+    rows.append((f'rest create_purchase_orders x{batch_size}', timed_bulk(rest_bulk, bulk_orders)))
+    rows.append(('grpc CreatePurchaseOrders stream', timed_bulk(grpc_bulk, bulk_orders)))
+
+    listed = {}
+
+    def rest_list():
+        cursor, count = None, 0
+        while True:
+            page = rest_post(port, '/list_purchase_orders', {'vendor_id': 1, 'cursor': cursor, 'limit': 1000})
+            count += len(page['orders'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        listed['rest'] = count
+
+    def grpc_list():
+        listed['grpc'] = sum(len(chunk.orders) for chunk in stub.ListOrders(inventory_pb2.ListOrdersRequest(
+            vendor_id=1, chunk_size=1000
+        )))
+
+    total_orders = bulk_orders + 2 * requests * len(concurrency_levels)
+    rows.append(('rest list_purchase_orders pages', timed_bulk(rest_list, total_orders)))
+    rows.append(('grpc ListOrders stream', timed_bulk(grpc_list, total_orders)))
+    if listed['rest'] != listed['grpc']:
+        raise RuntimeError(f'listings differ: {listed}')
+
+    channel.close()
+    grpc_server.stop(None)
+    http_server.shutdown()
+    app.extensions['inventory_engine'].dispose()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gRPC vs REST benchmark')
+    parser.add_argument('--requests', type=int, default=1000, help='unary requests per case')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--bulk-orders', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=500, help='orders per REST batch request/gRPC message')
+    args = parser.parse_args(argv)
+    print_results('gRPC vs REST on localhost', run(args.requests, args.concurrency, args.bulk_orders,
+                                                    args.batch_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import time
+
+import msgpack
+from flask import Flask, jsonify
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import temporary_database_url
+from benchmarks.data_generator import generate
+from inventory_manager import AGREEMENT_COLUMNS, ORDER_COLUMNS
+from models.agreement import Agreement
+from models.database import Base, make_engine
+from models.order import Order
+from serializers import dumps_json, encode, serialize_rows
+
+"""
+Serialization of list payloads: ORM objects through Model.serialize() and jsonify (what the app did before
+serializers.py) against Core rows through serialize_rows() encoded with orjson and msgpack. Each case includes loading
+the rows, so the ORM identity map cost is part of the comparison. The Core cases select the serialize() fields
+(ORDER_COLUMNS/AGREEMENT_COLUMNS, what the list routes return) and every payload is checked to decode to the same
+list before timing.
+
+    python -m benchmarks.serialization --rows 10000 --repeat 5
+"""
+
+
+def orm_jsonify(session, model, key, columns, app):
+    with app.app_context():
+        return jsonify([instance.serialize() for instance in session.query(model).order_by(key)]).get_data()
+
+
+def core_json(session, model, key, columns):
+    return dumps_json(serialize_rows(session.execute(select(*columns).order_by(key))))
+
+
+def core_msgpack(session, model, key, columns):
+    return encode(serialize_rows(session.execute(select(*columns).order_by(key))), 'application/msgpack')
+
+
+def run(rows, repeat):
+    engine = make_engine(temporary_database_url('serialization'))
+    Base.metadata.create_all(engine)
+    generate(engine, agreements=rows, orders=rows)
+    Session = sessionmaker(bind=engine)
+    app = Flask(__name__)
+
+    # case -> (serialize, decode)
+    cases = {
+        'orm serialize() + jsonify': (
+            lambda session, model, key, columns: orm_jsonify(session, model, key, columns, app), json.loads
+        ),
+        'core serialize_rows() + json': (core_json, json.loads),
+        'core serialize_rows() + msgpack': (core_msgpack, msgpack.unpackb),
+    }
+    results = []
+    for model, key, columns in [(Order, Order.order_id, ORDER_COLUMNS),
+                                (Agreement, Agreement.agreement_id, AGREEMENT_COLUMNS)]:
+        with Session() as session:
+            payloads = [decode(serialize(session, model, key, columns)) for serialize, decode in cases.values()]
+        if any(payload != payloads[0] for payload in payloads):
+            raise AssertionError(f'{model.__tablename__} payloads differ between the cases')
+
+        for case, (serialize, _) in cases.items():
+            timings, size = [], 0
+            for _ in range(repeat):
+                # a fresh session per run so every run hydrates its objects
+                with Session() as session:
+                    started = time.perf_counter()
+                    size = len(serialize(session, model, key, columns))
+                    timings.append(time.perf_counter() - started)
+            results.append((f'{model.__tablename__}: {case}', min(timings), size))
+    engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List payload serialization benchmark')
+    parser.add_argument('--rows', type=int, default=10000, help='orders and agreements in the payloads')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per case, the fastest is reported')
+    args = parser.parse_args(argv)
+
+    print(f'{"case":<48}{"best ms":>10}{"bytes":>12}')
+    for case, seconds, size in run(args.rows, args.repeat):
+        print(f'{case:<48}{seconds * 1000:>10.1f}{size:>12}')
+
+
+if __name__ == '__main__':
+    main()
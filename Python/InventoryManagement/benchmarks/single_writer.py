@@ -0,0 +1,82 @@
+import argparse
+import time
+
+from benchmarks.common import print_results, run_threaded, summarize, temporary_database_url
+
+"""
+Mixed read/write stress of the SQLite backend with every request writing through the pool (busy timeout retries)
+against SINGLE_WRITER_ENABLED (one writer connection behind a bounded queue, reads on read-only connections). Each
+case runs create_purchase_order and get_agreement_utilization requests at a read ratio, with a short busy timeout so
+that lock contention shows up as errors instead of waits, and reports all requests and the reads on their own.
+
+    python -m benchmarks.single_writer --requests 2000 --concurrency 16 --read-ratios 0.5 0.8 0.95
+"""
+
+
+def make_app(single_writer, busy_timeout_ms):
+    from app import create_app, init_db
+
+    app = create_app({
+        'DATABASE_URL': temporary_database_url('single-writer' if single_writer else 'pooled-writers'),
+        'DB_POOL_SIZE': 64, 'CACHE_ENABLED': False, 'SINGLE_WRITER_ENABLED': single_writer,
+        'SQLITE_BUSY_TIMEOUT_MS': busy_timeout_ms,
+    })
+    init_db(app)
+    agreement = app.test_client().post('/create_purchase_agreement', json={
+        'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 10 ** 9
+    }).json
+    return app, agreement['agreement_id']
+
+
+def run(requests, concurrency, read_ratios, busy_timeout_ms):
+    rows = []
+    for single_writer in (False, True):
+        app, agreement_id = make_app(single_writer, busy_timeout_ms)
+        name = 'single writer' if single_writer else 'pooled writers'
+
+        for read_ratio in read_ratios:
+            read_latencies = []
+
+            def request(i):
+                client = app.test_client()
+                # spreads the writes evenly over the run
+                if int((i + 1) * (1 - read_ratio)) > int(i * (1 - read_ratio)):
+                    response = client.post('/create_purchase_order', json={
+                        'agreement_id': agreement_id, 'order_date': '2023-02-01', 'quantity': 1
+                    })
+                else:
+                    started = time.perf_counter()
+                    response = client.post('/get_agreement_utilization', json={'agreement_id': agreement_id})
+                    read_latencies.append(time.perf_counter() - started)
+                if response.status_code >= 300:
+                    raise RuntimeError(response.status_code)
+
+            started = time.perf_counter()
+            result = run_threaded(request, requests, concurrency)
+            elapsed = time.perf_counter() - started
+            rows.append((f'{name} reads={read_ratio:.0%} all', result))
+            rows.append((f'{name} reads={read_ratio:.0%} reads only', summarize(read_latencies, elapsed)))
+
+        writer = app.extensions['inventory_writer']
+        if writer:
+            writer.close()
+            app.extensions['inventory_writer_engine'].dispose()
+        app.extensions['inventory_engine'].dispose()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Single writer mixed read/write benchmark')
+    parser.add_argument('--requests', type=int, default=1000, help='requests per case')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--read-ratios', type=float, nargs='+', default=[0.5, 0.8, 0.95])
+    parser.add_argument('--busy-timeout-ms', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    print_results('mixed create_purchase_order/get_agreement_utilization', run(
+        args.requests, args.concurrency, args.read_ratios, args.busy_timeout_ms
+    ))
+
+
+if __name__ == '__main__':
+    main()
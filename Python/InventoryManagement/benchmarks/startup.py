@@ -0,0 +1,101 @@
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.common import temporary_database_url
+
+"""
+Startup benchmark of the source tree (python app.py) and the PyInstaller binary (dist/app, skipped when it has not been
+built), every run in a fresh process:
+
+- cold import: time to import app and call create_app() (source tree only)
+- time to first response: from starting the server process until GET /cache_stats answers, on a database prepared
+  beforehand with init-db
+
+Exits with status 1 when the median of any measurement exceeds its budget.
+
+    python -m benchmarks.startup --runs 5 --import-budget-ms 1000 --first-response-budget-ms 3000
+"""
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BINARY = os.path.join(APP_DIR, 'dist', 'app')
+
+IMPORT_SCRIPT = (
+    'import time; started = time.perf_counter(); import app; app.create_app(); '
+    'print(time.perf_counter() - started)'
+)
+
+
+def cold_import(env):
+    output = subprocess.run(
+        [sys.executable, '-c', IMPORT_SCRIPT], cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def first_response(command, env, timeout=30.0):
+    env = dict(env, INVENTORY_PORT=str(_free_port()))
+    url = f'http://127.0.0.1:{env["INVENTORY_PORT"]}/cache_stats'
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f'{" ".join(command)} exited with {server.returncode}')
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError(f'{" ".join(command)} did not respond within {timeout}s')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run(runs):
+    env = dict(os.environ, INVENTORY_DATABASE_URL=temporary_database_url('startup'))
+    targets = [('source', [sys.executable, 'app.py'])]
+    if os.path.exists(BINARY):
+        targets.append(('binary', [BINARY]))
+    else:
+        print(f'{BINARY} not found, skipping the binary (build it with `pyinstaller app.spec`)')
+
+    subprocess.run(targets[0][1] + ['init-db'], cwd=APP_DIR, env=env, check=True, capture_output=True)
+    results = {'source cold import': statistics.median(cold_import(env) for _ in range(runs))}
+    for name, command in targets:
+        results[f'{name} first response'] = statistics.median(first_response(command, env) for _ in range(runs))
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='App cold start benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='runs per measurement, the median is reported')
+    parser.add_argument('--import-budget-ms', type=float, default=1000)
+    parser.add_argument('--first-response-budget-ms', type=float, default=3000)
+    args = parser.parse_args(argv)
+
+    results, over_budget = run(args.runs), False
+    print(f'{"measurement":<32}{"median ms":>12}{"budget ms":>12}')
+    for name, seconds in results.items():
+        budget = args.import_budget_ms if name.endswith('cold import') else args.first_response_budget_ms
+        over_budget |= seconds * 1000 > budget
+        print(f'{name:<32}{seconds * 1000:>12.1f}{budget:>12.0f}{"  OVER BUDGET" if seconds * 1000 > budget else ""}')
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
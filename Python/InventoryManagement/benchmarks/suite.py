@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from datetime import timedelta
+
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from benchmarks.common import print_results, run_threaded, temporary_database_url
+from benchmarks.data_generator import generate
+
+"""
+Benchmark suite of InventoryManager methods (called directly) and app.py routes (through Flask test clients) at several
+data sizes and concurrency levels. Results (throughput, p50/p95/p99 latency per case) are saved as JSON and compared
+against a stored baseline, any case slower than the baseline by more than the tolerance fails the run. Baselines are
+machine specific, none is committed: without one the run fails until --update-baseline stores it.
+
+    python -m benchmarks.suite --sizes 1000 100000 --concurrency 1 8 --output results.json
+    python -m benchmarks.suite --update-baseline        # store results as the new baseline
+"""
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def direct_operations(data, session_factory):
+    from inventory_manager import InventoryManager
+
+    def inventory_manager():
+        return InventoryManager(session_factory())
+
+    return {
+        'create_purchase_order': lambda i: inventory_manager().create_purchase_order(**_order_kwargs(data, i)),
+        'receive_purchase_order': lambda i: inventory_manager().receive_purchase_order(**_receive_kwargs(data, i)),
+        'get_earliest_plant_order': lambda i: inventory_manager().get_earliest_plant_order(
+            data.plant_ids[i % len(data.plant_ids)]),
+        'get_purchase_order': lambda i: inventory_manager().get_purchase_order(
+            data.undelivered_orders[i % len(data.undelivered_orders)][0]),
+        'get_purchase_agreement': lambda i: inventory_manager().get_purchase_agreement(
+            data.agreements[i % len(data.agreements)][0]),
+    }
+
+
+def route_operations(app, data):
+    clients = {}
+
+    def post(path, body):
+        client = clients.setdefault(threading.get_ident(), app.test_client())
+        response = client.post(path, json=body)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{path} failed with {response.status_code}')
+
+    def order_request(i):
+        kwargs = _order_kwargs(data, i)
+        return {'agreement_id': kwargs['agreement_id'], 'order_date': str(kwargs['order_date']), 'quantity': 1}
+
+    def receive_request(i):
+        kwargs = _receive_kwargs(data, i)
+        return {'order_id': kwargs['order_id'], 'delivery_date': str(kwargs['delivery_date'])}
+
+    return {
+        'create_purchase_order': lambda i: post('/create_purchase_order', order_request(i)),
+        'receive_purchase_order': lambda i: post('/receive_purchase_order', receive_request(i)),
+        'get_earliest_plant_order': lambda i: post(
+            '/get_purchase_order', {'plant_id': data.plant_ids[i % len(data.plant_ids)]}),
+        'get_purchase_order': lambda i: post(
+            '/get_purchase_order', {'order_id': data.undelivered_orders[i % len(data.undelivered_orders)][0]}),
+        'get_purchase_agreement': lambda i: post(
+            '/get_purchase_agreement', {'agreement_id': data.agreements[i % len(data.agreements)][0]}),
+    }
+
+
+def _order_kwargs(data, i):
+    agreement_id, _, _, agreement_start, _ = data.agreements[i % len(data.agreements)]
+    return {'agreement_id': agreement_id, 'order_date': agreement_start, 'quantity': 1}
+
+
+def _receive_kwargs(data, i):
+    order_id, order_date = data.undelivered_orders[i % len(data.undelivered_orders)]
+    return {'order_id': order_id, 'delivery_date': order_date + timedelta(days=1)}
+
+
+def run(sizes, concurrency_levels, requests, plants, vendors, orders_per_agreement):
+    import migrations
+    from app import create_app
+
+    results = {}
+    for size in sizes:
+        app = create_app({'DATABASE_URL': temporary_database_url(f'suite-{size}')})
+        engine = app.extensions['inventory_engine']
+        # schema only, the generated plants and vendors replace the seeded reference data
+        migrations.upgrade(engine)
+        data = generate(
+            engine, plants=plants, vendors=vendors, agreements=max(1, size // orders_per_agreement), orders=size
+        )
+        session_factory = scoped_session(sessionmaker(bind=engine))
+
+        def direct(operation):
+            def call(i):
+                try:
+                    operation(i)
+                finally:
+                    session_factory.remove()
+            return call
+
+        targets = {
+            'direct': {name: direct(operation) for name, operation in
+                       direct_operations(data, session_factory).items()},
+            'route': route_operations(app, data),
+        }
+        for target, operations in targets.items():
+            for name, operation in operations.items():
+                for concurrency in concurrency_levels:
+                    results[f'{size}/{target}/{name}/c{concurrency}'] = run_threaded(operation, requests, concurrency)
+        engine.dispose()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a description of every case whose throughput dropped or p95 latency grew by more than tolerance
+    """
+    regressions = []
+    for case, result in sorted(results.items()):
+        expected = baseline.get(case)
+        if not expected:
+            continue
+        if result['throughput'] < expected['throughput'] * (1 - tolerance):
+            regressions.append(f'{case}: throughput {result["throughput"]:.1f} < baseline {expected["throughput"]:.1f}')
+        if result['p95_ms'] > expected['p95_ms'] * (1 + tolerance):
+            regressions.append(f'{case}: p95 {result["p95_ms"]:.2f}ms > baseline {expected["p95_ms"]:.2f}ms')
+        if result['errors'] > expected['errors']:
+            regressions.append(f'{case}: {result["errors"]} errors > baseline {expected["errors"]}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='InventoryManager and app.py benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 50000], help='number of orders')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--requests', type=int, default=200, help='requests per case')
+    parser.add_argument('--plants', type=int, default=10)
+    parser.add_argument('--vendors', type=int, default=10)
+    parser.add_argument('--orders-per-agreement', type=int, default=100)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='store results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown against baseline')
+    args = parser.parse_args(argv)
+
+    results = run(
+        args.sizes, args.concurrency, args.requests, args.plants, args.vendors, args.orders_per_agreement
+    )
+    print_results('Benchmark suite', sorted(results.items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'Baseline stored in {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --update-baseline to store one', file=sys.stderr)
+        return 1
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print(f'PERFORMANCE REGRESSION against {args.baseline}:', file=sys.stderr)
+        for regression in regressions:
+            print(f'  {regression}', file=sys.stderr)
+        return 1
+    print(f'No regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+import csv
+import itertools
+import json
+import os
+import time
+from functools import lru_cache
+from types import SimpleNamespace
+
+from sqlalchemy import bindparam, delete, func, insert, select, union_all, update
+
+import migrations  # noqa: F401 registers every model for create_all
+import rollups
+from api_requests import parse_date
+from inventory_manager import InventoryManager, PURCHASE_ORDER_VALIDATION_EXCEPTIONS, \
+    PurchaseOrderDeliveryOutsideAgreementDuration, PurchaseOrderValidationException
+from models.agreement import Agreement
+from models.archived_order import ArchivedOrder
+from models.database import Base
+from models.load_checkpoint import LoadCheckpoint
+from models.order import Order
+from models.plant_earliest_delivery import PlantEarliestDelivery
+
+"""
+Offline loader of historical agreements, orders and receipts (e.g. when moving to this system), much faster than
+going through InventoryManager one row and one commit at a time.
+
+Files are CSV with a header row or NDJSON (.ndjson/.jsonl), with the columns:
+
+- agreements: agreement_id, plant_id, vendor_id, start, end, quantity and optionally agreement_date
+- orders: order_id, agreement_id or vendor_id and plant_id, order_date, quantity and optionally delivery_date
+- receipts: order_id, delivery_date
+
+Files are read as streams in chunks of chunk_size rows, memory use depends on the chunk size only. Every chunk is
+checked with the InventoryManager rules: referenced agreements/orders of the whole chunk are read with one query per
+500 ids, cumulative ordered quantity is tracked per agreement. Valid rows go in with one Core executemany per table
+and the chunk is committed with its checkpoint (load_checkpoint). A load started again with the same files skips what
+was committed. Rejected rows are written to the rejects file (NDJSON, with row number and error) when one is given.
+
+While loading, SQLite runs with synchronous=OFF (a crash can lose the last chunks, never the checkpoint consistency),
+a larger page cache and in-memory temp storage, and the secondary indexes of agreement and order are dropped. They
+are built at the end, together with the rollups and plant_earliest_delivery, and the statistics (ANALYZE).
+Nothing else should write to the database during a load.
+"""
+
+KINDS = ('agreements', 'orders', 'receipts')
+# relaxed durability and larger caches for the loading connection, see https://www.sqlite.org/pragma.html
+LOAD_PRAGMAS = {'synchronous': 'OFF', 'cache_size': '-262144', 'temp_store': 'MEMORY'}
+# ids per IN (...) lookup, below the SQLite bound parameter limit of older versions (999)
+LOOKUP_BATCH_SIZE = 500
+
+RECEIPT_VALIDATION_EXCEPTIONS = (PurchaseOrderValidationException, PurchaseOrderDeliveryOutsideAgreementDuration)
+
+
+class LoadStatistics:
+    __slots__ = ('kind', 'rows', 'loaded', 'rejected', 'seconds')
+
+    def __init__(self, kind, rows=0, loaded=0, rejected=0):
+        self.kind = kind
+        self.rows = rows
+        self.loaded = loaded
+        self.rejected = rejected
+        self.seconds = 0.0
+
+    def __str__(self):
+        rate = self.rows / self.seconds if self.seconds else 0
+        return f'{self.kind}: {self.rows} rows ({self.loaded} loaded, {self.rejected} rejected), {rate:.0f} rows/s'
+
+
+class BulkLoader:
+
+    def __init__(self, engine, chunk_size=50000, rejects_path=None, defer_indexes=True, report=print):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.rejects_path = rejects_path
+        self.defer_indexes = defer_indexes
+        # called with a progress line after every chunk
+        self.report = report
+
+    def load(self, agreements=None, orders=None, receipts=None):
+        """
+        Loads the given files (paths) in dependency order, returns LoadStatistics per kind loaded
+        """
+        files = {'agreements': agreements, 'orders': orders, 'receipts': receipts}
+        statistics = {}
+        with self.engine.connect() as connection, open(self.rejects_path or os.devnull, 'a') as rejects:
+            with connection.begin():
+                Base.metadata.create_all(connection)
+            restore = self._relax_pragmas(connection)
+            try:
+                if self.defer_indexes:
+                    self._drop_indexes(connection)
+                for kind in KINDS:
+                    if files[kind]:
+                        statistics[kind] = self._load_file(connection, kind, files[kind], rejects)
+                self._finish(connection)
+            finally:
+                for name, value in restore.items():
+                    connection.exec_driver_sql(f'PRAGMA {name}={value}')
+        return statistics
+
+    def _load_file(self, connection, kind, path, rejects):
+        source = f'{kind}:{os.path.abspath(path)}'
+        table = LoadCheckpoint.__table__
+        checkpoint = connection.execute(select(table.c.rows, table.c.loaded, table.c.rejected).where(
+            table.c.source == source
+        )).first()
+        statistics = LoadStatistics(kind, *(checkpoint or ()))
+        if checkpoint:
+            self.report(f'{kind}: resuming {path} after row {statistics.rows}')
+
+        load_chunk = getattr(self, f'_load_{kind}')
+        rows = enumerate(itertools.islice(read_rows(path), statistics.rows, None), start=statistics.rows + 1)
+        started = time.perf_counter()
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            with connection.begin():
+                rejected = load_chunk(connection, chunk)
+                statistics.rows += len(chunk)
+                statistics.rejected += len(rejected)
+                statistics.loaded += len(chunk) - len(rejected)
+                _save_checkpoint(connection, source, statistics)
+            for row_number, row, error in rejected:
+                rejects.write(json.dumps({
+                    'kind': kind, 'row': row_number, 'data': row, 'error': getattr(error, 'message', str(error)),
+                    'error_type': type(error).__name__
+                }, default=str) + '\n')
+            statistics.seconds = time.perf_counter() - started
+            self.report(str(statistics))
+        return statistics
+
+    def _load_agreements(self, connection, chunk):
+        rows, rejected = {}, []
+        for row_number, row in chunk:
+            try:
+                start = _parse_date(row['start'])
+                parsed = {
+                    'agreement_id': int(row['agreement_id']), 'plant_id': int(row['plant_id']),
+                    'vendor_id': int(row['vendor_id']), 'agreement_start': start,
+                    'agreement_end': _parse_date(row['end']),
+                    'agreement_date': _date(row.get('agreement_date')) or start, 'quantity': int(row['quantity']),
+                    'consumed_quantity': 0,
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                rejected.append((row_number, row, e))
+                continue
+            rows[row_number] = (row, parsed)
+
+        table = Agreement.__table__
+        rejected += _duplicates(connection, rows, table.c.agreement_id, 'agreement_id')
+        if rows:
+            connection.execute(insert(table), [parsed for row, parsed in rows.values()])
+        return rejected
+
+    def _load_orders(self, connection, chunk):
+        rows, rejected = {}, []
+        for row_number, row in chunk:
+            try:
+                parsed = {
+                    'order_id': int(row['order_id']), 'agreement_id': _int(row.get('agreement_id')),
+                    'vendor_id': _int(row.get('vendor_id')), 'plant_id': _int(row.get('plant_id')),
+                    'order_date': _parse_date(row['order_date']), 'delivery_date': _date(row.get('delivery_date')),
+                    'quantity': int(row['quantity']),
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                rejected.append((row_number, row, e))
+                continue
+            rows[row_number] = (row, parsed)
+        rejected += _duplicates(connection, rows, Order.__table__.c.order_id, 'order_id')
+
+        agreement = Agreement.__table__
+        agreements = _lookup(connection, select(
+            agreement.c.agreement_id, agreement.c.plant_id, agreement.c.vendor_id, agreement.c.agreement_start,
+            agreement.c.agreement_end, agreement.c.quantity, agreement.c.consumed_quantity
+        ), agreement.c.agreement_id, {parsed['agreement_id'] for row, parsed in rows.values()} - {None})
+        consumed = {agreement_id: row.consumed_quantity for agreement_id, row in agreements.items()}
+        for row_number, (row, parsed) in list(rows.items()):
+            agreement_id = parsed['agreement_id']
+            referenced = agreements.get(agreement_id)
+            try:
+                InventoryManager._validate_purchase_order(
+                    parsed['quantity'], parsed['order_date'], agreement_id, parsed['vendor_id'], parsed['plant_id'],
+                    referenced, consumed.get(agreement_id, 0)
+                )
+                if parsed['delivery_date']:
+                    InventoryManager._validate_receipt(
+                        parsed['order_id'], parsed['delivery_date'], SimpleNamespace(**parsed), referenced
+                    )
+            except PURCHASE_ORDER_VALIDATION_EXCEPTIONS + RECEIPT_VALIDATION_EXCEPTIONS as e:
+                rejected.append((row_number, row, e))
+                del rows[row_number]
+                continue
+            if referenced:
+                consumed[agreement_id] += parsed['quantity']
+                parsed['plant_id'], parsed['vendor_id'] = referenced.plant_id, referenced.vendor_id
+
+        if rows:
+            connection.execute(insert(Order.__table__), [parsed for row, parsed in rows.values()])
+        consumed_deltas = [
+            {'b_agreement_id': agreement_id, 'b_quantity': quantity - agreements[agreement_id].consumed_quantity}
+            for agreement_id, quantity in consumed.items() if quantity != agreements[agreement_id].consumed_quantity
+        ]
+        if consumed_deltas:
+            connection.execute(update(agreement).where(agreement.c.agreement_id == bindparam('b_agreement_id')).values(
+                consumed_quantity=agreement.c.consumed_quantity + bindparam('b_quantity'),
+                version=agreement.c.version + 1
+            ), consumed_deltas)
+        return rejected
+
+    def _load_receipts(self, connection, chunk):
+        rows, rejected = {}, []
+        for row_number, row in chunk:
+            try:
+                rows[row_number] = (row, {
+                    'order_id': int(row['order_id']), 'delivery_date': _parse_date(row['delivery_date'])
+                })
+            except (KeyError, TypeError, ValueError) as e:
+                rejected.append((row_number, row, e))
+
+        order, agreement = Order.__table__, Agreement.__table__
+        orders = _lookup(connection, select(
+            order.c.order_id, order.c.order_date, agreement.c.agreement_start, agreement.c.agreement_end
+        ).select_from(order.outerjoin(agreement)), order.c.order_id, {
+            parsed['order_id'] for row, parsed in rows.values()
+        })
+        for row_number, (row, parsed) in list(rows.items()):
+            received = orders.get(parsed['order_id'])
+            try:
+                InventoryManager._validate_receipt(
+                    parsed['order_id'], parsed['delivery_date'], received,
+                    received if received is not None and received.agreement_start is not None else None
+                )
+            except RECEIPT_VALIDATION_EXCEPTIONS as e:
+                rejected.append((row_number, row, e))
+                del rows[row_number]
+
+        if rows:
+            connection.execute(update(order).where(order.c.order_id == bindparam('b_order_id')).values(
+                delivery_date=bindparam('b_delivery_date'), version=order.c.version + 1
+            ), [
+                {'b_order_id': parsed['order_id'], 'b_delivery_date': parsed['delivery_date']}
+                for row, parsed in rows.values()
+            ])
+        return rejected
+
+    def _finish(self, connection):
+        """
+        Builds the indexes and everything derived from the loaded rows
+        """
+        self.report('building indexes, rollups and statistics')
+        with connection.begin():
+            for table in (Agreement.__table__, Order.__table__):
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+            rollups.rebuild(connection)
+            _rebuild_plant_earliest_delivery(connection)
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('ANALYZE')
+
+    @staticmethod
+    def _relax_pragmas(connection):
+        """
+        Applies LOAD_PRAGMAS to the loading connection, returns the values to restore
+        """
+        if connection.dialect.name != 'sqlite':
+            return {}
+        restore = {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in LOAD_PRAGMAS}
+        for name, value in LOAD_PRAGMAS.items():
+            connection.exec_driver_sql(f'PRAGMA {name}={value}')
+        return restore
+
+    @staticmethod
+    def _drop_indexes(connection):
+        with connection.begin():
+            for table in (Agreement.__table__, Order.__table__):
+                for index in table.indexes:
+                    index.drop(connection, checkfirst=True)
+
+
+def read_rows(path):
+    """
+    Rows (dicts) of a CSV file with a header row, or of an NDJSON file (.ndjson/.jsonl), read lazily
+    """
+    with open(path, newline='') as source:
+        if path.endswith(('.ndjson', '.jsonl')):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(source)
+
+
+def _int(value):
+    return int(value) if value not in (None, '') else None
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value):
+    # history repeats the same few thousand dates, strptime is most of the cost of a row otherwise
+    return parse_date(value)
+
+
+def _date(value):
+    return _parse_date(value) if value not in (None, '') else None
+
+
+def _lookup(connection, statement, key, ids):
+    """
+    Rows of statement with key in ids, by key
+    """
+    ids, rows = sorted(ids), {}
+    for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        for row in connection.execute(statement.where(key.in_(ids[start:start + LOOKUP_BATCH_SIZE]))):
+            rows[row._mapping[key.name]] = row
+    return rows
+
+
+def _duplicates(connection, rows, key, name):
+    """
+    Removes rows (row number -> (row, parsed)) whose id exists already or repeats an earlier row of the chunk,
+    returns them as rejected
+    """
+    existing = set(_lookup(connection, select(key), key, {parsed[name] for row, parsed in rows.values()}))
+    rejected = []
+    for row_number, (row, parsed) in list(rows.items()):
+        if parsed[name] in existing:
+            rejected.append((row_number, row, ValueError(f'{name} {parsed[name]} exists already')))
+            del rows[row_number]
+        existing.add(parsed[name])
+    return rejected
+
+
+def _save_checkpoint(connection, source, statistics):
+    values = {'rows': statistics.rows, 'loaded': statistics.loaded, 'rejected': statistics.rejected}
+    table = LoadCheckpoint.__table__
+    if not connection.execute(update(table).where(table.c.source == source).values(values)).rowcount:
+        connection.execute(insert(table).values(source=source, **values))
+
+
+def _rebuild_plant_earliest_delivery(connection):
+    """
+    Earliest delivered order per plant, in orders and archived orders
+    """
+    delivered = union_all(*[
+        select(table.c.plant_id, table.c.order_id, table.c.delivery_date).where(
+            table.c.plant_id != None, table.c.delivery_date != None
+        ) for table in (Order.__table__, ArchivedOrder.__table__)
+    ]).subquery()
+    ranked = select(delivered, func.row_number().over(
+        partition_by=delivered.c.plant_id, order_by=(delivered.c.delivery_date, delivered.c.order_id)
+    ).label('rank')).subquery()
+    table = PlantEarliestDelivery.__table__
+    connection.execute(delete(table))
+    connection.execute(insert(table).from_select(['plant_id', 'order_id', 'delivery_date'], select(
+        ranked.c.plant_id, ranked.c.order_id, ranked.c.delivery_date
+    ).where(ranked.c.rank == 1)))
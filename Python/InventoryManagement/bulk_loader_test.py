@@ -0,0 +1,103 @@
+import json
+import os
+import unittest
+from datetime import date
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+
+import migrations
+import rollups
+from bulk_loader import BulkLoader
+from inventory_manager import InventoryManager
+from models.agreement import Agreement
+from models.database import make_engine
+from models.order import Order
+
+FILES = ('bulk_loader_test_agreements.csv', 'bulk_loader_test_orders.ndjson', 'bulk_loader_test_receipts.csv',
+         'bulk_loader_test_rejects.ndjson')
+
+
+class BulkLoaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = make_engine('sqlite:///bulk_loader_test.db', sqlite_journal_mode='WAL')
+        migrations.init_db(self.engine)
+        self.agreements, self.orders, self.receipts, self.rejects = FILES
+        with open(self.agreements, 'w') as agreements:
+            agreements.write('agreement_id,plant_id,vendor_id,start,end,quantity\n'
+                             '10,1,1,2020-01-01,2020-12-31,100\n'
+                             '11,1,1,2020-01-01,not a date,100\n')
+        with open(self.orders, 'w') as orders:
+            for order in [
+                {'order_id': 1, 'agreement_id': 10, 'order_date': '2020-02-01', 'quantity': 60},
+                {'order_id': 2, 'agreement_id': 10, 'order_date': '2020-02-01', 'quantity': 30,
+                 'delivery_date': '2020-02-05'},
+                # 60 + 30 + 20 exceeds the agreement quantity
+                {'order_id': 3, 'agreement_id': 10, 'order_date': '2020-03-01', 'quantity': 20},
+                {'order_id': 4, 'vendor_id': 1, 'plant_id': 1, 'order_date': '2019-01-01', 'quantity': 5},
+                {'order_id': 4, 'vendor_id': 1, 'plant_id': 1, 'order_date': '2019-01-01', 'quantity': 5},
+                {'order_id': 5, 'vendor_id': 1, 'order_date': '2019-01-01', 'quantity': 5},
+            ]:
+                orders.write(json.dumps(order) + '\n')
+        with open(self.receipts, 'w') as receipts:
+            receipts.write('order_id,delivery_date\n1,2020-03-01\n4,2019-01-10\n1,2021-06-01\n99,2020-01-01\n')
+        self.progress = []
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+        for file in FILES + ('bulk_loader_test.db', 'bulk_loader_test.db-wal', 'bulk_loader_test.db-shm'):
+            if os.path.exists(file):
+                os.remove(file)
+
+    def load(self, **kwargs):
+        return BulkLoader(self.engine, chunk_size=2, rejects_path=self.rejects, report=self.progress.append).load(
+            **kwargs
+        )
+
+    def test_load_validates_and_derives(self):
+        statistics = self.load(agreements=self.agreements, orders=self.orders, receipts=self.receipts)
+
+        self.assertEqual({kind: (value.rows, value.loaded, value.rejected) for kind, value in statistics.items()}, {
+            'agreements': (2, 1, 1), 'orders': (6, 3, 3), 'receipts': (4, 2, 2)
+        })
+        with open(self.rejects) as rejects:
+            rejected = [json.loads(line) for line in rejects]
+        self.assertEqual([(reject['kind'], reject['row'], reject['error_type']) for reject in rejected], [
+            ('agreements', 2, 'ValueError'),
+            ('orders', 3, 'OrderQuantityExceedsAgreementException'),
+            ('orders', 5, 'ValueError'),
+            ('orders', 6, 'PurchaseOrderValidationException'),
+            ('receipts', 3, 'PurchaseOrderDeliveryOutsideAgreementDuration'),
+            ('receipts', 4, 'PurchaseOrderValidationException'),
+        ])
+        self.assertIn('rows/s', self.progress[-2])
+
+        with Session(bind=self.engine) as session:
+            inventory_manager = InventoryManager(session)
+            self.assertEqual(session.get(Agreement, 10).consumed_quantity, 90)
+            self.assertEqual(session.get(Order, 1).delivery_date, date(2020, 3, 1))
+            self.assertEqual(inventory_manager.get_earliest_plant_order(1).order_id, 4)
+        with self.engine.connect() as connection:
+            self.assertEqual(rollups.check_consistency(connection), [])
+        # indexes are built at the end
+        self.assertIn('ix_order_plant_id_delivery_date', {index['name'] for index in inspect(self.engine).get_indexes(
+            'order')})
+
+    def test_load_resumes_after_checkpoint(self):
+        self.load(agreements=self.agreements, orders=self.orders)
+        with open(self.orders, 'a') as orders:
+            orders.write(json.dumps({'order_id': 6, 'agreement_id': 10, 'order_date': '2020-04-01', 'quantity': 10}))
+
+        statistics = self.load(orders=self.orders)
+
+        self.assertIn('resuming', self.progress[-3])
+        self.assertEqual((statistics['orders'].rows, statistics['orders'].loaded), (7, 4))
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(select(Order.order_id).order_by(Order.order_id)).scalars().all(),
+                             [1, 2, 4, 6])
+            self.assertEqual(connection.execute(select(Agreement.consumed_quantity)).scalar(), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
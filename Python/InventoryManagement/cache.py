@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+"""
+Bounded LRU + TTL cache for serialized (plain dict) lookups, shared by the request threads of an app
+"""
+
+
+class LRUTTLCache:
+
+    def __init__(self, max_size=10000, ttl_seconds=300, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by every write, a read-through fill started before a write is not stored as it may be stale
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def get_or_load(self, key, loader):
+        """
+        Returns cached value of key, or loads it with loader() and caches it unless the key was written meanwhile
+        """
+        with self._lock:
+            value = self._get(key)
+            if value is not None:
+                return value
+            writes = self._writes
+
+        value = loader()
+
+        with self._lock:
+            if writes == self._writes:
+                self._put(key, value)
+        return value
+
+    def put(self, key, value):
+        """
+        Stores the latest value of key after a write
+        """
+        with self._lock:
+            self._writes += 1
+            self._put(key, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._writes += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'expirations': self.expirations,
+            }
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _put(self, key, value):
+        self._entries[key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
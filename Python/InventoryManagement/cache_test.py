@@ -0,0 +1,89 @@
+import os
+import unittest
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from cache import LRUTTLCache
+from inventory_manager import InventoryManager
+from models.database import Base
+from models.plant import Plant
+from models.vendor import Vendor
+
+
+class LRUTTLCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0
+        self.cache = LRUTTLCache(max_size=2, ttl_seconds=10, clock=lambda: self.now)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.cache.put('c', 3)
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual((self.cache.get('a'), self.cache.get('c')), (1, 3))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_expires_after_ttl(self):
+        self.cache.put('a', 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_does_not_store_fill_raced_by_write(self):
+        def stale_loader():
+            # another request writes the key while this one is loading it
+            self.cache.put('a', 'new')
+            return 'old'
+
+        self.assertEqual(self.cache.get_or_load('a', stale_loader), 'old')
+        self.assertEqual(self.cache.get('a'), 'new')
+
+
+class InventoryManagerCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine('sqlite:///cache_test.db')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([Plant(plant_id=1, name='Plant A'), Vendor(vendor_id=1, name='Vendor A')])
+        self.session.commit()
+
+        self.cache = LRUTTLCache()
+        self.inventory_manager = InventoryManager(self.session, cache=self.cache)
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+
+        db_file = "cache_test.db"
+        if os.path.exists(db_file):
+            os.remove(db_file)
+
+    def test_reads_through_and_updates_on_writes(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=1, vendor_id=1, start=date.today(), end=date.today() + timedelta(days=365), quantity=150
+        )
+        order = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today(), agreement_id=agreement.agreement_id
+        )
+        self.cache.clear()
+
+        serialized = self.inventory_manager.get_serialized_purchase_order(order.order_id)
+        self.assertEqual(self.inventory_manager.get_serialized_purchase_order(order.order_id), serialized)
+        self.assertEqual((self.cache.stats()['misses'], self.cache.stats()['hits']), (1, 1))
+
+        self.inventory_manager.receive_purchase_order(order.order_id, delivery_date=date.today())
+        self.assertEqual(
+            self.inventory_manager.get_serialized_purchase_order(order.order_id)['delivery_date'],
+            date.today().strftime('%Y-%m-%d')
+        )
+        self.assertEqual(
+            self.inventory_manager.get_serialized_purchase_agreement(agreement.agreement_id), agreement.serialize()
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+
+
+class Config:
+    """
+    Default settings of the Inventory Management app, create_app(config) overrides any of them
+    """
+    DATABASE_URL = os.environ.get('INVENTORY_DATABASE_URL', 'sqlite:///inventory.db')
+    # log every SQL statement, only useful while debugging
+    SQL_ECHO = False
+
+    # connection pool sizing, a request holds a connection from its first query until teardown
+    DB_POOL_SIZE = int(os.environ.get('INVENTORY_DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('INVENTORY_DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('INVENTORY_DB_POOL_TIMEOUT', 30))
+
+    # WAL lets readers run concurrently with the writer, busy timeout makes writers wait for the lock instead of failing
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+
+    # read-through cache of serialized agreements/orders, shared by the request threads of a process
+    CACHE_ENABLED = True
+    CACHE_MAX_SIZE = 10000
+    CACHE_TTL_SECONDS = 300
+
+    # request/SQL/pool instrumentation served on /metrics, nothing is hooked in when disabled
+    METRICS_ENABLED = os.environ.get('INVENTORY_METRICS_ENABLED', '0') == '1'
+
+    # per request profiling (see profiling.py): a request is profiled when it sends the X-Inventory-Profile header
+    # with PROFILING_SECRET (which also authorizes /admin/profiles) or, with PROFILING_SAMPLE_RATE, at random. Sampled
+    # profiles are kept when the request took at least PROFILING_SLOW_MS
+    PROFILING_ENABLED = os.environ.get('INVENTORY_PROFILING_ENABLED', '0') == '1'
+    PROFILING_SECRET = os.environ.get('INVENTORY_PROFILING_SECRET', '')
+    PROFILING_SAMPLE_RATE = float(os.environ.get('INVENTORY_PROFILING_SAMPLE_RATE', 0))
+    PROFILING_SLOW_MS = float(os.environ.get('INVENTORY_PROFILING_SLOW_MS', 100))
+    PROFILING_DIRECTORY = os.environ.get('INVENTORY_PROFILING_DIRECTORY', 'profiles')
+    PROFILING_MAX_PROFILES = 100
+    PROFILING_SAMPLE_INTERVAL_MS = 1.0
+
+    # address `python app.py` (or dist/app) serves on
+    HOST = os.environ.get('INVENTORY_HOST', '127.0.0.1')
+    PORT = int(os.environ.get('INVENTORY_PORT', 5000))
+    # port and worker threads of `python grpc_service.py`
+    GRPC_PORT = int(os.environ.get('INVENTORY_GRPC_PORT', 50051))
+    GRPC_MAX_WORKERS = int(os.environ.get('INVENTORY_GRPC_MAX_WORKERS', 16))
+
+    # group commit: create/receive requests are queued to one writer thread which commits the operations of up to
+    # GROUP_COMMIT_MAX_DELAY_MS (or GROUP_COMMIT_MAX_BATCH_SIZE operations) in one transaction
+    GROUP_COMMIT_ENABLED = os.environ.get('INVENTORY_GROUP_COMMIT_ENABLED', '0') == '1'
+    GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get('INVENTORY_GROUP_COMMIT_MAX_DELAY_MS', 2))
+    GROUP_COMMIT_MAX_BATCH_SIZE = int(os.environ.get('INVENTORY_GROUP_COMMIT_MAX_BATCH_SIZE', 64))
+    # single writer (SQLite): every write goes through one writer thread and connection over a queue of up to
+    # SINGLE_WRITER_QUEUE_SIZE operations, requests read through read-only connections. A write waiting longer than
+    # SINGLE_WRITER_QUEUE_TIMEOUT_MS for room in the queue is answered 503. Writes are grouped as configured above
+    # when GROUP_COMMIT_ENABLED, else committed as soon as they are queued
+    SINGLE_WRITER_ENABLED = os.environ.get('INVENTORY_SINGLE_WRITER_ENABLED', '0') == '1'
+    SINGLE_WRITER_QUEUE_SIZE = int(os.environ.get('INVENTORY_SINGLE_WRITER_QUEUE_SIZE', 256))
+    SINGLE_WRITER_QUEUE_TIMEOUT_MS = float(os.environ.get('INVENTORY_SINGLE_WRITER_QUEUE_TIMEOUT_MS', 100))
+
+    # admission control (see admission.py): at most ADMISSION_*_CONCURRENCY write/read requests run at a time, others
+    # wait in a queue of up to ADMISSION_*_QUEUE_SIZE for ADMISSION_MAX_WAIT_MS and are rejected with 429/503 after that
+    ADMISSION_ENABLED = os.environ.get('INVENTORY_ADMISSION_ENABLED', '0') == '1'
+    ADMISSION_WRITE_CONCURRENCY = int(os.environ.get('INVENTORY_ADMISSION_WRITE_CONCURRENCY', 4))
+    ADMISSION_READ_CONCURRENCY = int(os.environ.get('INVENTORY_ADMISSION_READ_CONCURRENCY', 16))
+    ADMISSION_WRITE_QUEUE_SIZE = int(os.environ.get('INVENTORY_ADMISSION_WRITE_QUEUE_SIZE', 32))
+    ADMISSION_READ_QUEUE_SIZE = int(os.environ.get('INVENTORY_ADMISSION_READ_QUEUE_SIZE', 64))
+    ADMISSION_MAX_WAIT_MS = float(os.environ.get('INVENTORY_ADMISSION_MAX_WAIT_MS', 500))
+
+    # in-memory index of agreement durations per plant and vendor used to allocate orders to agreements, it reads the
+    # agreements created by other processes before every allocation. Without it allocation queries the agreements
+    AGREEMENT_INDEX_ENABLED = os.environ.get('INVENTORY_AGREEMENT_INDEX_ENABLED', '1') == '1'
+
+    # plant sharded storage (see sharding.py): one database url per shard, DATABASE_URL is not used when set.
+    # PLANT_SHARDS maps plant ids to shard indexes, other plants go to plant_id % number of shards
+    SHARD_DATABASE_URLS = [url for url in os.environ.get('INVENTORY_SHARD_DATABASE_URLS', '').split(',') if url]
+    PLANT_SHARDS = json.loads(os.environ.get('INVENTORY_PLANT_SHARDS', '{}'))
+    # threads reading shards in parallel for cross-shard reads, shared by all requests
+    SHARD_FAN_OUT_WORKERS = int(os.environ.get('INVENTORY_SHARD_FAN_OUT_WORKERS', 16))
@@ -0,0 +1,33 @@
+import csv
+import io
+
+from serializers import dumps_json
+
+"""
+Streaming formats for exports, each turns chunks (lists of serialized rows) into chunks of response text
+"""
+
+
+def ndjson_stream(chunks, columns):
+    for chunk in chunks:
+        yield b''.join(dumps_json(row) + b'\n' for row in chunk)
+
+
+def csv_stream(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# format -> (mimetype, stream)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_stream),
+    'csv': ('text/csv', csv_stream),
+}
@@ -0,0 +1,201 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date
+
+from inventory_manager import InventoryManager, PURCHASE_ORDER_VALIDATION_EXCEPTIONS, \
+    PurchaseOrderDeliveryOutsideAgreementDuration
+
+"""
+Group commit for InventoryManager writes. Request threads submit create/receive operations to a GroupCommitWriter
+and wait on a future. The writer thread collects the operations submitted within max_delay_ms (or up to
+max_batch_size of them), runs them one after the other on an InventoryManager that only flushes, so each one is
+validated against the writes before it, and commits them all in one transaction: one fsync for the whole group
+instead of one per operation.
+
+An operation failing validation fails only its own future, it has not written anything at that point. Any other
+error rolls the group back and its operations are retried one transaction each, so only the operation causing the
+error fails.
+
+With max_queue_size the queue is bounded: submit() waits up to queue_timeout_ms for room and raises WriterQueueFull
+after that, so callers shed load instead of queueing without bound. submit_read() queues a read that runs on the
+writer's connection after every operation queued before it has been committed (read your writes).
+"""
+
+# operations a GroupCommitWriter accepts -> cache key kind of their result
+OPERATIONS = {
+    'create_purchase_agreement': 'agreement',
+    'create_purchase_order': 'order',
+    'receive_purchase_order': 'order',
+    'allocate_purchase_order': 'order',
+    'create_purchase_orders': 'order',
+}
+
+# raised by the operations before they write anything
+OPERATION_EXCEPTIONS = PURCHASE_ORDER_VALIDATION_EXCEPTIONS + (PurchaseOrderDeliveryOutsideAgreementDuration,)
+
+_STOP = object()
+# operation of the queue items of submit_read()
+_READ = None
+
+
+class GroupCommitWriter:
+
+    def __init__(
+            self, session_factory, max_delay_ms=2.0, max_batch_size=64, cache=None, agreement_index=None,
+            max_queue_size=0, queue_timeout_ms=0.0
+    ):
+        self.session_factory = session_factory
+        self.max_delay = max_delay_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self.agreement_index = agreement_index
+        # 0 is unbounded
+        self._queue = queue.Queue(max_queue_size)
+        self.queue_timeout = queue_timeout_ms / 1000
+        self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, operation, **kwargs) -> Future:
+        """
+        Queues InventoryManager.<operation>(**kwargs), the future resolves to the serialized agreement/order once the
+        group it is part of committed, or raises the operation's error
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f'operation needs to be one of {", ".join(OPERATIONS)}')
+        return self._put(operation, kwargs)
+
+    def submit_read(self, function) -> Future:
+        """
+        Queues function(inventory_manager), the future resolves to its result (which should not hold on to ORM
+        objects) once every operation submitted before it is committed
+        """
+        return self._put(_READ, function)
+
+    def queue_size(self):
+        return self._queue.qsize()
+
+    def _put(self, operation, arguments):
+        future = Future()
+        try:
+            self._queue.put((operation, arguments, future), timeout=self.queue_timeout)
+        except queue.Full:
+            raise WriterQueueFull(f'{self._queue.maxsize} writes are queued already')
+        return future
+
+    def close(self):
+        """
+        Writes what is queued and stops the writer thread
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, deadline = [item], time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch):
+        writes = [item for item in batch if item[0] is not _READ]
+        if writes:
+            self._commit_group(writes)
+        for operation, function, future in batch:
+            if operation is _READ:
+                self._read(function, future)
+
+    def _commit_group(self, batch):
+        session = self.session_factory()
+        inventory_manager = InventoryManager(session, autocommit=False, agreement_index=self.agreement_index)
+        outcomes = []
+        try:
+            for operation, kwargs, future in batch:
+                try:
+                    result = serialize_result(getattr(inventory_manager, operation)(**kwargs))
+                except OPERATION_EXCEPTIONS as e:
+                    outcomes.append((operation, future, None, e))
+                else:
+                    outcomes.append((operation, future, result, None))
+            session.commit()
+        except Exception:
+            session.rollback()
+            session.close()
+            self._write_one_by_one(batch)
+            return
+        session.close()
+
+        for operation, future, result, error in outcomes:
+            self._complete(operation, future, result, error)
+
+    def _write_one_by_one(self, batch):
+        for operation, kwargs, future in batch:
+            session = self.session_factory()
+            try:
+                inventory_manager = InventoryManager(session, agreement_index=self.agreement_index)
+                result = serialize_result(getattr(inventory_manager, operation)(**kwargs))
+            except Exception as e:
+                session.rollback()
+                self._complete(operation, future, None, e)
+            else:
+                self._complete(operation, future, result, None)
+            finally:
+                session.close()
+
+    def _read(self, function, future):
+        session = self.session_factory()
+        try:
+            result = function(InventoryManager(session, agreement_index=self.agreement_index))
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            session.close()
+
+    def _complete(self, operation, future, result, error):
+        if error is not None:
+            future.set_exception(error)
+            return
+        if self.agreement_index is not None and operation == 'create_purchase_agreement':
+            # committed now, InventoryManager does not index agreements it only flushed
+            self.agreement_index.add(
+                result['agreement_id'], result['plant_id'], result['vendor_id'],
+                date.fromisoformat(result['agreement_start']), date.fromisoformat(result['agreement_end'])
+            )
+        if self.cache:
+            kind = OPERATIONS[operation]
+            # a serialized agreement/order, a list of orders or create_purchase_orders results
+            for item in result if isinstance(result, list) else [result]:
+                if 'error' not in item:
+                    entity = item.get('order', item)
+                    self.cache.put((kind, entity[f'{kind}_id']), entity)
+        future.set_result(result)
+
+
+def serialize_result(result):
+    """
+    Serialized result of an OPERATIONS method: an agreement/order, a list of orders or create_purchase_orders results
+    (serialized already)
+    """
+    if isinstance(result, list):
+        return [item if isinstance(item, dict) else item.serialize() for item in result]
+    return result.serialize()
+
+
+class WriterQueueFull(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
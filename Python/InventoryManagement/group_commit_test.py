@@ -0,0 +1,129 @@
+import os
+import threading
+import unittest
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from cache import LRUTTLCache
+from group_commit import GroupCommitWriter, WriterQueueFull
+from interval_index import AgreementIntervalIndex
+from inventory_manager import InventoryManager, OrderQuantityExceedsAgreementException
+from migrations import init_db
+from models.order import Order
+
+
+class GroupCommitWriterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine('sqlite:///group_commit_test.db')
+        init_db(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.commits = []
+        event.listen(self.Session, 'after_commit', lambda session: self.commits.append(session))
+
+        self.agreement = InventoryManager(self.Session()).create_purchase_agreement(
+            plant_id=1, vendor_id=1, start=date.today() - timedelta(days=30), end=date.today() + timedelta(days=30),
+            quantity=450
+        )
+        self.commits.clear()
+        self.cache = LRUTTLCache(max_size=100, ttl_seconds=60)
+        # long enough for every submit below to land in one group
+        self.writer = GroupCommitWriter(self.Session, max_delay_ms=200, max_batch_size=100, cache=self.cache)
+
+    def tearDown(self) -> None:
+        self.writer.close()
+        self.engine.dispose()
+
+        db_file = 'group_commit_test.db'
+        if os.path.exists(db_file):
+            os.remove(db_file)
+
+    def _submit_concurrently(self, requests):
+        futures = [None] * len(requests)
+
+        def submit(index):
+            operation, kwargs = requests[index]
+            futures[index] = self.writer.submit(operation, **kwargs)
+
+        threads = [threading.Thread(target=submit, args=(index,)) for index in range(len(requests))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return futures
+
+    def test_concurrent_writes_share_a_commit(self):
+        order = {'agreement_id': self.agreement.agreement_id, 'order_date': date.today(), 'quantity': 100}
+        futures = self._submit_concurrently([('create_purchase_order', order)] * 5)
+
+        results = [future.exception() or future.result() for future in futures]
+        orders = [result for result in results if isinstance(result, dict)]
+        errors = [result for result in results if isinstance(result, Exception)]
+        # the fifth order is validated against the four before it in the same group
+        self.assertEqual(len(orders), 4)
+        self.assertEqual([type(error) for error in errors], [OrderQuantityExceedsAgreementException])
+        self.assertEqual(len(self.commits), 1)
+        self.assertEqual(self.cache.get(('order', orders[0]['order_id'])), orders[0])
+
+        received = self.writer.submit(
+            'receive_purchase_order', order_id=orders[0]['order_id'], delivery_date=date.today()
+        ).result()
+        self.assertEqual(received['delivery_date'], date.today().strftime('%Y-%m-%d'))
+
+    def test_unexpected_error_fails_only_its_operation(self):
+        order = {'vendor_id': 1, 'plant_id': 1, 'order_date': date.today(), 'quantity': 10}
+        futures = self._submit_concurrently([
+            ('create_purchase_order', order), ('create_purchase_order', {'unknown': 1}),
+            ('create_purchase_order', order),
+        ])
+
+        self.assertIsInstance(futures[1].exception(), TypeError)
+        self.assertEqual(sum(1 for future in futures if future.exception() is None), 2)
+        with self.Session() as session:
+            self.assertEqual(session.query(Order).count(), 2)
+
+    def test_committed_agreements_are_indexed(self):
+        index = AgreementIntervalIndex()
+        writer = GroupCommitWriter(self.Session, max_delay_ms=0, agreement_index=index)
+        try:
+            agreement = writer.submit(
+                'create_purchase_agreement', plant_id=1, vendor_id=1, start=date(2023, 1, 1), end=date(2023, 12, 31),
+                quantity=10
+            ).result()
+        finally:
+            writer.close()
+        self.assertEqual(index.covering(1, 1, date(2023, 3, 1)), [agreement['agreement_id']])
+
+    def test_read_sees_writes_queued_before_it(self):
+        order = {'agreement_id': self.agreement.agreement_id, 'order_date': date.today(), 'quantity': 100}
+        write = self.writer.submit('create_purchase_order', **order)
+        read = self.writer.submit_read(
+            lambda inventory_manager: inventory_manager.get_agreement_utilization(self.agreement.agreement_id)
+        )
+
+        self.assertEqual(read.result()['ordered_quantity'], 100)
+        self.assertTrue(write.done())
+
+    def test_full_queue_rejects_submit(self):
+        writer = GroupCommitWriter(self.Session, max_delay_ms=0, max_queue_size=1, queue_timeout_ms=10)
+        started, release = threading.Event(), threading.Event()
+        try:
+            # keeps the writer thread busy
+            blocked = writer.submit_read(lambda inventory_manager: started.set() or release.wait())
+            started.wait()
+            queued = writer.submit('create_purchase_order', vendor_id=1, plant_id=1, order_date=date.today(),
+                                   quantity=10)
+
+            with self.assertRaises(WriterQueueFull):
+                writer.submit('create_purchase_order', vendor_id=1, plant_id=1, order_date=date.today(), quantity=10)
+            release.set()
+            self.assertTrue(blocked.result())
+            self.assertEqual(queued.result()['quantity'], 10)
+        finally:
+            release.set()
+            writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,315 @@
+import itertools
+import sys
+from concurrent import futures
+
+import grpc
+
+import inventory_pb2
+import inventory_pb2_grpc
+from api_requests import parse_date
+from config import Config
+from inventory_manager import InventoryManager, InvalidListRequestException, NoAgreementAvailableException, \
+    OrderQuantityExceedsAgreementException, PlantNotFoundException, PurchaseAgreementNotFound, \
+    PurchaseOrderDateOutsideAgreementDuration, PurchaseOrderDeliveryOutsideAgreementDuration, PurchaseOrderNotFound, \
+    PurchaseOrderValidationException
+
+"""
+InventoryManager served over gRPC (service and messages in protos/inventory.proto), for clients that need more
+throughput than JSON over one HTTP POST per call: messages are protobuf, calls share one HTTP/2 connection and bulk
+create/receive stream any number of orders in one call.
+
+A failing call ends with the gRPC status code of its exception (see ERRORS) and an ErrorDetail, naming the exception
+class, in the inventory-error-bin trailing metadata, error_detail() reads it on the client. The bulk create/receive
+calls commit every BULK_BATCH_SIZE orders and report failures per order instead: when a batch fails it is rolled
+back and its orders and the ones after it get an error result next to the results of the committed batches.
+
+The database is set up by `python app.py init-db`, the server runs with `python grpc_service.py`.
+"""
+
+# exception class -> (ErrorType, status code)
+ERRORS = {
+    PurchaseOrderValidationException: (inventory_pb2.PURCHASE_ORDER_VALIDATION, grpc.StatusCode.INVALID_ARGUMENT),
+    PlantNotFoundException: (inventory_pb2.PLANT_NOT_FOUND, grpc.StatusCode.NOT_FOUND),
+    OrderQuantityExceedsAgreementException: (
+        inventory_pb2.ORDER_QUANTITY_EXCEEDS_AGREEMENT, grpc.StatusCode.FAILED_PRECONDITION
+    ),
+    PurchaseOrderNotFound: (inventory_pb2.PURCHASE_ORDER_NOT_FOUND, grpc.StatusCode.NOT_FOUND),
+    PurchaseAgreementNotFound: (inventory_pb2.PURCHASE_AGREEMENT_NOT_FOUND, grpc.StatusCode.NOT_FOUND),
+    PurchaseOrderDateOutsideAgreementDuration: (
+        inventory_pb2.PURCHASE_ORDER_DATE_OUTSIDE_AGREEMENT_DURATION, grpc.StatusCode.INVALID_ARGUMENT
+    ),
+    PurchaseOrderDeliveryOutsideAgreementDuration: (
+        inventory_pb2.PURCHASE_ORDER_DELIVERY_OUTSIDE_AGREEMENT_DURATION, grpc.StatusCode.INVALID_ARGUMENT
+    ),
+    NoAgreementAvailableException: (inventory_pb2.NO_AGREEMENT_AVAILABLE, grpc.StatusCode.FAILED_PRECONDITION),
+    InvalidListRequestException: (inventory_pb2.INVALID_LIST_REQUEST, grpc.StatusCode.INVALID_ARGUMENT),
+}
+ERROR_TYPES_BY_NAME = {exception.__name__: error_type for exception, (error_type, _) in ERRORS.items()}
+ERROR_METADATA_KEY = 'inventory-error-bin'
+
+# orders created/received per transaction by the streaming bulk calls
+BULK_BATCH_SIZE = 500
+
+_UNSUPPORTED_ALLOCATION = {
+    'error': 'allocation_policy is not supported by CreatePurchaseOrders',
+    'error_type': PurchaseOrderValidationException.__name__
+}
+
+
+class InventoryServicer(inventory_pb2_grpc.InventoryServiceServicer):
+
+    def __init__(self, session_factory, cache=None, agreement_index=None):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.agreement_index = agreement_index
+
+    def CreatePurchaseAgreement(self, request, context):
+        return self._call(context, lambda inventory_manager: _agreement(inventory_manager.create_purchase_agreement(
+            request.plant_id, request.vendor_id, parse_date(request.start), parse_date(request.end), request.quantity
+        ).serialize()))
+
+    def GetPurchaseAgreement(self, request, context):
+        return self._call(context, lambda inventory_manager: _agreement(
+            inventory_manager.get_serialized_purchase_agreement(request.agreement_id)
+        ))
+
+    def CreatePurchaseOrder(self, request, context):
+        return self._call(context, lambda inventory_manager: _order(inventory_manager.create_purchase_order(
+            **_order_request(request),
+            allocation_policy=request.allocation_policy if request.HasField('allocation_policy') else None
+        ).serialize()))
+
+    def ReceivePurchaseOrder(self, request, context):
+        return self._call(context, lambda inventory_manager: _order(inventory_manager.receive_purchase_order(
+            request.order_id, delivery_date=parse_date(request.delivery_date)
+        ).serialize()))
+
+    def GetPurchaseOrder(self, request, context):
+        return self._call(context, lambda inventory_manager: _order(
+            inventory_manager.get_serialized_purchase_order(request.order_id)
+        ))
+
+    def GetEarliestPlantOrder(self, request, context):
+        return self._call(context, lambda inventory_manager: _order(
+            inventory_manager.get_earliest_plant_order(request.plant_id).serialize()
+        ))
+
+    def CreatePurchaseOrders(self, request_iterator, context):
+        results = []
+
+        def create(inventory_manager, requests):
+            # like the REST bulk route, a malformed item gets its own error and the rest of the stream is created
+            items = [
+                _UNSUPPORTED_ALLOCATION if request.HasField('allocation_policy') else _parsed(_order_request, request)
+                for request in requests
+            ]
+            created = iter(inventory_manager.create_purchase_orders([item for item in items if 'error' not in item]))
+            for item in items:
+                results.append(_order_result(item if 'error' in item else next(created)))
+
+        def create_in_batches(inventory_manager):
+            requests, batch = _items(request_iterator, 'orders'), []
+            try:
+                for request in requests:
+                    batch.append(request)
+                    if len(batch) == BULK_BATCH_SIZE:
+                        create(inventory_manager, batch)
+                        batch = []
+                if batch:
+                    create(inventory_manager, batch)
+            except Exception as e:
+                # earlier batches are committed, the client still gets their results and an error for the others
+                inventory_manager.session.rollback()
+                results.extend(_not_applied(e) for _ in itertools.chain(batch, requests))
+
+        self._call(context, create_in_batches)
+        return inventory_pb2.OrderResults(results=results)
+
+    def ReceivePurchaseOrders(self, request_iterator, context):
+        session = self.session_factory()
+        # flush only, every BULK_BATCH_SIZE receipts are committed together
+        inventory_manager = InventoryManager(session, autocommit=False)
+        requests, results, received = _items(request_iterator, 'receipts'), [], []
+        # results of the receipts since the last commit start at batch_start, read counts the receipts read so far
+        batch_start = read = 0
+        try:
+            for request in requests:
+                read += 1
+                receipt = _parsed(lambda r: {'delivery_date': parse_date(r.delivery_date)}, request)
+                if 'error' in receipt:
+                    results.append(_order_result(receipt))
+                    continue
+                try:
+                    order = inventory_manager.receive_purchase_order(request.order_id, **receipt).serialize()
+                except tuple(ERRORS) as e:
+                    # receive_purchase_order validates before it writes anything
+                    results.append(_order_result({'error': e.message, 'error_type': type(e).__name__}))
+                    continue
+                results.append(inventory_pb2.OrderResult(order=_order(order)))
+                received.append(order)
+                if len(received) == BULK_BATCH_SIZE:
+                    self._commit_receipts(session, received)
+                    batch_start = len(results)
+            self._commit_receipts(session, received)
+        except Exception as e:
+            # earlier batches are committed, the client still gets their results and an error for the receipts of the
+            # rolled back batch, the one that failed and the ones not read yet
+            session.rollback()
+            results[batch_start:] = [
+                _not_applied(e) if result.HasField('order') else result for result in results[batch_start:]
+            ]
+            results.extend(_not_applied(e) for _ in itertools.chain(range(read - len(results)), requests))
+        finally:
+            session.close()
+        return inventory_pb2.OrderResults(results=results)
+
+    def ListOrders(self, request, context):
+        filters = {
+            field: getattr(request, field) for field in ('plant_id', 'vendor_id', 'agreement_id', 'delivered')
+            if request.HasField(field)
+        }
+        session = self.session_factory()
+        try:
+            for field in ('order_date_from', 'order_date_to', 'delivery_date_from', 'delivery_date_to'):
+                if request.HasField(field):
+                    filters[field] = parse_date(getattr(request, field))
+            chunks = InventoryManager(session).iter_orders(chunk_size=request.chunk_size or 1000, **filters)
+            for chunk in chunks:
+                yield inventory_pb2.Orders(orders=[_order(row) for row in chunk])
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        finally:
+            session.close()
+
+    def _call(self, context, function):
+        """
+        function(inventory_manager) on a session of its own, InventoryManager exceptions end the call with their status
+        code and ErrorDetail
+        """
+        session = self.session_factory()
+        try:
+            return function(InventoryManager(session, cache=self.cache, agreement_index=self.agreement_index))
+        except tuple(ERRORS) as e:
+            session.rollback()
+            error_type, code = ERRORS[type(e)]
+            context.set_trailing_metadata((
+                (ERROR_METADATA_KEY, inventory_pb2.ErrorDetail(type=error_type, message=e.message).SerializeToString()),
+            ))
+            context.abort(code, e.message)
+        except ValueError as e:
+            # e.g. a malformed date
+            session.rollback()
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        finally:
+            session.close()
+
+    def _commit_receipts(self, session, received):
+        session.commit()
+        if self.cache:
+            for order in received:
+                self.cache.put(('order', order['order_id']), order)
+        received.clear()
+
+
+def error_detail(rpc_error):
+    """
+    ErrorDetail of a failed call (grpc.RpcError), None when the server did not send one
+    """
+    for key, value in rpc_error.trailing_metadata() or ():
+        if key == ERROR_METADATA_KEY:
+            return inventory_pb2.ErrorDetail.FromString(value)
+    return None
+
+
+def create_server(config=None):
+    """
+    gRPC server (not started) of the database in config, a dict overriding settings of config.Config like
+    app.create_app(). Returns (server, port)
+    """
+    from sqlalchemy.orm import sessionmaker
+
+    from models.database import make_engine_from_config
+
+    settings = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+    settings.update(config or {})
+    if settings['SHARD_DATABASE_URLS']:
+        raise ValueError('the gRPC service does not support sharded storage')
+
+    cache = agreement_index = None
+    if settings['CACHE_ENABLED']:
+        from cache import LRUTTLCache
+        cache = LRUTTLCache(max_size=settings['CACHE_MAX_SIZE'], ttl_seconds=settings['CACHE_TTL_SECONDS'])
+    if settings['AGREEMENT_INDEX_ENABLED']:
+        from interval_index import AgreementIntervalIndex
+        agreement_index = AgreementIntervalIndex()
+
+    engine = make_engine_from_config(settings)
+    server = grpc.server(futures.ThreadPoolExecutor(settings['GRPC_MAX_WORKERS']))
+    inventory_pb2_grpc.add_InventoryServiceServicer_to_server(
+        InventoryServicer(sessionmaker(bind=engine), cache=cache, agreement_index=agreement_index), server
+    )
+    port = server.add_insecure_port(f'{settings["HOST"]}:{settings["GRPC_PORT"]}')
+    return server, port
+
+
+def main(argv=None):
+    server, port = create_server()
+    server.start()
+    print(f'Serving InventoryService on port {port}')
+    server.wait_for_termination()
+
+
+def _items(request_iterator, field):
+    for requests in request_iterator:
+        yield from getattr(requests, field)
+
+
+def _order_request(request):
+    return {
+        'agreement_id': request.agreement_id if request.HasField('agreement_id') else None,
+        'vendor_id': request.vendor_id if request.HasField('vendor_id') else None,
+        'plant_id': request.plant_id if request.HasField('plant_id') else None,
+        'order_date': parse_date(request.order_date),
+        'quantity': request.quantity,
+    }
+
+
+def _parsed(parse, request):
+    """
+    parse(request), or the error result of a request it can not parse
+    """
+    try:
+        return parse(request)
+    except (TypeError, ValueError) as e:
+        return {
+            'error': f'invalid purchase order request: {e!r}',
+            'error_type': PurchaseOrderValidationException.__name__
+        }
+
+
+def _not_applied(exception):
+    return _order_result({
+        'error': f'not applied, its batch failed: {exception!r}', 'error_type': type(exception).__name__
+    })
+
+
+def _agreement(agreement):
+    return inventory_pb2.Agreement(**agreement)
+
+
+def _order(order):
+    # serialized orders and exported rows have the fields of the Order message, None for unset optional fields
+    return inventory_pb2.Order(**{field: value for field, value in order.items() if value is not None})
+
+
+def _order_result(result):
+    if 'order' in result:
+        return inventory_pb2.OrderResult(order=_order(result['order']))
+    return inventory_pb2.OrderResult(error=inventory_pb2.ErrorDetail(
+        type=ERROR_TYPES_BY_NAME.get(result['error_type'], inventory_pb2.ERROR_TYPE_UNSPECIFIED),
+        message=result['error']
+    ))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
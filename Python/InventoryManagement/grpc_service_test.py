@@ -0,0 +1,164 @@
+import os
+import unittest
+from unittest import mock
+
+import grpc
+from sqlalchemy.exc import OperationalError
+
+import inventory_pb2
+import inventory_pb2_grpc
+from app import create_app, init_db
+import grpc_service
+from grpc_service import create_server, error_detail
+from inventory_manager import InventoryManager
+
+DB_FILES = ['grpc_service_test.db', 'grpc_service_test.db-wal', 'grpc_service_test.db-shm']
+
+
+class InventoryServiceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        config = {'DATABASE_URL': 'sqlite:///grpc_service_test.db', 'GRPC_PORT': 0, 'CACHE_ENABLED': False}
+        app = create_app(config)
+        init_db(app)
+        app.extensions['inventory_engine'].dispose()
+
+        self.server, port = create_server(config)
+        self.server.start()
+        self.channel = grpc.insecure_channel(f'127.0.0.1:{port}')
+        self.stub = inventory_pb2_grpc.InventoryServiceStub(self.channel)
+        self.agreement = self.stub.CreatePurchaseAgreement(inventory_pb2.CreatePurchaseAgreementRequest(
+            plant_id=1, vendor_id=1, start='2023-01-01', end='2023-12-31', quantity=1000
+        ))
+
+    def tearDown(self) -> None:
+        self.channel.close()
+        self.server.stop(None)
+        for db_file in DB_FILES:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_unary_calls_and_error_details(self):
+        order = self.stub.CreatePurchaseOrder(inventory_pb2.CreatePurchaseOrderRequest(
+            agreement_id=self.agreement.agreement_id, order_date='2023-02-01', quantity=100
+        ))
+        self.assertEqual((order.plant_id, order.vendor_id, order.HasField('delivery_date')), (1, 1, False))
+        received = self.stub.ReceivePurchaseOrder(inventory_pb2.ReceivePurchaseOrderRequest(
+            order_id=order.order_id, delivery_date='2023-02-05'
+        ))
+        self.assertEqual(received.delivery_date, '2023-02-05')
+        self.assertEqual(self.stub.GetEarliestPlantOrder(inventory_pb2.GetEarliestPlantOrderRequest(plant_id=1)),
+                         received)
+        self.assertEqual(self.stub.GetPurchaseAgreement(inventory_pb2.GetPurchaseAgreementRequest(
+            agreement_id=self.agreement.agreement_id
+        )), self.agreement)
+
+        with self.assertRaises(grpc.RpcError) as raised:
+            self.stub.CreatePurchaseOrder(inventory_pb2.CreatePurchaseOrderRequest(
+                agreement_id=self.agreement.agreement_id, order_date='2023-02-01', quantity=1000
+            ))
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.FAILED_PRECONDITION)
+        self.assertEqual(error_detail(raised.exception).type, inventory_pb2.ORDER_QUANTITY_EXCEEDS_AGREEMENT)
+
+        with self.assertRaises(grpc.RpcError) as raised:
+            self.stub.GetPurchaseOrder(inventory_pb2.GetPurchaseOrderRequest(order_id=order.order_id + 1))
+        self.assertEqual(raised.exception.code(), grpc.StatusCode.NOT_FOUND)
+        self.assertEqual(error_detail(raised.exception).type, inventory_pb2.PURCHASE_ORDER_NOT_FOUND)
+
+    def test_streaming_calls(self):
+        requests = [
+            inventory_pb2.CreatePurchaseOrderRequest(
+                agreement_id=self.agreement.agreement_id, order_date='2023-02-01', quantity=10
+            ) for _ in range(5)
+        ] + [
+            inventory_pb2.CreatePurchaseOrderRequest(
+                agreement_id=self.agreement.agreement_id, order_date='2022-02-01', quantity=10
+            ),
+            inventory_pb2.CreatePurchaseOrderRequest(vendor_id=1, plant_id=1, order_date='2023-02-01', quantity=10),
+        ]
+        results = self.stub.CreatePurchaseOrders(iter([
+            inventory_pb2.CreatePurchaseOrderRequests(orders=requests[:4]),
+            inventory_pb2.CreatePurchaseOrderRequests(orders=requests[4:]),
+        ])).results
+        self.assertEqual([result.WhichOneof('result') for result in results], ['order'] * 5 + ['error', 'order'])
+        self.assertEqual(results[5].error.type, inventory_pb2.PURCHASE_ORDER_DATE_OUTSIDE_AGREEMENT_DURATION)
+        order_ids = [result.order.order_id for result in results if result.HasField('order')]
+
+        receipts = self.stub.ReceivePurchaseOrders(iter([inventory_pb2.ReceivePurchaseOrderRequests(receipts=[
+            inventory_pb2.ReceivePurchaseOrderRequest(order_id=order_id, delivery_date='2023-02-03')
+            for order_id in order_ids[:3] + [order_ids[-1] + 1]
+        ])])).results
+        self.assertEqual([result.order.delivery_date for result in receipts[:3]], ['2023-02-03'] * 3)
+        self.assertEqual(receipts[3].error.type, inventory_pb2.PURCHASE_ORDER_VALIDATION)
+
+        chunks = list(self.stub.ListOrders(inventory_pb2.ListOrdersRequest(delivered=False, chunk_size=2)))
+        self.assertEqual([len(chunk.orders) for chunk in chunks], [2, 1])
+        self.assertEqual([order.order_id for chunk in chunks for order in chunk.orders], order_ids[3:])
+
+    def test_malformed_items_fail_alone(self):
+        order = inventory_pb2.CreatePurchaseOrderRequest(
+            agreement_id=self.agreement.agreement_id, order_date='2023-02-01', quantity=10
+        )
+        malformed = inventory_pb2.CreatePurchaseOrderRequest(agreement_id=self.agreement.agreement_id, quantity=10)
+        results = self.stub.CreatePurchaseOrders(iter([
+            inventory_pb2.CreatePurchaseOrderRequests(orders=[order, order]),
+            inventory_pb2.CreatePurchaseOrderRequests(orders=[malformed, order]),
+        ])).results
+        self.assertEqual([result.WhichOneof('result') for result in results], ['order', 'order', 'error', 'order'])
+        self.assertEqual(results[2].error.type, inventory_pb2.PURCHASE_ORDER_VALIDATION)
+
+        receipts = self.stub.ReceivePurchaseOrders(iter([inventory_pb2.ReceivePurchaseOrderRequests(receipts=[
+            inventory_pb2.ReceivePurchaseOrderRequest(order_id=results[0].order.order_id, delivery_date='2023-02-31'),
+            inventory_pb2.ReceivePurchaseOrderRequest(order_id=results[1].order.order_id, delivery_date='2023-02-03'),
+        ])])).results
+        self.assertEqual([result.WhichOneof('result') for result in receipts], ['error', 'order'])
+        self.assertEqual(receipts[0].error.type, inventory_pb2.PURCHASE_ORDER_VALIDATION)
+        self.assertFalse(self.stub.GetPurchaseOrder(
+            inventory_pb2.GetPurchaseOrderRequest(order_id=results[0].order.order_id)
+        ).HasField('delivery_date'))
+
+    def test_failed_batch_reported_per_item(self):
+        order = inventory_pb2.CreatePurchaseOrderRequest(
+            agreement_id=self.agreement.agreement_id, order_date='2023-02-01', quantity=10
+        )
+        create_purchase_orders, calls = InventoryManager.create_purchase_orders, []
+
+        def fail_second_batch(inventory_manager, batch):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise OperationalError('INSERT', {}, Exception('disk I/O error'))
+            return create_purchase_orders(inventory_manager, batch)
+
+        with mock.patch.object(grpc_service, 'BULK_BATCH_SIZE', 2), \
+                mock.patch.object(InventoryManager, 'create_purchase_orders', fail_second_batch):
+            results = self.stub.CreatePurchaseOrders(iter([
+                inventory_pb2.CreatePurchaseOrderRequests(orders=[order] * 5)
+            ])).results
+        self.assertEqual([result.WhichOneof('result') for result in results], ['order'] * 2 + ['error'] * 3)
+        self.assertIn('disk I/O error', results[2].error.message)
+        order_ids = [result.order.order_id for result in results[:2]] + [
+            self.stub.CreatePurchaseOrder(order).order_id for _ in range(3)
+        ]
+
+        receive_purchase_order, received = InventoryManager.receive_purchase_order, []
+
+        def fail_fourth_receipt(inventory_manager, order_id, **kwargs):
+            received.append(order_id)
+            if len(received) == 4:
+                raise OperationalError('UPDATE', {}, Exception('disk I/O error'))
+            return receive_purchase_order(inventory_manager, order_id, **kwargs)
+
+        with mock.patch.object(grpc_service, 'BULK_BATCH_SIZE', 2), \
+                mock.patch.object(InventoryManager, 'receive_purchase_order', fail_fourth_receipt):
+            receipts = self.stub.ReceivePurchaseOrders(iter([inventory_pb2.ReceivePurchaseOrderRequests(receipts=[
+                inventory_pb2.ReceivePurchaseOrderRequest(order_id=order_id, delivery_date='2023-02-03')
+                for order_id in order_ids
+            ])])).results
+        # the second batch (3rd and 4th receipts) is rolled back, the 5th is not applied either
+        self.assertEqual([result.WhichOneof('result') for result in receipts], ['order'] * 2 + ['error'] * 3)
+        self.assertEqual([self.stub.GetPurchaseOrder(inventory_pb2.GetPurchaseOrderRequest(
+            order_id=order_id
+        )).HasField('delivery_date') for order_id in order_ids], [True, True, False, False, False])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import random
+import threading
+
+"""
+In-memory index of agreement durations per (plant_id, vendor_id), answering "which agreements of this plant and vendor
+cover this date" for automatic agreement allocation (InventoryManager.allocate_purchase_order) without reading every
+agreement of the vendor.
+
+The agreements of a (plant, vendor) are the nodes of a treap (a randomized balanced binary search tree) keyed on
+(agreement_start, agreement_id), every node also holding the largest agreement_end of its subtree. Adding an agreement
+is an O(log n) insert that updates the maximum ends along its path only. A lookup descends only into subtrees whose
+maximum end reaches the date and stops at nodes starting after it, so it costs O(log n) per agreement returned: the
+agreements of a (plant, vendor) that do not cover the date are skipped whole subtrees at a time, however long ago
+they expired and however long a single agreement runs. Reads and writes take the index lock.
+"""
+
+
+class _Node:
+    __slots__ = ('key', 'agreement_end', 'priority', 'max_end', 'left', 'right')
+
+    def __init__(self, agreement_start, agreement_id, agreement_end):
+        self.key = (agreement_start, agreement_id)
+        self.agreement_end = agreement_end
+        self.priority = random.random()
+        self.max_end = agreement_end
+        self.left = None
+        self.right = None
+
+
+class AgreementIntervalIndex:
+
+    def __init__(self):
+        # (plant_id, vendor_id) -> {agreement_id: (agreement_start, agreement_end)}
+        self._agreements = {}
+        # (plant_id, vendor_id) -> root _Node of the treap of its agreements
+        self._roots = {}
+        # largest agreement id read by refresh(), see InventoryManager._refreshed_agreement_index
+        self.last_agreement_id = 0
+        self._lock = threading.Lock()
+
+    def add(self, agreement_id, plant_id, vendor_id, agreement_start, agreement_end):
+        self.add_all([(agreement_id, plant_id, vendor_id, agreement_start, agreement_end)])
+
+    def add_all(self, agreements):
+        """
+        Adds (agreement_id, plant_id, vendor_id, agreement_start, agreement_end) tuples, adding an agreement again
+        replaces it
+        """
+        with self._lock:
+            for agreement_id, plant_id, vendor_id, agreement_start, agreement_end in agreements:
+                key = (plant_id, vendor_id)
+                durations = self._agreements.setdefault(key, {})
+                root = self._roots.get(key)
+                if agreement_id in durations:
+                    root = _delete(root, (durations[agreement_id][0], agreement_id))
+                durations[agreement_id] = (agreement_start, agreement_end)
+                self._roots[key] = _insert(root, _Node(agreement_start, agreement_id, agreement_end))
+
+    def refresh(self, agreements):
+        """
+        Adds agreements like add_all and records the largest agreement id seen, agreements should be every agreement
+        with an id above last_agreement_id
+        """
+        agreements = list(agreements)
+        self.add_all(agreements)
+        with self._lock:
+            self.last_agreement_id = max([self.last_agreement_id] + [agreement[0] for agreement in agreements])
+
+    def covering(self, plant_id, vendor_id, on_date) -> list:
+        """
+        Ids of the agreements of plant_id and vendor_id whose duration covers on_date (inclusive), by start
+        """
+        agreement_ids = []
+        with self._lock:
+            _covering(self._roots.get((plant_id, vendor_id)), on_date, agreement_ids)
+        return agreement_ids
+
+    def __len__(self):
+        return sum(len(agreements) for agreements in self._agreements.values())
+
+
+def _update(node):
+    node.max_end = node.agreement_end
+    for child in (node.left, node.right):
+        if child is not None and child.max_end > node.max_end:
+            node.max_end = child.max_end
+
+
+def _split(node, key):
+    """
+    (nodes with keys below key, the others) of the subtree of node
+    """
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    """
+    Treap of the subtrees left and right, every key of left is below the keys of right
+    """
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _insert(node, new):
+    if node is None:
+        return new
+    if new.priority > node.priority:
+        new.left, new.right = _split(node, new.key)
+        _update(new)
+        return new
+    if new.key < node.key:
+        node.left = _insert(node.left, new)
+    else:
+        node.right = _insert(node.right, new)
+    _update(node)
+    return node
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    if node.key == key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    _update(node)
+    return node
+
+
+def _covering(node, on_date, agreement_ids):
+    # subtrees ending before on_date are skipped whole, so are the nodes right of one starting after it
+    while node is not None and node.max_end >= on_date:
+        _covering(node.left, on_date, agreement_ids)
+        if node.key[0] > on_date:
+            return
+        if node.agreement_end >= on_date:
+            agreement_ids.append(node.key[1])
+        node = node.right
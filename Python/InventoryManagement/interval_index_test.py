@@ -0,0 +1,125 @@
+import os
+import random
+import time
+import unittest
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from interval_index import AgreementIntervalIndex
+from inventory_manager import InventoryManager, NoAgreementAvailableException
+from migrations import init_db
+
+
+class AgreementIntervalIndexTest(unittest.TestCase):
+    def test_covering_matches_scan(self):
+        start_of_year, rng = date(2023, 1, 1), random.Random(7)
+        agreements = []
+        for agreement_id in range(1, 501):
+            start = start_of_year + timedelta(days=rng.randrange(365))
+            agreements.append((agreement_id, rng.randrange(1, 3), 1, start, start + timedelta(days=rng.randrange(90))))
+        index = AgreementIntervalIndex()
+        index.add_all(agreements[:250])
+        for agreement in agreements[250:]:
+            index.add(*agreement)
+        self.assertEqual(len(index), 500)
+
+        for day in range(0, 460, 3):
+            on_date = start_of_year + timedelta(days=day)
+            for plant_id in (1, 2):
+                self.assertEqual(sorted(index.covering(plant_id, 1, on_date)), [
+                    agreement_id for agreement_id, agreement_plant_id, _, start, end in agreements
+                    if agreement_plant_id == plant_id and start <= on_date <= end
+                ])
+        self.assertEqual(index.covering(3, 1, start_of_year), [])
+
+    def test_adding_again_replaces(self):
+        index = AgreementIntervalIndex()
+        index.add(1, 1, 1, date(2023, 1, 1), date(2023, 1, 31))
+        index.add(1, 1, 1, date(2023, 2, 1), date(2023, 2, 28))
+        self.assertEqual(index.covering(1, 1, date(2023, 1, 15)), [])
+        self.assertEqual(index.covering(1, 1, date(2023, 2, 15)), [1])
+        self.assertEqual(len(index), 1)
+
+    def test_costs_do_not_grow_with_the_index(self):
+        first_day = date(1900, 1, 1)
+
+        def short_agreements(first_id, count):
+            # one starting every day, lasting 5 days
+            return [(agreement_id, 1, 1, first_day + timedelta(days=agreement_id),
+                     first_day + timedelta(days=agreement_id + 4)) for agreement_id in range(first_id, first_id + count)]
+
+        def timings(size):
+            # one agreement running for centuries and size short ones, all of the same plant and vendor
+            index = AgreementIntervalIndex()
+            index.add(1, 1, 1, date(1800, 1, 1), date(2200, 1, 1))
+            index.add_all(short_agreements(2, size))
+            started = time.perf_counter()
+            for agreement in short_agreements(size + 2, 200):
+                index.add(*agreement)
+            adding = time.perf_counter() - started
+            started = time.perf_counter()
+            for day in range(200):
+                # 6 agreements cover each of the latest days, whatever the size
+                self.assertEqual(len(index.covering(1, 1, first_day + timedelta(days=size + day))), 6)
+            return adding, time.perf_counter() - started
+
+        small = [min(run) for run in zip(*(timings(500) for _ in range(3)))]
+        large = [min(run) for run in zip(*(timings(40000) for _ in range(3)))]
+        # logarithmic costs grow by less than 2x for an 80x larger index, costs linear in its size by far more
+        self.assertLess(large[0], small[0] * 5)
+        self.assertLess(large[1], small[1] * 5)
+
+
+class InventoryManagerAllocationTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine('sqlite:///interval_index_test.db')
+        init_db(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.index = AgreementIntervalIndex()
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        if os.path.exists('interval_index_test.db'):
+            os.remove('interval_index_test.db')
+
+    def test_index_reads_agreements_created_elsewhere(self):
+        with self.Session() as session:
+            # e.g. by another process, this index is not told about it
+            InventoryManager(session).create_purchase_agreement(
+                plant_id=1, vendor_id=1, start=date(2023, 1, 1), end=date(2023, 12, 31), quantity=100
+            )
+        with self.Session() as session:
+            inventory_manager = InventoryManager(session, agreement_index=self.index)
+            later = inventory_manager.create_purchase_agreement(
+                plant_id=1, vendor_id=1, start=date(2023, 1, 1), end=date(2023, 6, 30), quantity=100
+            )
+            orders = inventory_manager.allocate_purchase_order(
+                150, 1, 1, order_date=date(2023, 3, 1), allocation_policy='split'
+            )
+            self.assertEqual([(order.agreement_id, order.quantity) for order in orders],
+                             [(later.agreement_id, 100), (1, 50)])
+        self.assertEqual((len(self.index), self.index.last_agreement_id), (2, 2))
+
+    def test_rolled_back_agreement_not_allocated_to(self):
+        with self.Session() as session:
+            InventoryManager(session, autocommit=False, agreement_index=self.index).create_purchase_agreement(
+                plant_id=1, vendor_id=1, start=date(2023, 1, 1), end=date(2023, 12, 31), quantity=100
+            )
+            session.rollback()
+        self.assertEqual(len(self.index), 0)
+        # a stale entry (e.g. left by an older process) for the id the next agreement gets
+        self.index.add(1, 1, 1, date(2023, 1, 1), date(2023, 12, 31))
+        with self.Session() as session:
+            inventory_manager = InventoryManager(session, agreement_index=self.index)
+            reused = inventory_manager.create_purchase_agreement(
+                plant_id=2, vendor_id=1, start=date(2030, 1, 1), end=date(2030, 12, 31), quantity=100
+            )
+            self.assertEqual(reused.agreement_id, 1)
+            with self.assertRaises(NoAgreementAvailableException):
+                inventory_manager.allocate_purchase_order(10, 1, 1, order_date=date(2023, 3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,20 @@
+import base64
+import binascii
+import json
 from datetime import date
 
+from sqlalchemy import select, union_all
+
+import rollups
+from serializers import serialize_rows
 from models.agreement import Agreement
+from models.agreement_utilization import AgreementUtilization
+from models.archived_agreement import ArchivedAgreement
+from models.archived_order import ArchivedOrder
 from models.order import Order
+from models.plant_daily_delivery import PlantDailyDelivery
+from models.plant_earliest_delivery import PlantEarliestDelivery
+from models.vendor_open_quantity import VendorOpenQuantity
 
 """
 In practice, would like to implement this class as following
@@ -11,46 +24,536 @@ In practice, would like to implement this class as following
  to communicate
 4. Details of errors (currently raised in methods below) from gRPC endpoints will be set in the gRPC context so that
  REST handlers can except/catch them appropriately   
+
+grpc_service.py now serves InventoryManager over gRPC as in 1, 3 and 4 (protos/inventory.proto), the REST handlers
+still call InventoryManager in process, which saves them the extra hop.
 """
 
 
 class InventoryManager:
 
-    def __init__(self, session):
+    def __init__(self, session, cache=None, autocommit=True, id_allocator=None, agreement_index=None):
         self.session = session
+        # optional LRUTTLCache of serialized agreements/orders, shared across InventoryManager instances
+        self.cache = cache
+        # with autocommit=False write methods only flush, the caller commits (see group_commit.GroupCommitWriter)
+        self.autocommit = autocommit
+        # optional callable(session, id column, count) -> ids for that many new rows, by default the database assigns
+        # them (see sharding.ShardIdAllocator)
+        self.id_allocator = id_allocator
+        # optional interval_index.AgreementIntervalIndex shared across InventoryManager instances, finds the agreements
+        # to allocate orders to without scanning the agreements of the vendor
+        self.agreement_index = agreement_index
 
     def create_purchase_agreement(self, plant_id, vendor_id, start, end, quantity) -> Agreement:
         agreement = Agreement(
-            plant_id=plant_id, vendor_id=vendor_id, agreement_date=date.today(),
+            agreement_id=self._allocated_id(Agreement.agreement_id), plant_id=plant_id, vendor_id=vendor_id, agreement_date=date.today(),
             agreement_start=start, agreement_end=end, quantity=quantity
         )
         self.session.add(agreement)
-        self.session.commit()
+        self.session.flush()
+        rollups.record_agreement_created(self.session, agreement)
+        self._commit()
+        self._cache_put('agreement', agreement.agreement_id, agreement)
+        # uncommitted agreements (autocommit=False) are added by the caller once committed, a rolled back one would
+        # leave an entry whose id the database reuses
+        if self.agreement_index is not None and self.autocommit:
+            self.agreement_index.add(
+                agreement.agreement_id, plant_id, vendor_id, agreement.agreement_start, agreement.agreement_end
+            )
         return agreement
 
     def create_purchase_order(
-            self, quantity, order_date=date.today(), agreement_id=None, vendor_id=None, plant_id=None
+            self, quantity, order_date=None, agreement_id=None, vendor_id=None, plant_id=None,
+            allocation_policy=None
     ) -> Order:
+        """
+        Orders under agreement_id, or standalone for vendor_id and plant_id. With an allocation_policy and no
+        agreement_id the agreement is picked like allocate_purchase_order does, split is not accepted here as it may
+        create several orders
+        """
+        order_date = order_date or date.today()
+        if allocation_policy and not agreement_id:
+            if allocation_policy == 'split':
+                raise PurchaseOrderValidationException(
+                    'split allocation can create several orders, use allocate_purchase_order'
+                )
+            return self.allocate_purchase_order(quantity, plant_id, vendor_id, order_date, allocation_policy)[0]
+
+        agreement = None
+        if agreement_id:
+            agreement = self.session.query(Agreement).filter(Agreement.agreement_id == agreement_id).first()
+
+        self._validate_purchase_order(
+            quantity, order_date, agreement_id, vendor_id, plant_id, agreement,
+            agreement.consumed_quantity if agreement else 0
+        )
+        if agreement:
+            self._reserve_agreement_quantity(agreement, quantity)
+            # orders under an agreement carry its plant and vendor, so orders can be filtered by them directly
+            plant_id, vendor_id = agreement.plant_id, agreement.vendor_id
+
+        order = Order(
+            order_id=self._allocated_id(Order.order_id), agreement_id=agreement_id, vendor_id=vendor_id,
+            order_date=order_date, quantity=quantity, plant_id=plant_id
+        )
+
+        self.session.add(order)
+        rollups.record_orders_created(self.session, [order])
+        self._commit()
+        self._cache_put('order', order.order_id, order)
+
+        return order
+
+    def create_purchase_orders(self, batch) -> list:
+        """
+        Creates many purchase orders in one transaction. batch is a list of dicts with create_purchase_order keyword
+        arguments. Referenced agreements are fetched in one query and all the validations, including cumulative
+        quantity of the batch against each agreement, are done in memory so that one invalid item does not fail the
+        others. Returns a result per batch item in the same order, either {'order': serialized order} or
+        {'error': message, 'error_type': exception class name}
+        """
+        agreement_ids = {item.get('agreement_id') for item in batch} - {None}
+        agreements = {
+            agreement.agreement_id: agreement
+            for agreement in self.session.query(Agreement).filter(Agreement.agreement_id.in_(agreement_ids))
+        } if agreement_ids else {}
+        consumed_quantities = {agreement_id: agreement.consumed_quantity for agreement_id, agreement in agreements.items()}
+
+        results, rows = [None] * len(batch), {}
+        for index, item in enumerate(batch):
+            quantity, agreement_id = item['quantity'], item.get('agreement_id')
+            try:
+                self._validate_purchase_order(
+                    quantity, item.get('order_date', date.today()), agreement_id, item.get('vendor_id'),
+                    item.get('plant_id'), agreements.get(agreement_id), consumed_quantities.get(agreement_id, 0)
+                )
+            except PURCHASE_ORDER_VALIDATION_EXCEPTIONS as e:
+                results[index] = {'error': e.message, 'error_type': type(e).__name__}
+                continue
+            rows[index] = {
+                'agreement_id': agreement_id, 'vendor_id': item.get('vendor_id'), 'plant_id': item.get('plant_id'),
+                'order_date': item.get('order_date', date.today()), 'delivery_date': None, 'quantity': quantity
+            }
+            if agreement_id:
+                consumed_quantities[agreement_id] += quantity
+                rows[index]['plant_id'] = agreements[agreement_id].plant_id
+                rows[index]['vendor_id'] = agreements[agreement_id].vendor_id
+
+        # reserve batch quantities per agreement, an agreement that concurrent writers filled up in the meantime
+        # fails only the items ordered against it
+        for agreement_id, agreement in agreements.items():
+            batch_quantity = consumed_quantities[agreement_id] - agreement.consumed_quantity
+            if not batch_quantity:
+                continue
+            try:
+                self._reserve_agreement_quantity(agreement, batch_quantity)
+            except OrderQuantityExceedsAgreementException as e:
+                for index in [index for index, row in rows.items() if row['agreement_id'] == agreement_id]:
+                    results[index] = {'error': e.message, 'error_type': type(e).__name__}
+                    del rows[index]
+
+        if rows:
+            if self.id_allocator:
+                # explicit ids let the batch go out as a single executemany and still report each created order_id
+                for order_id, row in zip(self.id_allocator(self.session, Order.order_id, len(rows)), rows.values()):
+                    row['order_id'] = order_id
+                self.session.execute(Order.__table__.insert(), list(rows.values()))
+            else:
+                # ids picked ahead of the insert (e.g. max(order_id) + 1) would collide with a concurrent batch, the
+                # database assigns them instead and each insert reports its own
+                for row in rows.values():
+                    row['order_id'] = self.session.execute(Order.__table__.insert(), row).inserted_primary_key[0]
+            rollups.record_orders_created(self.session, rows.values())
+        self._commit()
+
+        for index, row in rows.items():
+            results[index] = {'order': Order(**row).serialize()}
+            if self.cache and self.autocommit:
+                self.cache.put(('order', row['order_id']), results[index]['order'])
+        return results
+
+    def allocate_purchase_order(
+            self, quantity, plant_id, vendor_id, order_date=None, allocation_policy='earliest_expiring'
+    ) -> list:
+        """
+        Orders quantity for plant_id from vendor_id under agreements picked among those whose duration covers
+        order_date and that have capacity left. earliest_expiring and most_remaining order all of it under one
+        agreement, split spreads it over agreements in earliest expiring order with one order per agreement used.
+        Returns the created orders
+        """
+        order_date = order_date or date.today()
+        allocations = self._allocations(
+            quantity, plant_id, vendor_id, order_date, allocation_policy,
+            self._covering_agreements(plant_id, vendor_id, order_date)
+        )
+        reserved = []
+        try:
+            for agreement, agreement_quantity in allocations:
+                self._reserve_agreement_quantity(agreement, agreement_quantity)
+                reserved.append((agreement, agreement_quantity))
+        except OrderQuantityExceedsAgreementException:
+            # a concurrent writer used up an agreement since it was read, give back what was reserved before it
+            for agreement, agreement_quantity in reserved:
+                self._reserve_agreement_quantity(agreement, -agreement_quantity)
+            raise
+
+        orders = [
+            Order(
+                order_id=self._allocated_id(Order.order_id), agreement_id=agreement.agreement_id, vendor_id=vendor_id,
+                plant_id=plant_id, order_date=order_date, quantity=agreement_quantity
+            ) for agreement, agreement_quantity in allocations
+        ]
+        self.session.add_all(orders)
+        rollups.record_orders_created(self.session, orders)
+        self._commit()
+        for order in orders:
+            self._cache_put('order', order.order_id, order)
+        return orders
+
+    def receive_purchase_order(self, order_id, delivery_date=None) -> Order:
+        delivery_date = delivery_date or date.today()
+        order = self.session.query(Order).filter(Order.order_id == order_id).first()
+        self._validate_receipt(order_id, delivery_date, order, order.agreement if order else None)
+
+        previous_delivery_date, order.delivery_date = order.delivery_date, delivery_date
+        order.version = Order.version + 1
+        self._update_earliest_delivery(order)
+        rollups.record_order_received(self.session, order, previous_delivery_date)
+        self._commit()
+        self._cache_put('order', order.order_id, order)
+        return order
+
+    def get_purchase_agreement(self, agreement_id: int) -> Agreement:
+        """
+        Agreement of agreement_id, or its ArchivedAgreement once it has been archived (see archiver.py)
+        """
+        agreement = self.session.query(Agreement).filter(Agreement.agreement_id == agreement_id).first() or \
+            self.session.get(ArchivedAgreement, agreement_id)
+        if not agreement:
+            raise PurchaseAgreementNotFound(f'Can not find purchase agreement for agreement id {agreement_id}')
+        return agreement
+
+    def get_purchase_order(self, order_id: int) -> Order:
+        """
+        Order of order_id, or its ArchivedOrder once it has been archived (see archiver.py)
+        """
+        order = self._get_order(order_id)
+        if not order:
+            raise PurchaseOrderNotFound(f'Can not find purchase order for order id {order_id}')
+        return order
+
+    def get_serialized_purchase_agreement(self, agreement_id: int) -> dict:
+        """
+        Serialized get_purchase_agreement, read through the cache when there is one
+        """
+        if not self.cache:
+            return self.get_purchase_agreement(agreement_id).serialize()
+        return self.cache.get_or_load(
+            ('agreement', agreement_id), lambda: self.get_purchase_agreement(agreement_id).serialize()
+        )
+
+    def get_serialized_purchase_order(self, order_id: int) -> dict:
+        """
+        Serialized get_purchase_order, read through the cache when there is one
+        """
+        if not self.cache:
+            return self.get_purchase_order(order_id).serialize()
+        return self.cache.get_or_load(('order', order_id), lambda: self.get_purchase_order(order_id).serialize())
+
+    def get_purchase_agreement_version(self, agreement_id: int) -> int:
+        """
+        Version of get_purchase_agreement(agreement_id), looked up by primary key without loading the agreement
+        """
+        version = self._version(Agreement, ArchivedAgreement, Agreement.agreement_id.key, agreement_id)
+        if version is None:
+            raise PurchaseAgreementNotFound(f'Can not find purchase agreement for agreement id {agreement_id}')
+        return version
+
+    def get_purchase_order_version(self, order_id: int) -> int:
+        """
+        Version of get_purchase_order(order_id), looked up by primary key without loading the order
+        """
+        version = self._version(Order, ArchivedOrder, Order.order_id.key, order_id)
+        if version is None:
+            raise PurchaseOrderNotFound(f'Can not find purchase order for order id {order_id}')
+        return version
+
+    def get_earliest_plant_order_version(self, plant_id: int) -> tuple:
+        """
+        (order_id, version) of get_earliest_plant_order(plant_id), without loading the order
+        """
+        order_id = self.session.query(PlantEarliestDelivery.order_id).filter(
+            PlantEarliestDelivery.plant_id == plant_id).scalar() or self._query_earliest_plant_order_id(plant_id)
+        if not order_id:
+            raise PlantNotFoundException(f'No orders found for given plant {plant_id}')
+        return order_id, self.get_purchase_order_version(order_id)
+
+    def get_earliest_plant_order(self, plant_id: int) -> Order:
+        """
+        Given a plant id, returns earliest received order (from agreement or standalone)
+        """
+        earliest = self.session.get(PlantEarliestDelivery, plant_id)
+        order_id = earliest.order_id if earliest else self._query_earliest_plant_order_id(plant_id)
+        if not order_id:
+            raise PlantNotFoundException(f'No orders found for given plant {plant_id}')
+
+        return self._get_order(order_id)
+
+    def get_plant_daily_deliveries(self, plant_id: int, date_from=None, date_to=None) -> list:
+        """
+        Serialized received quantity of a plant per delivery date (inclusive range), from the plant_daily_delivery
+        rollup
+        """
+        query = self.session.query(PlantDailyDelivery).filter(PlantDailyDelivery.plant_id == plant_id).filter(
+            PlantDailyDelivery.delivered_orders > 0)
+        if date_from:
+            query = query.filter(PlantDailyDelivery.delivery_date >= date_from)
+        if date_to:
+            query = query.filter(PlantDailyDelivery.delivery_date <= date_to)
+        return [daily.serialize() for daily in query.order_by(PlantDailyDelivery.delivery_date)]
+
+    def get_vendor_open_quantity(self, vendor_id: int) -> dict:
+        """
+        Serialized ordered but not yet received quantity of a vendor, from the vendor_open_quantity rollup
+        """
+        vendor_open_quantity = self.session.get(VendorOpenQuantity, vendor_id)
+        return vendor_open_quantity.serialize() if vendor_open_quantity else VendorOpenQuantity(
+            vendor_id=vendor_id, open_quantity=0, open_orders=0
+        ).serialize()
+
+    def get_agreement_utilization(self, agreement_id: int) -> dict:
+        """
+        Serialized ordered, received and remaining quantity of an agreement, from the agreement_utilization rollup
+        """
+        utilization = self.session.get(AgreementUtilization, agreement_id)
+        if not utilization:
+            raise PurchaseAgreementNotFound(f'Can not find purchase agreement for agreement id {agreement_id}')
+        return utilization.serialize()
+
+    def iter_orders(
+            self, plant_id=None, vendor_id=None, agreement_id=None, delivered=None, order_date_from=None,
+            order_date_to=None, delivery_date_from=None, delivery_date_to=None, chunk_size=1000
+    ):
+        """
+        Streams serialized orders matching the filters in chunks (lists) of up to chunk_size, from a server side
+        cursor so that memory use does not depend on how many orders match. delivered=True/False selects received/not
+        received orders and date ranges are inclusive
+        """
+        statement = select(*ORDER_COLUMNS).where(*self._order_criteria(
+            plant_id, vendor_id, agreement_id, delivered, order_date_from, order_date_to, delivery_date_from,
+            delivery_date_to
+        )).order_by(Order.order_id)
+        return self._iter_chunks(statement, chunk_size)
+
+    def iter_agreements(self, plant_id=None, vendor_id=None, date_from=None, date_to=None, chunk_size=1000):
+        """
+        Streams serialized agreements matching the filters in chunks (lists) of up to chunk_size, date_from/date_to
+        select agreements whose duration overlaps that (inclusive) range
+        """
+        statement = select(*AGREEMENT_COLUMNS).where(
+            *self._agreement_criteria(plant_id, vendor_id, date_from, date_to)
+        ).order_by(Agreement.agreement_id)
+        return self._iter_chunks(statement, chunk_size)
+
+    def list_orders(
+            self, plant_id=None, vendor_id=None, agreement_id=None, delivered=None, order_date_from=None,
+            order_date_to=None, delivery_date_from=None, delivery_date_to=None, cursor=None, limit=100
+    ):
+        """
+        One page of serialized orders matching the filters (see iter_orders) ordered by order_id. Returns
+        (orders, next_cursor), next_cursor is an opaque string to pass back for the next page or None after the last
+        page. Pages are read with keyset pagination (order_id > last order_id of previous page) so every page costs
+        the same no matter how deep into the listing it is
+        """
+        criteria = self._order_criteria(
+            plant_id, vendor_id, agreement_id, delivered, order_date_from, order_date_to, delivery_date_from,
+            delivery_date_to
+        )
+        return self._list_page(ORDER_COLUMNS, Order.order_id, criteria, cursor, limit)
+
+    def list_agreements(self, plant_id=None, vendor_id=None, date_from=None, date_to=None, cursor=None, limit=100):
+        """
+        One page of serialized agreements matching the filters (see iter_agreements) ordered by agreement_id, returns
+        (agreements, next_cursor) like list_orders
+        """
+        criteria = self._agreement_criteria(plant_id, vendor_id, date_from, date_to)
+        return self._list_page(AGREEMENT_COLUMNS, Agreement.agreement_id, criteria, cursor, limit)
+
+    def _list_page(self, columns, key, criteria, cursor, limit):
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise InvalidListRequestException(f'limit needs to be between 1 and {MAX_PAGE_SIZE}')
+        if cursor:
+            criteria = criteria + [key > _decode_cursor(cursor)]
+        rows = self.session.execute(select(*columns).where(*criteria).order_by(key).limit(limit + 1)).all()
+        next_cursor = _encode_cursor(rows[limit - 1]._mapping[key.name]) if len(rows) > limit else None
+        return serialize_rows(rows[:limit]), next_cursor
+
+    def _iter_chunks(self, statement, chunk_size):
+        result = self.session.execute(statement.execution_options(stream_results=True, max_row_buffer=chunk_size))
+        for rows in result.partitions(chunk_size):
+            yield serialize_rows(rows)
+
+    @staticmethod
+    def _order_criteria(
+            plant_id=None, vendor_id=None, agreement_id=None, delivered=None, order_date_from=None,
+            order_date_to=None, delivery_date_from=None, delivery_date_to=None
+    ):
+        criteria = []
+        if plant_id:
+            criteria.append(Order.plant_id == plant_id)
+        if vendor_id:
+            criteria.append(Order.vendor_id == vendor_id)
+        if agreement_id:
+            criteria.append(Order.agreement_id == agreement_id)
+        if delivered is not None:
+            criteria.append(Order.delivery_date != None if delivered else Order.delivery_date == None)
+        if order_date_from:
+            criteria.append(Order.order_date >= order_date_from)
+        if order_date_to:
+            criteria.append(Order.order_date <= order_date_to)
+        if delivery_date_from:
+            criteria.append(Order.delivery_date >= delivery_date_from)
+        if delivery_date_to:
+            criteria.append(Order.delivery_date <= delivery_date_to)
+        return criteria
+
+    @staticmethod
+    def _agreement_criteria(plant_id=None, vendor_id=None, date_from=None, date_to=None):
+        criteria = []
+        if plant_id:
+            criteria.append(Agreement.plant_id == plant_id)
+        if vendor_id:
+            criteria.append(Agreement.vendor_id == vendor_id)
+        if date_from:
+            criteria.append(Agreement.agreement_end >= date_from)
+        if date_to:
+            criteria.append(Agreement.agreement_start <= date_to)
+        return criteria
+
+    def _covering_agreements(self, plant_id, vendor_id, order_date):
+        """
+        Agreements of plant_id and vendor_id covering order_date that have capacity left, candidates come from the
+        agreement index when there is one
+        """
+        criteria = [Agreement.consumed_quantity < Agreement.quantity]
+        if self.agreement_index is not None:
+            agreement_ids = self._refreshed_agreement_index().covering(plant_id, vendor_id, order_date)
+            if not agreement_ids:
+                return []
+            criteria.append(Agreement.agreement_id.in_(agreement_ids))
+        # checked against the rows with the index too, an index entry may be stale
+        criteria.extend(self._agreement_criteria(plant_id, vendor_id, order_date, order_date))
+        return self.session.query(Agreement).filter(*criteria).all()
+
+    def _refreshed_agreement_index(self):
+        """
+        agreement_index after adding the agreements created since it was last refreshed, also by other processes.
+        Agreement ids only grow, so that is a primary key range read which is empty most of the time
+        """
+        self.agreement_index.refresh(self.session.execute(select(
+            Agreement.agreement_id, Agreement.plant_id, Agreement.vendor_id, Agreement.agreement_start,
+            Agreement.agreement_end
+        ).where(Agreement.agreement_id > self.agreement_index.last_agreement_id)))
+        return self.agreement_index
+
+    def _allocated_id(self, column):
+        return self.id_allocator(self.session, column, 1)[0] if self.id_allocator else None
+
+    def _commit(self):
+        if self.autocommit:
+            self.session.commit()
+        else:
+            self.session.flush()
+
+    def _cache_put(self, kind, key, instance):
+        if self.cache and self.autocommit:
+            self.cache.put((kind, key), instance.serialize())
+
+    def _version(self, model, archived_model, key, entity_id):
+        for entity in (model, archived_model):
+            version = self.session.query(entity.version).filter(getattr(entity, key) == entity_id).scalar()
+            if version is not None:
+                return version
+        return None
+
+    def _get_order(self, order_id):
+        return self.session.query(Order).filter(Order.order_id == order_id).first() or \
+            self.session.get(ArchivedOrder, order_id)
+
+    def _query_earliest_plant_order_id(self, plant_id):
+        """
+        Fallback for plants without a PlantEarliestDelivery row: earliest received order id from a single UNION query,
+        each branch is resolved from the (plant_id|agreement_id, delivery_date) indexes and limited to one row.
+        Archived orders are all delivered and carry their plant_id
+        """
+        pa_orders = select(Order.order_id, Order.delivery_date).join(Agreement).filter(
+            Agreement.plant_id == plant_id).filter(Order.delivery_date != None).order_by(
+            Order.delivery_date, Order.order_id).limit(1).subquery()
+        standalone_orders = select(Order.order_id, Order.delivery_date).filter(
+            Order.plant_id == plant_id).filter(Order.delivery_date != None).order_by(
+            Order.delivery_date, Order.order_id).limit(1).subquery()
+        archived_orders = select(ArchivedOrder.order_id, ArchivedOrder.delivery_date).filter(
+            ArchivedOrder.plant_id == plant_id).order_by(
+            ArchivedOrder.delivery_date, ArchivedOrder.order_id).limit(1).subquery()
+        orders = union_all(select(pa_orders), select(standalone_orders), select(archived_orders)).subquery()
+        return self.session.execute(
+            select(orders.c.order_id).order_by(orders.c.delivery_date, orders.c.order_id).limit(1)
+        ).scalar()
+
+    def _update_earliest_delivery(self, order):
+        """
+        Keeps PlantEarliestDelivery current for the plant(s) of a just received order, within the caller's transaction
+        """
+        plant_ids = {order.plant_id, order.agreement.plant_id if order.agreement else None}
+        for plant_id in plant_ids - {None}:
+            earliest = self.session.get(PlantEarliestDelivery, plant_id)
+            if not earliest:
+                # no materialized row yet (e.g. orders received before the table existed), seed it from the base tables
+                earliest_order_id = self._query_earliest_plant_order_id(plant_id)
+                earliest_order = self._get_order(earliest_order_id)
+                self.session.add(PlantEarliestDelivery(
+                    plant_id=plant_id, order_id=earliest_order.order_id, delivery_date=earliest_order.delivery_date
+                ))
+            elif earliest.order_id == order.order_id and order.delivery_date > earliest.delivery_date:
+                # the earliest order was received again with a later date, another order may be the earliest now
+                earliest_order = self._get_order(self._query_earliest_plant_order_id(plant_id))
+                earliest.order_id, earliest.delivery_date = earliest_order.order_id, earliest_order.delivery_date
+            elif (order.delivery_date, order.order_id) < (earliest.delivery_date, earliest.order_id):
+                earliest.order_id, earliest.delivery_date = order.order_id, order.delivery_date
+
+    @staticmethod
+    def _validate_purchase_order(quantity, order_date, agreement_id, vendor_id, plant_id, agreement, existing_quantity):
+        """
+        Business rules of a new purchase order, agreement is the referenced Agreement (if any) and existing_quantity
+        the quantity already ordered against it
+        """
         if not agreement_id and not vendor_id:
             raise PurchaseOrderValidationException('Either agreement_id or vendor_id needs to be provided')
 
-        if agreement_id and vendor_id and not self._validate_agreement(agreement_id, vendor_id):
+        if agreement_id and not agreement:
+            raise PurchaseAgreementNotFound(f'Can not find purchase agreement for agreement id {agreement_id}')
+
+        if agreement_id and vendor_id and agreement.vendor_id != vendor_id:
             raise PurchaseOrderValidationException(
                 f'There is no agreement {agreement_id} exists for given vendor {vendor_id}'
             )
 
+        if agreement_id and plant_id and agreement.plant_id != plant_id:
+            raise PurchaseOrderValidationException(
+                f'There is no agreement {agreement_id} exists for given plant {plant_id}'
+            )
+
         if not agreement_id and (not vendor_id or not plant_id):
             raise PurchaseOrderValidationException(
                 'If no agreement_id is given, both vendor_id and plant_id need to be provided for standalone order'
             )
 
-        if agreement_id:
-            agreement = self.session.query(Agreement).filter(Agreement.agreement_id == agreement_id).first()
-            existing_quantity = sum([order.quantity for order in agreement.orders])
+        if agreement:
             if existing_quantity + quantity > agreement.quantity:
                 raise OrderQuantityExceedsAgreementException(
-                    f'(order quantity) {quantity} + (existing quantity) {existing_quantity} exceeds agreement quantity'
-                    f'{agreement.quantity}'
+                    f'(order quantity) {quantity} + (existing quantity) {existing_quantity} exceeds agreement '
+                    f'quantity {agreement.quantity}'
                 )
 
             if order_date < agreement.agreement_start or order_date > agreement.agreement_end:
@@ -59,64 +562,106 @@ class InventoryManager:
                     f'{agreement.agreement_start} - {agreement.agreement_end}'
                 )
 
-        order = Order(
-            agreement_id=agreement_id, vendor_id=vendor_id, order_date=order_date, quantity=quantity, plant_id=plant_id
-        )
-
-        self.session.add(order)
-        self.session.commit()
-
-        return order
-
-    def receive_purchase_order(self, order_id, delivery_date=date.today()) -> Order:
-        order = self.session.query(Order).filter(Order.order_id == order_id).first()
+    @staticmethod
+    def _validate_receipt(order_id, delivery_date, order, agreement):
+        """
+        Business rules of receiving an order, order is the Order of order_id (if any) and agreement its Agreement
+        """
         if not order:
-            PurchaseOrderValidationException(f'order can not be found for order id {order_id}')
+            raise PurchaseOrderValidationException(f'order can not be found for order id {order_id}')
 
-        if order and order.order_date > delivery_date:
+        if order.order_date > delivery_date:
             raise PurchaseOrderValidationException(
                 f'delivery date {delivery_date} can not be before order date {order.order_date}'
             )
 
-        agreement = order.agreement
         if agreement and (delivery_date < agreement.agreement_start or delivery_date > agreement.agreement_end):
             raise PurchaseOrderDeliveryOutsideAgreementDuration(
                 f'order delivery date {delivery_date} can not be outside of agreement duration '
                 f'{agreement.agreement_start} - {agreement.agreement_end}'
             )
 
-        order.delivery_date = delivery_date
-        self.session.commit()
-        return order
-
-    def get_purchase_agreement(self, agreement_id: int) -> Agreement:
-        agreement = self.session.query(Agreement).filter(Agreement.agreement_id == agreement_id).first()
-        if not agreement:
-            raise PurchaseAgreementNotFound(f'Can not find purchase agreement for agreement id {agreement_id}')
-        return agreement
-
-    def get_purchase_order(self, order_id: int) -> Order:
-        order = self.session.query(Order).filter(Order.order_id == order_id).first()
-        if not order:
-            raise PurchaseOrderNotFound(f'Can not find purchase order for order id {order_id}')
-        return order
+    @staticmethod
+    def _allocations(quantity, plant_id, vendor_id, order_date, allocation_policy, agreements):
+        """
+        Business rules of allocate_purchase_order, agreements are the candidate agreements covering order_date with
+        capacity left. Returns (agreement, quantity) pairs to order
+        """
+        if allocation_policy not in ALLOCATION_POLICIES:
+            raise PurchaseOrderValidationException(
+                f'allocation policy needs to be one of {", ".join(ALLOCATION_POLICIES)}'
+            )
+        if not vendor_id or not plant_id:
+            raise PurchaseOrderValidationException('Both vendor_id and plant_id need to be provided for allocation')
+
+        by_expiry = sorted(agreements, key=lambda agreement: (agreement.agreement_end, agreement.agreement_id))
+        remaining = {
+            agreement.agreement_id: agreement.quantity - agreement.consumed_quantity for agreement in by_expiry
+        }
+        if allocation_policy == 'split':
+            allocations, left = [], quantity
+            for agreement in by_expiry:
+                agreement_quantity = min(left, remaining[agreement.agreement_id])
+                if agreement_quantity > 0:
+                    allocations.append((agreement, agreement_quantity))
+                    left -= agreement_quantity
+            if not left:
+                return allocations
+        else:
+            fitting = [agreement for agreement in by_expiry if remaining[agreement.agreement_id] >= quantity]
+            if fitting and allocation_policy == 'most_remaining':
+                # max keeps the first (earliest expiring) of equally remaining agreements
+                return [(max(fitting, key=lambda agreement: remaining[agreement.agreement_id]), quantity)]
+            if fitting:
+                return [(fitting[0], quantity)]
+
+        raise NoAgreementAvailableException(
+            f'No agreement of plant {plant_id} and vendor {vendor_id} covering {order_date} has {quantity} left'
+        )
 
-    def get_earliest_plant_order(self, plant_id: int) -> Order:
+    def _reserve_agreement_quantity(self, agreement, quantity):
         """
-        Given a plant id, returns earliest received order (from agreement or standalone)
+        Atomically adds quantity to agreement consumed quantity if the agreement still has capacity for it, so
+        concurrent orders against the same agreement can not overbook it
         """
-        pa_orders = self.session.query(Order).join(Agreement).filter(Agreement.plant_id == plant_id).filter(Order.delivery_date != None).all()
-        standalone_orders = self.session.query(Order).filter(Order.plant_id == plant_id).filter(Order.delivery_date != None).all()
-        orders = pa_orders + standalone_orders
-        if not orders:
-            raise PlantNotFoundException(f'No orders found for given plant {plant_id}')
+        reserved = self.session.query(Agreement).filter(Agreement.agreement_id == agreement.agreement_id).filter(
+            Agreement.consumed_quantity + quantity <= Agreement.quantity
+        ).update({
+            Agreement.consumed_quantity: Agreement.consumed_quantity + quantity, Agreement.version: Agreement.version + 1
+        }, synchronize_session=False)
+        self.session.expire(agreement, ['consumed_quantity', 'version'])
+        if not reserved:
+            raise OrderQuantityExceedsAgreementException(
+                f'(order quantity) {quantity} + (existing quantity) {agreement.consumed_quantity} exceeds agreement '
+                f'quantity {agreement.quantity}'
+            )
+
+
+MAX_PAGE_SIZE = 1000
+# columns of listed/exported orders and agreements, the fields of their serialize() so listings and single-entity
+# reads have one shape. The version of a row is the ETag of its GET resource instead, the consumed quantity of an
+# agreement is in get_agreement_utilization
+ORDER_COLUMNS = [column for column in Order.__table__.columns if column.key != 'version']
+AGREEMENT_COLUMNS = [
+    column for column in Agreement.__table__.columns if column.key not in ('version', 'consumed_quantity')
+]
+
+# InventoryManager.allocate_purchase_order policies
+ALLOCATION_POLICIES = ('earliest_expiring', 'most_remaining', 'split')
 
-        orders.sort(key=lambda order: order.delivery_date)
-        return orders[0]
 
-    def _validate_agreement(self, agreement_id, vendor_id):
-        _agreement = self.session.query(Agreement).filter(Agreement.agreement_id == agreement_id).first()
-        return _agreement.vendor_id == vendor_id
+def _encode_cursor(last_key):
+    return base64.urlsafe_b64encode(json.dumps({'after': last_key}).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        last_key = json.loads(base64.urlsafe_b64decode(cursor.encode()))['after']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidListRequestException(f'invalid cursor {cursor}')
+    if not isinstance(last_key, int):
+        raise InvalidListRequestException(f'invalid cursor {cursor}')
+    return last_key
 
 
 class PurchaseOrderValidationException(Exception):
@@ -159,3 +704,22 @@ class PurchaseOrderDeliveryOutsideAgreementDuration(Exception):
     def __init__(self, message):
         self.message = message
         super().__init__(self.message)
+
+
+class NoAgreementAvailableException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+class InvalidListRequestException(Exception):
+    def __init__(self, message):
+        self.message = message
+        super().__init__(self.message)
+
+
+# raised by InventoryManager._validate_purchase_order (and _allocations) for an invalid purchase order request
+PURCHASE_ORDER_VALIDATION_EXCEPTIONS = (
+    PurchaseOrderValidationException, PurchaseAgreementNotFound, OrderQuantityExceedsAgreementException,
+    PurchaseOrderDateOutsideAgreementDuration, NoAgreementAvailableException
+)
@@ -1,5 +1,8 @@
 import os
+import time
 import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
 from parameterized import parameterized
 from datetime import date, timedelta
 
@@ -7,40 +10,23 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from inventory_manager import InventoryManager, OrderQuantityExceedsAgreementException, \
-    PurchaseOrderDateOutsideAgreementDuration, PurchaseOrderDeliveryOutsideAgreementDuration
+    PurchaseOrderDateOutsideAgreementDuration, PurchaseOrderDeliveryOutsideAgreementDuration, PlantNotFoundException, \
+    InvalidListRequestException, NoAgreementAvailableException, PurchaseOrderNotFound, PurchaseOrderValidationException
 from models.database import Base
+from models.plant_earliest_delivery import PlantEarliestDelivery
 from models.plant import Plant
 from models.vendor import Vendor
 
 
-class InventoryManagerTest(unittest.TestCase):
-    def setUp(self) -> None:
-        self.plant = Plant(name='Plant A')
-        self.vendor = Vendor(name='Vendor A')
-
-        self.engine = create_engine('sqlite:///inventory_test.db')
-        # Create tables in the database
-        Base.metadata.create_all(self.engine)
-
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
-
-        self.session.add_all([self.plant, self.vendor])
-        self.session.commit()
-
-        self.inventory_manager = InventoryManager(self.session)
-
-    def tearDown(self) -> None:
-        self.session.close_all()
-        self.engine.dispose()
-
-        db_file = "inventory_test.db"
-        if os.path.exists(db_file):
-            os.remove(db_file)
+class InventoryManagerContract:
+    """
+    Behaviour shared by every InventoryManager engine, a test case mixes it in and sets self.inventory_manager,
+    self.plant_id and self.vendor_id in setUp (see memory_inventory_manager_test)
+    """
 
     def test_get_oldest_received_plant(self):
         agreement = self.inventory_manager.create_purchase_agreement(
-            plant_id=self.plant.plant_id, vendor_id=self.vendor.vendor_id,
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
             start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
         )
         order_1 = self.inventory_manager.create_purchase_order(
@@ -65,26 +51,48 @@ class InventoryManagerTest(unittest.TestCase):
             order_3.order_id, delivery_date=date.today() - timedelta(days=2)
         )
 
-        order = self.inventory_manager.get_earliest_plant_order(self.plant.plant_id)
+        order = self.inventory_manager.get_earliest_plant_order(self.plant_id)
 
         self.assertEqual(order.order_id, order_2.order_id)
 
         # now add a standalone order that is oldest delivered
         # we need to provide both vendor id and plant id for standalone orders
         order_4 = self.inventory_manager.create_purchase_order(
-            quantity=100, order_date=date.today() - timedelta(days=20), vendor_id=self.vendor.vendor_id,
-            plant_id=self.plant.plant_id
+            quantity=100, order_date=date.today() - timedelta(days=20), vendor_id=self.vendor_id,
+            plant_id=self.plant_id
         )
         self.inventory_manager.receive_purchase_order(
             order_4.order_id, delivery_date=date.today() - timedelta(days=20)
         )
 
-        order = self.inventory_manager.get_earliest_plant_order(self.plant.plant_id)
+        order = self.inventory_manager.get_earliest_plant_order(self.plant_id)
         self.assertEqual(order.order_id, order_4.order_id)
 
+    def test_earliest_plant_order_after_redelivery(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
+        )
+        order_1 = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today() - timedelta(days=10), agreement_id=agreement.agreement_id
+        )
+        self.inventory_manager.receive_purchase_order(order_1.order_id, delivery_date=date.today() - timedelta(days=10))
+        order_2 = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today() - timedelta(days=10), agreement_id=agreement.agreement_id
+        )
+        self.inventory_manager.receive_purchase_order(order_2.order_id, delivery_date=date.today() - timedelta(days=5))
+
+        # earliest order is received again with a later date, order_2 becomes the earliest
+        self.inventory_manager.receive_purchase_order(order_1.order_id, delivery_date=date.today() - timedelta(days=1))
+        order = self.inventory_manager.get_earliest_plant_order(self.plant_id)
+        self.assertEqual(order.order_id, order_2.order_id)
+
+        with self.assertRaises(PlantNotFoundException):
+            self.inventory_manager.get_earliest_plant_order(self.plant_id + 1)
+
     def test_order_quantities_against_parent_agreement_quantity(self):
         agreement = self.inventory_manager.create_purchase_agreement(
-            plant_id=self.plant.plant_id, vendor_id=self.vendor.vendor_id,
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
             start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=150
         )
         order_1 = self.inventory_manager.create_purchase_order(
@@ -104,6 +112,156 @@ class InventoryManagerTest(unittest.TestCase):
             quantity=50, order_date=date.today() - timedelta(days=10), agreement_id=agreement.agreement_id
         )
 
+    def test_create_purchase_orders_batch(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=150
+        )
+        self.inventory_manager.create_purchase_order(
+            quantity=50, order_date=date.today(), agreement_id=agreement.agreement_id
+        )
+
+        results = self.inventory_manager.create_purchase_orders([
+            {'quantity': 60, 'order_date': date.today(), 'agreement_id': agreement.agreement_id},
+            # exceeds agreement quantity together with the previous item of the batch
+            {'quantity': 60, 'order_date': date.today(), 'agreement_id': agreement.agreement_id},
+            {'quantity': 10, 'order_date': date.today() - timedelta(days=36), 'agreement_id': agreement.agreement_id},
+            {'quantity': 40, 'order_date': date.today(), 'agreement_id': agreement.agreement_id},
+            {'quantity': 10, 'order_date': date.today(), 'agreement_id': agreement.agreement_id + 1},
+            {'quantity': 100, 'order_date': date.today(), 'vendor_id': self.vendor_id,
+             'plant_id': self.plant_id},
+        ])
+
+        self.assertEqual(
+            [result.get('error_type') for result in results],
+            [None, 'OrderQuantityExceedsAgreementException', 'PurchaseOrderDateOutsideAgreementDuration', None,
+             'PurchaseAgreementNotFound', None]
+        )
+        for result in [results[0], results[3], results[5]]:
+            order = self.inventory_manager.get_purchase_order(result['order']['order_id'])
+            self.assertEqual(order.serialize(), result['order'])
+        self.assertEqual(self.inventory_manager.get_purchase_agreement(agreement.agreement_id).consumed_quantity, 150)
+
+    def test_versions(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
+        )
+        self.assertEqual(self.inventory_manager.get_purchase_agreement_version(agreement.agreement_id), 1)
+        order = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today(), agreement_id=agreement.agreement_id
+        )
+        # the consumed quantity of the agreement changed
+        self.assertEqual(self.inventory_manager.get_purchase_agreement_version(agreement.agreement_id), 2)
+        self.assertEqual(self.inventory_manager.get_purchase_order_version(order.order_id), 1)
+
+        self.inventory_manager.receive_purchase_order(order.order_id, delivery_date=date.today())
+        self.assertEqual(self.inventory_manager.get_purchase_order_version(order.order_id), 2)
+        self.assertEqual(self.inventory_manager.get_earliest_plant_order_version(self.plant_id), (order.order_id, 2))
+        with self.assertRaises(PurchaseOrderNotFound):
+            self.inventory_manager.get_purchase_order_version(order.order_id + 1)
+        with self.assertRaises(PlantNotFoundException):
+            self.inventory_manager.get_earliest_plant_order_version(self.plant_id + 1)
+
+    def test_list_orders_pages(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
+        )
+        orders = [
+            self.inventory_manager.create_purchase_order(
+                quantity=10, order_date=date.today(), agreement_id=agreement.agreement_id
+            ).serialize() for _ in range(3)
+        ] + [
+            self.inventory_manager.create_purchase_order(
+                quantity=10, order_date=date.today(), vendor_id=self.vendor_id, plant_id=self.plant_id
+            ).serialize() for _ in range(2)
+        ]
+
+        pages, cursor = [], None
+        while True:
+            page, cursor = self.inventory_manager.list_orders(plant_id=self.plant_id, cursor=cursor, limit=2)
+            pages.append(page)
+            if not cursor:
+                break
+        self.assertEqual(pages, [orders[0:2], orders[2:4], orders[4:]])
+
+        page, cursor = self.inventory_manager.list_orders(agreement_id=agreement.agreement_id, limit=3)
+        self.assertEqual((page, cursor), (orders[:3], None))
+        # listed like they are read one by one
+        self.assertEqual(self.inventory_manager.list_agreements(plant_id=self.plant_id), (
+            [self.inventory_manager.get_purchase_agreement(agreement.agreement_id).serialize()], None
+        ))
+
+        with self.assertRaises(InvalidListRequestException):
+            self.inventory_manager.list_orders(cursor='not a cursor')
+
+    def test_rollup_getters(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
+        )
+        day_1, day_2 = date.today() - timedelta(days=2), date.today() - timedelta(days=1)
+        order = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=day_1, agreement_id=agreement.agreement_id
+        )
+        self.inventory_manager.create_purchase_orders([
+            {'quantity': 50, 'order_date': day_1, 'agreement_id': agreement.agreement_id},
+            {'quantity': 20, 'order_date': day_1, 'vendor_id': self.vendor_id, 'plant_id': self.plant_id},
+        ])
+        self.inventory_manager.receive_purchase_order(order.order_id, delivery_date=day_1)
+        self.inventory_manager.receive_purchase_order(order.order_id, delivery_date=day_2)
+
+        self.assertEqual({'vendor_id': self.vendor_id, 'open_quantity': 70, 'open_orders': 2},
+                         self.inventory_manager.get_vendor_open_quantity(self.vendor_id))
+        self.assertEqual([{
+            'plant_id': self.plant_id, 'delivery_date': day_2.strftime('%Y-%m-%d'), 'delivered_quantity': 100,
+            'delivered_orders': 1
+        }], self.inventory_manager.get_plant_daily_deliveries(self.plant_id, date_from=day_1))
+        self.assertEqual({
+            'agreement_id': agreement.agreement_id, 'plant_id': self.plant_id, 'vendor_id': self.vendor_id,
+            'quantity': 1000, 'ordered_quantity': 150, 'delivered_quantity': 100, 'remaining_quantity': 850
+        }, self.inventory_manager.get_agreement_utilization(agreement.agreement_id))
+
+    def test_allocate_purchase_order(self):
+        today = date.today()
+        agreements = [
+            self.inventory_manager.create_purchase_agreement(
+                plant_id=self.plant_id, vendor_id=self.vendor_id, start=today + timedelta(days=start),
+                end=today + timedelta(days=end), quantity=quantity
+            ) for start, end, quantity in [(-30, 10, 100), (-30, 100, 300), (5, 200, 1000)]
+        ]
+
+        def allocate(quantity, policy, order_date=today):
+            orders = self.inventory_manager.allocate_purchase_order(
+                quantity, self.plant_id, self.vendor_id, order_date=order_date, allocation_policy=policy
+            )
+            return [(order.agreement_id, order.quantity) for order in orders]
+
+        self.assertEqual(allocate(50, 'earliest_expiring'), [(agreements[0].agreement_id, 50)])
+        self.assertEqual(allocate(50, 'most_remaining'), [(agreements[1].agreement_id, 50)])
+        # the third agreement does not cover today
+        self.assertEqual(allocate(280, 'split'), [(agreements[0].agreement_id, 50), (agreements[1].agreement_id, 230)])
+        with self.assertRaises(NoAgreementAvailableException):
+            allocate(30, 'earliest_expiring')
+
+        order = self.inventory_manager.create_purchase_order(
+            quantity=500, order_date=today + timedelta(days=50), vendor_id=self.vendor_id, plant_id=self.plant_id,
+            allocation_policy='earliest_expiring'
+        )
+        self.assertEqual((order.agreement_id, order.plant_id, order.vendor_id),
+                         (agreements[2].agreement_id, self.plant_id, self.vendor_id))
+        self.assertEqual(
+            [self.inventory_manager.get_purchase_agreement(agreement.agreement_id).consumed_quantity
+             for agreement in agreements], [100, 280, 500]
+        )
+        with self.assertRaises(PurchaseOrderValidationException):
+            self.inventory_manager.create_purchase_order(
+                quantity=1, vendor_id=self.vendor_id, plant_id=self.plant_id, allocation_policy='split'
+            )
+        with self.assertRaises(PurchaseOrderValidationException):
+            allocate(1, 'cheapest')
+
     @parameterized.expand([
         # [(order_date, delivery_date, raises_order_date, raises_delivery_date)]
         (date.today(), date.today(), False, False),
@@ -117,7 +275,7 @@ class InventoryManagerTest(unittest.TestCase):
     ):
         agreement_start, agreement_end = date.today(), date.today() + timedelta(days=365)
         agreement = self.inventory_manager.create_purchase_agreement(
-            plant_id=self.plant.plant_id, vendor_id=self.vendor.vendor_id,
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
             start=agreement_start, end=agreement_end, quantity=150
         )
         order_1 = None
@@ -137,6 +295,115 @@ class InventoryManagerTest(unittest.TestCase):
             else:
                 self.inventory_manager.receive_purchase_order(order_1.order_id, delivery_date=delivery_date)
 
+    def test_default_dates_are_the_day_of_the_call(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
+        )
+        tomorrow = date.today() + timedelta(days=1)
+
+        class Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return tomorrow
+
+        with mock.patch(f'{type(self.inventory_manager).__module__}.date', Tomorrow):
+            order = self.inventory_manager.create_purchase_order(quantity=100, agreement_id=agreement.agreement_id)
+            allocated, = self.inventory_manager.allocate_purchase_order(100, self.plant_id, self.vendor_id)
+            received = self.inventory_manager.receive_purchase_order(order.order_id)
+
+        self.assertEqual(tomorrow, order.order_date)
+        self.assertEqual(tomorrow, allocated.order_date)
+        self.assertEqual(tomorrow, received.delivery_date)
+
+
+class InventoryManagerTest(InventoryManagerContract, unittest.TestCase):
+    def setUp(self) -> None:
+        self.plant = Plant(name='Plant A')
+        self.vendor = Vendor(name='Vendor A')
+
+        self.engine = create_engine('sqlite:///inventory_test.db')
+        # Create tables in the database
+        Base.metadata.create_all(self.engine)
+
+        Session = sessionmaker(bind=self.engine)
+        self.session = Session()
+
+        self.session.add_all([self.plant, self.vendor])
+        self.session.commit()
+
+        self.inventory_manager = InventoryManager(self.session)
+        self.plant_id, self.vendor_id = self.plant.plant_id, self.vendor.vendor_id
+
+    def tearDown(self) -> None:
+        self.session.close_all()
+        self.engine.dispose()
+
+        db_file = "inventory_test.db"
+        if os.path.exists(db_file):
+            os.remove(db_file)
+
+    def test_concurrent_batches_get_distinct_ids(self):
+        Session = sessionmaker(bind=self.engine)
+        first_session = Session()
+        item = {'quantity': 10, 'order_date': date.today(), 'vendor_id': self.vendor_id, 'plant_id': self.plant_id}
+        first_results = InventoryManager(first_session, autocommit=False).create_purchase_orders([item, item])
+
+        def create_second_batch():
+            with Session() as session:
+                return InventoryManager(session).create_purchase_orders([item, item])
+
+        # the second batch starts while the first one holds the write lock and inserts once it commits
+        with ThreadPoolExecutor(1) as executor:
+            second = executor.submit(create_second_batch)
+            time.sleep(0.2)
+            first_session.commit()
+            second_results = second.result()
+        first_session.close()
+
+        order_ids = [result['order']['order_id'] for result in first_results + second_results]
+        self.assertEqual(sorted(order_ids), [1, 2, 3, 4])
+        for order_id in order_ids:
+            self.assertEqual(self.inventory_manager.get_purchase_order(order_id).quantity, 10)
+
+    def test_earliest_plant_order_without_materialized_row(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
+        )
+        order = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today() - timedelta(days=10), agreement_id=agreement.agreement_id
+        )
+        self.inventory_manager.receive_purchase_order(order.order_id, delivery_date=date.today() - timedelta(days=5))
+
+        # falls back to querying base tables when there is no materialized row for the plant
+        self.session.query(PlantEarliestDelivery).delete()
+        self.session.commit()
+        self.assertEqual(self.inventory_manager.get_earliest_plant_order(self.plant_id).order_id, order.order_id)
+
+    def test_agreement_capacity_reservation_with_stale_agreement(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=150
+        )
+        # other writer loads the agreement before this one orders against it
+        other_session = sessionmaker(bind=self.engine)()
+        other_inventory_manager = InventoryManager(other_session)
+        self.assertEqual(other_inventory_manager.get_purchase_agreement(agreement.agreement_id).consumed_quantity, 0)
+        other_session.commit()
+        other_inventory_manager.get_purchase_agreement(agreement.agreement_id)
+
+        self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today(), agreement_id=agreement.agreement_id
+        )
+        with self.assertRaises(OrderQuantityExceedsAgreementException):
+            other_inventory_manager.create_purchase_order(
+                quantity=100, order_date=date.today(), agreement_id=agreement.agreement_id
+            )
+        other_session.close()
+
+        self.assertEqual(self.inventory_manager.get_purchase_agreement(agreement.agreement_id).consumed_quantity, 100)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: inventory.proto
+# Protobuf Python Version: 7.35.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    7,
+    35,
+    1,
+    '',
+    'inventory.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0finventory.proto\x12\tinventory\"\xa0\x01\n\tAgreement\x12\x14\n\x0c\x61greement_id\x18\x01 \x01(\x03\x12\x10\n\x08plant_id\x18\x02 \x01(\x03\x12\x11\n\tvendor_id\x18\x03 \x01(\x03\x12\x16\n\x0e\x61greement_date\x18\x04 \x01(\t\x12\x17\n\x0f\x61greement_start\x18\x05 \x01(\t\x12\x15\n\ragreement_end\x18\x06 \x01(\t\x12\x10\n\x08quantity\x18\x07 \x01(\x03\"\xe3\x01\n\x05Order\x12\x10\n\x08order_id\x18\x01 \x01(\x03\x12\x19\n\x0c\x61greement_id\x18\x02 \x01(\x03H\x00\x88\x01\x01\x12\x16\n\tvendor_id\x18\x03 \x01(\x03H\x01\x88\x01\x01\x12\x15\n\x08plant_id\x18\x04 \x01(\x03H\x02\x88\x01\x01\x12\x12\n\norder_date\x18\x05 \x01(\t\x12\x1a\n\rdelivery_date\x18\x06 \x01(\tH\x03\x88\x01\x01\x12\x10\n\x08quantity\x18\x07 \x01(\x03\x42\x0f\n\r_agreement_idB\x0c\n\n_vendor_idB\x0b\n\t_plant_idB\x10\n\x0e_delivery_date\"*\n\x06Orders\x12 \n\x06orders\x18\x01 \x03(\x0b\x32\x10.inventory.Order\"s\n\x1e\x43reatePurchaseAgreementRequest\x12\x10\n\x08plant_id\x18\x01 \x01(\x03\x12\x11\n\tvendor_id\x18\x02 \x01(\x03\x12\r\n\x05start\x18\x03 \x01(\t\x12\x0b\n\x03\x65nd\x18\x04 \x01(\t\x12\x10\n\x08quantity\x18\x05 \x01(\x03\"3\n\x1bGetPurchaseAgreementRequest\x12\x14\n\x0c\x61greement_id\x18\x01 \x01(\x03\"\xee\x01\n\x1a\x43reatePurchaseOrderRequest\x12\x19\n\x0c\x61greement_id\x18\x01 \x01(\x03H\x00\x88\x01\x01\x12\x16\n\tvendor_id\x18\x02 \x01(\x03H\x01\x88\x01\x01\x12\x15\n\x08plant_id\x18\x03 \x01(\x03H\x02\x88\x01\x01\x12\x12\n\norder_date\x18\x04 \x01(\t\x12\x10\n\x08quantity\x18\x05 \x01(\x03\x12\x1e\n\x11\x61llocation_policy\x18\x06 \x01(\tH\x03\x88\x01\x01\x42\x0f\n\r_agreement_idB\x0c\n\n_vendor_idB\x0b\n\t_plant_idB\x14\n\x12_allocation_policy\"T\n\x1b\x43reatePurchaseOrderRequests\x12\x35\n\x06orders\x18\x01 \x03(\x0b\x32%.inventory.CreatePurchaseOrderRequest\"F\n\x1bReceivePurchaseOrderRequest\x12\x10\n\x08order_id\x18\x01 \x01(\x03\x12\x15\n\rdelivery_date\x18\x02 \x01(\t\"X\n\x1cReceivePurchaseOrderRequests\x12\x38\n\x08receipts\x18\x01 \x03(\x0b\x32&.inventory.ReceivePurchaseOrderRequest\"+\n\x17GetPurchaseOrderRequest\x12\x10\n\x08order_id\x18\x01 \x01(\x03\"0\n\x1cGetEarliestPlantOrderRequest\x12\x10\n\x08plant_id\x18\x01 \x01(\x03\"\x8f\x03\n\x11ListOrdersRequest\x12\x15\n\x08plant_id\x18\x01 \x01(\x03H\x00\x88\x01\x01\x12\x16\n\tvendor_id\x18\x02 \x01(\x03H\x01\x88\x01\x01\x12\x19\n\x0c\x61greement_id\x18\x03 \x01(\x03H\x02\x88\x01\x01\x12\x16\n\tdelivered\x18\x04 \x01(\x08H\x03\x88\x01\x01\x12\x1c\n\x0forder_date_from\x18\x05 \x01(\tH\x04\x88\x01\x01\x12\x1a\n\rorder_date_to\x18\x06 \x01(\tH\x05\x88\x01\x01\x12\x1f\n\x12\x64\x65livery_date_from\x18\x07 \x01(\tH\x06\x88\x01\x01\x12\x1d\n\x10\x64\x65livery_date_to\x18\x08 \x01(\tH\x07\x88\x01\x01\x12\x12\n\nchunk_size\x18\t \x01(\rB\x0b\n\t_plant_idB\x0c\n\n_vendor_idB\x0f\n\r_agreement_idB\x0c\n\n_deliveredB\x12\n\x10_order_date_fromB\x10\n\x0e_order_date_toB\x15\n\x13_delivery_date_fromB\x13\n\x11_delivery_date_to\"B\n\x0b\x45rrorDetail\x12\"\n\x04type\x18\x01 \x01(\x0e\x32\x14.inventory.ErrorType\x12\x0f\n\x07message\x18\x02 \x01(\t\"c\n\x0bOrderResult\x12!\n\x05order\x18\x01 \x01(\x0b\x32\x10.inventory.OrderH\x00\x12\'\n\x05\x65rror\x18\x02 \x01(\x0b\x32\x16.inventory.ErrorDetailH\x00\x42\x08\n\x06result\"7\n\x0cOrderResults\x12\'\n\x07results\x18\x01 \x03(\x0b\x32\x16.inventory.OrderResult*\xe3\x02\n\tErrorType\x12\x1a\n\x16\x45RROR_TYPE_UNSPECIFIED\x10\x00\x12\x1d\n\x19PURCHASE_ORDER_VALIDATION\x10\x01\x12\x13\n\x0fPLANT_NOT_FOUND\x10\x02\x12$\n ORDER_QUANTITY_EXCEEDS_AGREEMENT\x10\x03\x12\x1c\n\x18PURCHASE_ORDER_NOT_FOUND\x10\x04\x12 \n\x1cPURCHASE_AGREEMENT_NOT_FOUND\x10\x05\x12\x32\n.PURCHASE_ORDER_DATE_OUTSIDE_AGREEMENT_DURATION\x10\x06\x12\x36\n2PURCHASE_ORDER_DELIVERY_OUTSIDE_AGREEMENT_DURATION\x10\x07\x12\x1a\n\x16NO_AGREEMENT_AVAILABLE\x10\x08\x12\x18\n\x14INVALID_LIST_REQUEST\x10\t2\xfd\x05\n\x10InventoryService\x12Z\n\x17\x43reatePurchaseAgreement\x12).inventory.CreatePurchaseAgreementRequest\x1a\x14.inventory.Agreement\x12T\n\x14GetPurchaseAgreement\x12&.inventory.GetPurchaseAgreementRequest\x1a\x14.inventory.Agreement\x12N\n\x13\x43reatePurchaseOrder\x12%.inventory.CreatePurchaseOrderRequest\x1a\x10.inventory.Order\x12P\n\x14ReceivePurchaseOrder\x12&.inventory.ReceivePurchaseOrderRequest\x1a\x10.inventory.Order\x12H\n\x10GetPurchaseOrder\x12\".inventory.GetPurchaseOrderRequest\x1a\x10.inventory.Order\x12R\n\x15GetEarliestPlantOrder\x12\'.inventory.GetEarliestPlantOrderRequest\x1a\x10.inventory.Order\x12Y\n\x14\x43reatePurchaseOrders\x12&.inventory.CreatePurchaseOrderRequests\x1a\x17.inventory.OrderResults(\x01\x12[\n\x15ReceivePurchaseOrders\x12\'.inventory.ReceivePurchaseOrderRequests\x1a\x17.inventory.OrderResults(\x01\x12?\n\nListOrders\x12\x1c.inventory.ListOrdersRequest\x1a\x11.inventory.Orders0\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'inventory_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_ERRORTYPE']._serialized_start=1850
+  _globals['_ERRORTYPE']._serialized_end=2205
+  _globals['_AGREEMENT']._serialized_start=31
+  _globals['_AGREEMENT']._serialized_end=191
+  _globals['_ORDER']._serialized_start=194
+  _globals['_ORDER']._serialized_end=421
+  _globals['_ORDERS']._serialized_start=423
+  _globals['_ORDERS']._serialized_end=465
+  _globals['_CREATEPURCHASEAGREEMENTREQUEST']._serialized_start=467
+  _globals['_CREATEPURCHASEAGREEMENTREQUEST']._serialized_end=582
+  _globals['_GETPURCHASEAGREEMENTREQUEST']._serialized_start=584
+  _globals['_GETPURCHASEAGREEMENTREQUEST']._serialized_end=635
+  _globals['_CREATEPURCHASEORDERREQUEST']._serialized_start=638
+  _globals['_CREATEPURCHASEORDERREQUEST']._serialized_end=876
+  _globals['_CREATEPURCHASEORDERREQUESTS']._serialized_start=878
+  _globals['_CREATEPURCHASEORDERREQUESTS']._serialized_end=962
+  _globals['_RECEIVEPURCHASEORDERREQUEST']._serialized_start=964
+  _globals['_RECEIVEPURCHASEORDERREQUEST']._serialized_end=1034
+  _globals['_RECEIVEPURCHASEORDERREQUESTS']._serialized_start=1036
+  _globals['_RECEIVEPURCHASEORDERREQUESTS']._serialized_end=1124
+  _globals['_GETPURCHASEORDERREQUEST']._serialized_start=1126
+  _globals['_GETPURCHASEORDERREQUEST']._serialized_end=1169
+  _globals['_GETEARLIESTPLANTORDERREQUEST']._serialized_start=1171
+  _globals['_GETEARLIESTPLANTORDERREQUEST']._serialized_end=1219
+  _globals['_LISTORDERSREQUEST']._serialized_start=1222
+  _globals['_LISTORDERSREQUEST']._serialized_end=1621
+  _globals['_ERRORDETAIL']._serialized_start=1623
+  _globals['_ERRORDETAIL']._serialized_end=1689
+  _globals['_ORDERRESULT']._serialized_start=1691
+  _globals['_ORDERRESULT']._serialized_end=1790
+  _globals['_ORDERRESULTS']._serialized_start=1792
+  _globals['_ORDERRESULTS']._serialized_end=1847
+  _globals['_INVENTORYSERVICE']._serialized_start=2208
+  _globals['_INVENTORYSERVICE']._serialized_end=2973
+# @@protoc_insertion_point(module_scope)
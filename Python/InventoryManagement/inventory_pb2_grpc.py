@@ -0,0 +1,446 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+import inventory_pb2 as inventory__pb2
+
+GRPC_GENERATED_VERSION = '1.84.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + ' but the generated code in inventory_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class InventoryServiceStub:
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.CreatePurchaseAgreement = channel.unary_unary(
+                '/inventory.InventoryService/CreatePurchaseAgreement',
+                request_serializer=inventory__pb2.CreatePurchaseAgreementRequest.SerializeToString,
+                response_deserializer=inventory__pb2.Agreement.FromString,
+                _registered_method=True)
+        self.GetPurchaseAgreement = channel.unary_unary(
+                '/inventory.InventoryService/GetPurchaseAgreement',
+                request_serializer=inventory__pb2.GetPurchaseAgreementRequest.SerializeToString,
+                response_deserializer=inventory__pb2.Agreement.FromString,
+                _registered_method=True)
+        self.CreatePurchaseOrder = channel.unary_unary(
+                '/inventory.InventoryService/CreatePurchaseOrder',
+                request_serializer=inventory__pb2.CreatePurchaseOrderRequest.SerializeToString,
+                response_deserializer=inventory__pb2.Order.FromString,
+                _registered_method=True)
+        self.ReceivePurchaseOrder = channel.unary_unary(
+                '/inventory.InventoryService/ReceivePurchaseOrder',
+                request_serializer=inventory__pb2.ReceivePurchaseOrderRequest.SerializeToString,
+                response_deserializer=inventory__pb2.Order.FromString,
+                _registered_method=True)
+        self.GetPurchaseOrder = channel.unary_unary(
+                '/inventory.InventoryService/GetPurchaseOrder',
+                request_serializer=inventory__pb2.GetPurchaseOrderRequest.SerializeToString,
+                response_deserializer=inventory__pb2.Order.FromString,
+                _registered_method=True)
+        self.GetEarliestPlantOrder = channel.unary_unary(
+                '/inventory.InventoryService/GetEarliestPlantOrder',
+                request_serializer=inventory__pb2.GetEarliestPlantOrderRequest.SerializeToString,
+                response_deserializer=inventory__pb2.Order.FromString,
+                _registered_method=True)
+        self.CreatePurchaseOrders = channel.stream_unary(
+                '/inventory.InventoryService/CreatePurchaseOrders',
+                request_serializer=inventory__pb2.CreatePurchaseOrderRequests.SerializeToString,
+                response_deserializer=inventory__pb2.OrderResults.FromString,
+                _registered_method=True)
+        self.ReceivePurchaseOrders = channel.stream_unary(
+                '/inventory.InventoryService/ReceivePurchaseOrders',
+                request_serializer=inventory__pb2.ReceivePurchaseOrderRequests.SerializeToString,
+                response_deserializer=inventory__pb2.OrderResults.FromString,
+                _registered_method=True)
+        self.ListOrders = channel.unary_stream(
+                '/inventory.InventoryService/ListOrders',
+                request_serializer=inventory__pb2.ListOrdersRequest.SerializeToString,
+                response_deserializer=inventory__pb2.Orders.FromString,
+                _registered_method=True)
+
+
+class InventoryServiceServicer:
+    """Missing associated documentation comment in .proto file."""
+
+    def CreatePurchaseAgreement(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetPurchaseAgreement(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CreatePurchaseOrder(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReceivePurchaseOrder(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetPurchaseOrder(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetEarliestPlantOrder(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CreatePurchaseOrders(self, request_iterator, context):
+        """Bulk ingest: the streamed orders are created in batches of one transaction each, the response has one result per
+        order in stream order. Sending many orders per message saves the per message cost of the stream.
+        allocation_policy is not supported here.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReceivePurchaseOrders(self, request_iterator, context):
+        """Bulk receipt, committed in batches like CreatePurchaseOrders.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListOrders(self, request, context):
+        """Orders matching the filters ordered by order_id, streamed in chunks of up to chunk_size orders.
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_InventoryServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'CreatePurchaseAgreement': grpc.unary_unary_rpc_method_handler(
+                    servicer.CreatePurchaseAgreement,
+                    request_deserializer=inventory__pb2.CreatePurchaseAgreementRequest.FromString,
+                    response_serializer=inventory__pb2.Agreement.SerializeToString,
+            ),
+            'GetPurchaseAgreement': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPurchaseAgreement,
+                    request_deserializer=inventory__pb2.GetPurchaseAgreementRequest.FromString,
+                    response_serializer=inventory__pb2.Agreement.SerializeToString,
+            ),
+            'CreatePurchaseOrder': grpc.unary_unary_rpc_method_handler(
+                    servicer.CreatePurchaseOrder,
+                    request_deserializer=inventory__pb2.CreatePurchaseOrderRequest.FromString,
+                    response_serializer=inventory__pb2.Order.SerializeToString,
+            ),
+            'ReceivePurchaseOrder': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReceivePurchaseOrder,
+                    request_deserializer=inventory__pb2.ReceivePurchaseOrderRequest.FromString,
+                    response_serializer=inventory__pb2.Order.SerializeToString,
+            ),
+            'GetPurchaseOrder': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPurchaseOrder,
+                    request_deserializer=inventory__pb2.GetPurchaseOrderRequest.FromString,
+                    response_serializer=inventory__pb2.Order.SerializeToString,
+            ),
+            'GetEarliestPlantOrder': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetEarliestPlantOrder,
+                    request_deserializer=inventory__pb2.GetEarliestPlantOrderRequest.FromString,
+                    response_serializer=inventory__pb2.Order.SerializeToString,
+            ),
+            'CreatePurchaseOrders': grpc.stream_unary_rpc_method_handler(
+                    servicer.CreatePurchaseOrders,
+                    request_deserializer=inventory__pb2.CreatePurchaseOrderRequests.FromString,
+                    response_serializer=inventory__pb2.OrderResults.SerializeToString,
+            ),
+            'ReceivePurchaseOrders': grpc.stream_unary_rpc_method_handler(
+                    servicer.ReceivePurchaseOrders,
+                    request_deserializer=inventory__pb2.ReceivePurchaseOrderRequests.FromString,
+                    response_serializer=inventory__pb2.OrderResults.SerializeToString,
+            ),
+            'ListOrders': grpc.unary_stream_rpc_method_handler(
+                    servicer.ListOrders,
+                    request_deserializer=inventory__pb2.ListOrdersRequest.FromString,
+                    response_serializer=inventory__pb2.Orders.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'inventory.InventoryService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('inventory.InventoryService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class InventoryService:
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def CreatePurchaseAgreement(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/CreatePurchaseAgreement',
+            inventory__pb2.CreatePurchaseAgreementRequest.SerializeToString,
+            inventory__pb2.Agreement.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetPurchaseAgreement(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/GetPurchaseAgreement',
+            inventory__pb2.GetPurchaseAgreementRequest.SerializeToString,
+            inventory__pb2.Agreement.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CreatePurchaseOrder(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/CreatePurchaseOrder',
+            inventory__pb2.CreatePurchaseOrderRequest.SerializeToString,
+            inventory__pb2.Order.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReceivePurchaseOrder(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/ReceivePurchaseOrder',
+            inventory__pb2.ReceivePurchaseOrderRequest.SerializeToString,
+            inventory__pb2.Order.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetPurchaseOrder(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/GetPurchaseOrder',
+            inventory__pb2.GetPurchaseOrderRequest.SerializeToString,
+            inventory__pb2.Order.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetEarliestPlantOrder(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/inventory.InventoryService/GetEarliestPlantOrder',
+            inventory__pb2.GetEarliestPlantOrderRequest.SerializeToString,
+            inventory__pb2.Order.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CreatePurchaseOrders(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/inventory.InventoryService/CreatePurchaseOrders',
+            inventory__pb2.CreatePurchaseOrderRequests.SerializeToString,
+            inventory__pb2.OrderResults.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReceivePurchaseOrders(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/inventory.InventoryService/ReceivePurchaseOrders',
+            inventory__pb2.ReceivePurchaseOrderRequests.SerializeToString,
+            inventory__pb2.OrderResults.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ListOrders(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/inventory.InventoryService/ListOrders',
+            inventory__pb2.ListOrdersRequest.SerializeToString,
+            inventory__pb2.Orders.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,91 @@
+import argparse
+import sys
+
+from sqlalchemy import create_engine
+
+import archiver
+import bulk_loader
+import migrations
+import rollups
+
+
+def migrate(engine, args):
+    applied = migrations.upgrade(engine)
+    print(f'Applied migrations: {", ".join(applied)}' if applied else 'Schema is up to date')
+
+
+def init_db(engine, args):
+    applied = migrations.init_db(engine)
+    print(f'Database initialized, applied migrations: {", ".join(applied)}' if applied else 'Database initialized')
+
+
+def rebuild_rollups(engine, args):
+    with engine.begin() as connection:
+        rollups.rebuild(connection)
+    print('Rebuilt rollups')
+
+
+def check_rollups(engine, args):
+    with engine.connect() as connection:
+        differences = rollups.check_consistency(connection)
+    for difference in differences:
+        print(difference)
+    if differences:
+        sys.exit(f'{len(differences)} rollup rows differ from the base tables')
+    print('Rollups are consistent')
+
+
+def archive(engine, args):
+    orders, agreements = archiver.archive(engine, args.older_than_days, batch_size=args.batch_size)
+    print(f'Archived {orders} orders and {agreements} agreements')
+
+
+def bulk_load(engine, args):
+    if not (args.agreements or args.orders or args.receipts):
+        sys.exit('Give at least one of --agreements, --orders and --receipts')
+    statistics = bulk_loader.BulkLoader(
+        engine, chunk_size=args.chunk_size, rejects_path=args.rejects, defer_indexes=not args.keep_indexes
+    ).load(args.agreements, args.orders, args.receipts)
+    for kind_statistics in statistics.values():
+        print(f'Loaded {kind_statistics}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inventory Management maintenance commands')
+    parser.add_argument('--database-url', default='sqlite:///inventory.db')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('init-db', help='migrate and insert the reference data, run once before serving')\
+        .set_defaults(handler=init_db)
+    subparsers.add_parser('migrate', help='create missing tables/indexes and add/backfill new columns')\
+        .set_defaults(handler=migrate)
+    subparsers.add_parser('rebuild-rollups', help='recompute the rollup tables from orders and agreements')\
+        .set_defaults(handler=rebuild_rollups)
+    subparsers.add_parser('check-rollups', help='compare the rollup tables with orders and agreements, '
+                                                'exits with an error when they differ')\
+        .set_defaults(handler=check_rollups)
+    archive_parser = subparsers.add_parser('archive', help='move delivered orders and closed agreements older than '
+                                                           '--older-than-days to the archive tables')
+    archive_parser.add_argument('--older-than-days', type=int, default=365)
+    archive_parser.add_argument('--batch-size', type=int, default=1000, help='rows moved per transaction')
+    archive_parser.set_defaults(handler=archive)
+    load_parser = subparsers.add_parser('bulk-load', help='load historical agreements, orders and receipts from CSV '
+                                                          'or NDJSON files, resumes an interrupted load')
+    for kind in bulk_loader.KINDS:
+        load_parser.add_argument(f'--{kind}', help=f'CSV or NDJSON file of {kind}')
+    load_parser.add_argument('--chunk-size', type=int, default=50000, help='rows per transaction')
+    load_parser.add_argument('--rejects', help='NDJSON file the rejected rows are appended to')
+    load_parser.add_argument('--keep-indexes', action='store_true',
+                             help='keep the indexes while loading instead of building them at the end')
+    load_parser.set_defaults(handler=bulk_load)
+
+    args = parser.parse_args(argv)
+    engine = create_engine(args.database_url)
+    try:
+        args.handler(engine, args)
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,420 @@
+import heapq
+import struct
+from datetime import date
+
+from interval_index import AgreementIntervalIndex
+from inventory_manager import InventoryManager, MAX_PAGE_SIZE, InvalidListRequestException, PlantNotFoundException, \
+    PurchaseAgreementNotFound, PurchaseOrderNotFound, PurchaseOrderValidationException, \
+    PURCHASE_ORDER_VALIDATION_EXCEPTIONS, _decode_cursor, _encode_cursor
+from serializers import format_date
+
+"""
+Pure in-memory engine with the interface and exceptions of InventoryManager, for simulations replaying large
+histories through the business rules without a database round trip per call. The business rules are the
+InventoryManager validations themselves.
+
+- agreements and orders are __slots__ records keyed by id (ids increase, so dict order is id order)
+- the consumed quantity of an agreement is kept on its record, and like the version columns of the tables a record's
+  version counts its changes (the ETag of its GET resource)
+- earliest delivered order per plant comes from a min-heap of (delivery_date, order_id) per plant, entries of orders
+  received again with another date are dropped lazily when they reach the top
+- rollups (plant daily deliveries, vendor open quantity, agreement delivered quantity) are plain dicts
+- agreement durations are kept in an AgreementIntervalIndex for automatic allocation
+
+save_snapshot()/load_snapshot() persist the records in a compact fixed-width binary file, heaps and rollups are
+rebuilt on load.
+"""
+
+SNAPSHOT_MAGIC = b'INVM'
+SNAPSHOT_VERSION = 2
+_HEADER = struct.Struct('<4sHqq')
+# agreement_id, plant_id, vendor_id, agreement_date, agreement_start, agreement_end (date ordinals), quantity,
+# consumed_quantity, version
+_AGREEMENT = struct.Struct('<qqqiiiqqq')
+# order_id, agreement_id, vendor_id, plant_id (0 for none), order_date, delivery_date (date ordinals, 0 for none),
+# quantity, version
+_ORDER = struct.Struct('<qqqqiiqq')
+
+
+class AgreementRecord:
+    __slots__ = ('agreement_id', 'plant_id', 'vendor_id', 'agreement_date', 'agreement_start', 'agreement_end',
+                 'quantity', 'consumed_quantity', 'version')
+
+    def __init__(self, agreement_id, plant_id, vendor_id, agreement_date, agreement_start, agreement_end, quantity,
+                 consumed_quantity=0, version=1):
+        self.agreement_id = agreement_id
+        self.plant_id = plant_id
+        self.vendor_id = vendor_id
+        self.agreement_date = agreement_date
+        self.agreement_start = agreement_start
+        self.agreement_end = agreement_end
+        self.quantity = quantity
+        self.consumed_quantity = consumed_quantity
+        self.version = version
+
+    def serialize(self):
+        return {
+            'agreement_id': self.agreement_id,
+            'plant_id': self.plant_id,
+            'vendor_id': self.vendor_id,
+            'agreement_date': format_date(self.agreement_date),
+            'agreement_start': format_date(self.agreement_start),
+            'agreement_end': format_date(self.agreement_end),
+            'quantity': self.quantity
+        }
+
+
+class OrderRecord:
+    __slots__ = ('order_id', 'agreement_id', 'vendor_id', 'plant_id', 'order_date', 'delivery_date', 'quantity',
+                 'version')
+
+    def __init__(self, order_id, agreement_id, vendor_id, plant_id, order_date, delivery_date, quantity, version=1):
+        self.order_id = order_id
+        self.agreement_id = agreement_id
+        self.vendor_id = vendor_id
+        self.plant_id = plant_id
+        self.order_date = order_date
+        self.delivery_date = delivery_date
+        self.quantity = quantity
+        self.version = version
+
+    def serialize(self):
+        return {
+            'order_id': self.order_id,
+            'agreement_id': self.agreement_id,
+            'vendor_id': self.vendor_id,
+            'plant_id': self.plant_id,
+            'order_date': format_date(self.order_date),
+            'delivery_date': format_date(self.delivery_date),
+            'quantity': self.quantity
+        }
+
+
+class InMemoryInventoryManager:
+
+    def __init__(self):
+        self.agreements = {}
+        self.orders = {}
+        self._next_agreement_id = 1
+        self._next_order_id = 1
+        # plant_id -> heap of (delivery_date, order_id)
+        self._deliveries = {}
+        # (plant_id, delivery_date) -> [delivered_quantity, delivered_orders]
+        self._plant_daily_deliveries = {}
+        # vendor_id -> [open_quantity, open_orders]
+        self._vendor_open_quantities = {}
+        # agreement_id -> delivered quantity
+        self._agreement_delivered_quantities = {}
+        self._agreement_index = AgreementIntervalIndex()
+
+    def create_purchase_agreement(self, plant_id, vendor_id, start, end, quantity) -> AgreementRecord:
+        agreement = AgreementRecord(self._next_agreement_id, plant_id, vendor_id, date.today(), start, end, quantity)
+        self._next_agreement_id += 1
+        self.agreements[agreement.agreement_id] = agreement
+        self._agreement_index.add(agreement.agreement_id, plant_id, vendor_id, start, end)
+        return agreement
+
+    def create_purchase_order(
+            self, quantity, order_date=None, agreement_id=None, vendor_id=None, plant_id=None,
+            allocation_policy=None
+    ) -> OrderRecord:
+        order_date = order_date or date.today()
+        if allocation_policy and not agreement_id:
+            if allocation_policy == 'split':
+                raise PurchaseOrderValidationException(
+                    'split allocation can create several orders, use allocate_purchase_order'
+                )
+            return self.allocate_purchase_order(quantity, plant_id, vendor_id, order_date, allocation_policy)[0]
+
+        agreement = self.agreements.get(agreement_id) if agreement_id else None
+        InventoryManager._validate_purchase_order(
+            quantity, order_date, agreement_id, vendor_id, plant_id, agreement,
+            agreement.consumed_quantity if agreement else 0
+        )
+        if agreement:
+            agreement.consumed_quantity += quantity
+            agreement.version += 1
+            plant_id, vendor_id = agreement.plant_id, agreement.vendor_id
+
+        return self._add_order(agreement_id, vendor_id, plant_id, order_date, quantity)
+
+    def allocate_purchase_order(
+            self, quantity, plant_id, vendor_id, order_date=None, allocation_policy='earliest_expiring'
+    ) -> list:
+        order_date = order_date or date.today()
+        agreements = [self.agreements[agreement_id] for agreement_id in self._agreement_index.covering(
+            plant_id, vendor_id, order_date
+        )]
+        allocations = InventoryManager._allocations(
+            quantity, plant_id, vendor_id, order_date, allocation_policy,
+            [agreement for agreement in agreements if agreement.consumed_quantity < agreement.quantity]
+        )
+        orders = []
+        for agreement, agreement_quantity in allocations:
+            agreement.consumed_quantity += agreement_quantity
+            agreement.version += 1
+            orders.append(self._add_order(agreement.agreement_id, vendor_id, plant_id, order_date, agreement_quantity))
+        return orders
+
+    def create_purchase_orders(self, batch) -> list:
+        """
+        Same results as InventoryManager.create_purchase_orders: {'order': serialized order} or
+        {'error': message, 'error_type': exception class name} per batch item
+        """
+        results = []
+        for item in batch:
+            try:
+                order = self.create_purchase_order(
+                    item['quantity'], order_date=item.get('order_date', date.today()),
+                    agreement_id=item.get('agreement_id'), vendor_id=item.get('vendor_id'),
+                    plant_id=item.get('plant_id')
+                )
+            except PURCHASE_ORDER_VALIDATION_EXCEPTIONS as e:
+                results.append({'error': e.message, 'error_type': type(e).__name__})
+            else:
+                results.append({'order': order.serialize()})
+        return results
+
+    def receive_purchase_order(self, order_id, delivery_date=None) -> OrderRecord:
+        delivery_date = delivery_date or date.today()
+        order = self.orders.get(order_id)
+        InventoryManager._validate_receipt(
+            order_id, delivery_date, order, self.agreements.get(order.agreement_id) if order else None
+        )
+
+        previous_delivery_date, order.delivery_date = order.delivery_date, delivery_date
+        order.version += 1
+        if previous_delivery_date == delivery_date:
+            return order
+        if previous_delivery_date is None:
+            _add(self._vendor_open_quantities, order.vendor_id, -order.quantity, -1)
+            if order.agreement_id:
+                self._agreement_delivered_quantities[order.agreement_id] = \
+                    self._agreement_delivered_quantities.get(order.agreement_id, 0) + order.quantity
+        else:
+            _add(self._plant_daily_deliveries, (order.plant_id, previous_delivery_date), -order.quantity, -1)
+        _add(self._plant_daily_deliveries, (order.plant_id, delivery_date), order.quantity, 1)
+        heapq.heappush(self._deliveries.setdefault(order.plant_id, []), (delivery_date, order.order_id))
+        return order
+
+    def get_purchase_agreement(self, agreement_id: int) -> AgreementRecord:
+        agreement = self.agreements.get(agreement_id)
+        if not agreement:
+            raise PurchaseAgreementNotFound(f'Can not find purchase agreement for agreement id {agreement_id}')
+        return agreement
+
+    def get_purchase_order(self, order_id: int) -> OrderRecord:
+        order = self.orders.get(order_id)
+        if not order:
+            raise PurchaseOrderNotFound(f'Can not find purchase order for order id {order_id}')
+        return order
+
+    def get_purchase_agreement_version(self, agreement_id: int) -> int:
+        return self.get_purchase_agreement(agreement_id).version
+
+    def get_purchase_order_version(self, order_id: int) -> int:
+        return self.get_purchase_order(order_id).version
+
+    def get_earliest_plant_order_version(self, plant_id: int) -> tuple:
+        order = self.get_earliest_plant_order(plant_id)
+        return order.order_id, order.version
+
+    def get_serialized_purchase_agreement(self, agreement_id: int) -> dict:
+        return self.get_purchase_agreement(agreement_id).serialize()
+
+    def get_serialized_purchase_order(self, order_id: int) -> dict:
+        return self.get_purchase_order(order_id).serialize()
+
+    def get_earliest_plant_order(self, plant_id: int) -> OrderRecord:
+        deliveries = self._deliveries.get(plant_id)
+        # drop entries of orders received again with another date
+        while deliveries and self.orders[deliveries[0][1]].delivery_date != deliveries[0][0]:
+            heapq.heappop(deliveries)
+        if not deliveries:
+            raise PlantNotFoundException(f'No orders found for given plant {plant_id}')
+        return self.orders[deliveries[0][1]]
+
+    def get_plant_daily_deliveries(self, plant_id: int, date_from=None, date_to=None) -> list:
+        return [
+            {'plant_id': plant_id, 'delivery_date': format_date(delivery_date), 'delivered_quantity': quantity,
+             'delivered_orders': orders}
+            for (daily_plant_id, delivery_date), (quantity, orders) in sorted(
+                self._plant_daily_deliveries.items(), key=lambda item: item[0][1]
+            )
+            if daily_plant_id == plant_id and orders > 0 and (not date_from or delivery_date >= date_from)
+            and (not date_to or delivery_date <= date_to)
+        ]
+
+    def get_vendor_open_quantity(self, vendor_id: int) -> dict:
+        open_quantity, open_orders = self._vendor_open_quantities.get(vendor_id, (0, 0))
+        return {'vendor_id': vendor_id, 'open_quantity': open_quantity, 'open_orders': open_orders}
+
+    def get_agreement_utilization(self, agreement_id: int) -> dict:
+        agreement = self.get_purchase_agreement(agreement_id)
+        return {
+            'agreement_id': agreement.agreement_id,
+            'plant_id': agreement.plant_id,
+            'vendor_id': agreement.vendor_id,
+            'quantity': agreement.quantity,
+            'ordered_quantity': agreement.consumed_quantity,
+            'delivered_quantity': self._agreement_delivered_quantities.get(agreement_id, 0),
+            'remaining_quantity': agreement.quantity - agreement.consumed_quantity
+        }
+
+    def iter_orders(
+            self, plant_id=None, vendor_id=None, agreement_id=None, delivered=None, order_date_from=None,
+            order_date_to=None, delivery_date_from=None, delivery_date_to=None, chunk_size=1000
+    ):
+        orders = self._matching_orders(
+            plant_id, vendor_id, agreement_id, delivered, order_date_from, order_date_to, delivery_date_from,
+            delivery_date_to
+        )
+        return _chunks(orders, chunk_size)
+
+    def iter_agreements(self, plant_id=None, vendor_id=None, date_from=None, date_to=None, chunk_size=1000):
+        return _chunks(self._matching_agreements(plant_id, vendor_id, date_from, date_to), chunk_size)
+
+    def list_orders(
+            self, plant_id=None, vendor_id=None, agreement_id=None, delivered=None, order_date_from=None,
+            order_date_to=None, delivery_date_from=None, delivery_date_to=None, cursor=None, limit=100
+    ):
+        orders = self._matching_orders(
+            plant_id, vendor_id, agreement_id, delivered, order_date_from, order_date_to, delivery_date_from,
+            delivery_date_to
+        )
+        return _page(orders, 'order_id', cursor, limit)
+
+    def list_agreements(self, plant_id=None, vendor_id=None, date_from=None, date_to=None, cursor=None, limit=100):
+        return _page(self._matching_agreements(plant_id, vendor_id, date_from, date_to), 'agreement_id', cursor, limit)
+
+    def _add_order(self, agreement_id, vendor_id, plant_id, order_date, quantity):
+        order = OrderRecord(self._next_order_id, agreement_id, vendor_id, plant_id, order_date, None, quantity)
+        self._next_order_id += 1
+        self.orders[order.order_id] = order
+        _add(self._vendor_open_quantities, vendor_id, quantity, 1)
+        return order
+
+    def _matching_orders(
+            self, plant_id, vendor_id, agreement_id, delivered, order_date_from, order_date_to, delivery_date_from,
+            delivery_date_to
+    ):
+        for order in self.orders.values():
+            if (plant_id and order.plant_id != plant_id) or (vendor_id and order.vendor_id != vendor_id) or \
+                    (agreement_id and order.agreement_id != agreement_id):
+                continue
+            if delivered is not None and (order.delivery_date is not None) != delivered:
+                continue
+            if (order_date_from and order.order_date < order_date_from) or \
+                    (order_date_to and order.order_date > order_date_to):
+                continue
+            if (delivery_date_from or delivery_date_to) and order.delivery_date is None:
+                continue
+            if (delivery_date_from and order.delivery_date < delivery_date_from) or \
+                    (delivery_date_to and order.delivery_date > delivery_date_to):
+                continue
+            yield order
+
+    def _matching_agreements(self, plant_id, vendor_id, date_from, date_to):
+        for agreement in self.agreements.values():
+            if (plant_id and agreement.plant_id != plant_id) or (vendor_id and agreement.vendor_id != vendor_id):
+                continue
+            if (date_from and agreement.agreement_end < date_from) or (date_to and agreement.agreement_start > date_to):
+                continue
+            yield agreement
+
+    def save_snapshot(self, path):
+        with open(path, 'wb') as snapshot:
+            snapshot.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self.agreements), len(self.orders)))
+            snapshot.write(b''.join(_AGREEMENT.pack(
+                agreement.agreement_id, agreement.plant_id, agreement.vendor_id, agreement.agreement_date.toordinal(),
+                agreement.agreement_start.toordinal(), agreement.agreement_end.toordinal(), agreement.quantity,
+                agreement.consumed_quantity, agreement.version
+            ) for agreement in self.agreements.values()))
+            snapshot.write(b''.join(_ORDER.pack(
+                order.order_id, order.agreement_id or 0, order.vendor_id or 0, order.plant_id or 0,
+                order.order_date.toordinal(), order.delivery_date.toordinal() if order.delivery_date else 0,
+                order.quantity, order.version
+            ) for order in self.orders.values()))
+
+    @classmethod
+    def load_snapshot(cls, path) -> 'InMemoryInventoryManager':
+        with open(path, 'rb') as snapshot:
+            data = snapshot.read()
+        magic, version, agreement_count, order_count = _HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f'{path} is not a version {SNAPSHOT_VERSION} inventory snapshot')
+
+        inventory_manager = cls()
+        offset = _HEADER.size
+        agreements_end = offset + agreement_count * _AGREEMENT.size
+        for agreement_id, plant_id, vendor_id, agreement_date, start, end, quantity, consumed, version in \
+                _AGREEMENT.iter_unpack(data[offset:agreements_end]):
+            inventory_manager.agreements[agreement_id] = AgreementRecord(
+                agreement_id, plant_id, vendor_id, date.fromordinal(agreement_date), date.fromordinal(start),
+                date.fromordinal(end), quantity, consumed, version
+            )
+        for order_id, agreement_id, vendor_id, plant_id, order_date, delivery_date, quantity, version in \
+                _ORDER.iter_unpack(data[agreements_end:agreements_end + order_count * _ORDER.size]):
+            inventory_manager.orders[order_id] = OrderRecord(
+                order_id, agreement_id or None, vendor_id or None, plant_id or None, date.fromordinal(order_date),
+                date.fromordinal(delivery_date) if delivery_date else None, quantity, version
+            )
+        inventory_manager._rebuild()
+        return inventory_manager
+
+    def _rebuild(self):
+        """
+        Recomputes next ids, delivery heaps and rollups from the records
+        """
+        self._next_agreement_id = max(self.agreements, default=0) + 1
+        self._next_order_id = max(self.orders, default=0) + 1
+        self._agreement_index.add_all(
+            (agreement.agreement_id, agreement.plant_id, agreement.vendor_id, agreement.agreement_start,
+             agreement.agreement_end) for agreement in self.agreements.values()
+        )
+        for order in self.orders.values():
+            if order.delivery_date is None:
+                _add(self._vendor_open_quantities, order.vendor_id, order.quantity, 1)
+                continue
+            self._deliveries.setdefault(order.plant_id, []).append((order.delivery_date, order.order_id))
+            _add(self._plant_daily_deliveries, (order.plant_id, order.delivery_date), order.quantity, 1)
+            if order.agreement_id:
+                self._agreement_delivered_quantities[order.agreement_id] = \
+                    self._agreement_delivered_quantities.get(order.agreement_id, 0) + order.quantity
+        for deliveries in self._deliveries.values():
+            heapq.heapify(deliveries)
+
+
+def _add(totals, key, quantity, count):
+    total = totals.get(key)
+    if total is None:
+        totals[key] = [quantity, count]
+    else:
+        total[0] += quantity
+        total[1] += count
+
+
+def _page(records, key, cursor, limit):
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise InvalidListRequestException(f'limit needs to be between 1 and {MAX_PAGE_SIZE}')
+    after = _decode_cursor(cursor) if cursor else None
+    rows = []
+    for record in records:
+        if after is not None and getattr(record, key) <= after:
+            continue
+        rows.append(record.serialize())
+        if len(rows) > limit:
+            break
+    next_cursor = _encode_cursor(rows[limit - 1][key]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _chunks(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record.serialize())
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
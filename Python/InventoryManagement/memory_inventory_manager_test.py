@@ -0,0 +1,55 @@
+import os
+import unittest
+from datetime import date, timedelta
+
+from inventory_manager_test import InventoryManagerContract
+from memory_inventory_manager import InMemoryInventoryManager
+
+
+class InMemoryInventoryManagerTest(InventoryManagerContract, unittest.TestCase):
+    def setUp(self) -> None:
+        self.inventory_manager = InMemoryInventoryManager()
+        self.plant_id, self.vendor_id = 1, 1
+
+    def tearDown(self) -> None:
+        snapshot_file = 'memory_inventory_manager_test.snapshot'
+        if os.path.exists(snapshot_file):
+            os.remove(snapshot_file)
+
+    def test_snapshot_round_trip(self):
+        agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant_id, vendor_id=self.vendor_id,
+            start=date.today() - timedelta(days=35), end=date.today() + timedelta(days=365), quantity=1000
+        )
+        order_1 = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today() - timedelta(days=10), agreement_id=agreement.agreement_id
+        )
+        self.inventory_manager.receive_purchase_order(order_1.order_id, delivery_date=date.today() - timedelta(days=5))
+        self.inventory_manager.create_purchase_order(
+            quantity=20, order_date=date.today(), vendor_id=self.vendor_id, plant_id=self.plant_id + 1
+        )
+
+        self.inventory_manager.save_snapshot('memory_inventory_manager_test.snapshot')
+        loaded = InMemoryInventoryManager.load_snapshot('memory_inventory_manager_test.snapshot')
+
+        self.assertEqual(loaded.list_agreements(), self.inventory_manager.list_agreements())
+        self.assertEqual(loaded.list_orders(), self.inventory_manager.list_orders())
+        self.assertEqual(loaded.get_earliest_plant_order(self.plant_id).order_id, order_1.order_id)
+        self.assertEqual(loaded.get_earliest_plant_order_version(self.plant_id), (order_1.order_id, 2))
+        self.assertEqual(loaded.get_purchase_agreement_version(agreement.agreement_id), 2)
+        self.assertEqual(loaded.get_vendor_open_quantity(self.vendor_id),
+                         self.inventory_manager.get_vendor_open_quantity(self.vendor_id))
+        self.assertEqual(loaded.get_agreement_utilization(agreement.agreement_id),
+                         self.inventory_manager.get_agreement_utilization(agreement.agreement_id))
+        # ids continue after the loaded records
+        order = loaded.create_purchase_order(quantity=1, order_date=date.today(), agreement_id=agreement.agreement_id)
+        self.assertEqual(order.order_id, 3)
+
+        with open('memory_inventory_manager_test.snapshot', 'wb') as snapshot:
+            snapshot.write(b'not a snapshot of the inventory')
+        with self.assertRaises(ValueError):
+            InMemoryInventoryManager.load_snapshot('memory_inventory_manager_test.snapshot')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,256 @@
+import bisect
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+"""
+Request and database instrumentation rendered in Prometheus text format. Nothing here is registered unless
+metrics are enabled (METRICS_ENABLED), so a disabled app pays no per-request or per-statement cost.
+
+- per route request latency histogram and request counter
+- SQL statements and SQL time per request (histograms) and statement duration (histogram), from engine cursor events
+- connection pool checkout wait (histogram), from TimedQueuePool
+- session commit duration (histogram), from session events
+"""
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+_checkout = threading.local()
+
+
+class Histogram:
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        for label_values, values in series:
+            labels = _labels(self.label_names, label_values)
+            cumulative = 0
+            for bucket, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels_with(labels, "le", bucket)} {cumulative}')
+            lines.append(f'{self.name}_bucket{_labels_with(labels, "le", "+Inf")} {values[-1]}')
+            lines.append(f'{self.name}_sum{_braces(labels)} {values[-2]}')
+            lines.append(f'{self.name}_count{_braces(labels)} {values[-1]}')
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f'{self.name}{_braces(_labels(self.label_names, label_values))} {value}')
+        return lines
+
+
+class Gauge:
+    """
+    Gauge whose values are read from callback() -> {label values tuple: value} when rendered
+    """
+
+    def __init__(self, name, help_text, callback, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.label_names = label_names
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} gauge']
+        for label_values, value in sorted(self.callback().items()):
+            lines.append(f'{self.name}{_braces(_labels(self.label_names, label_values))} {value}')
+        return lines
+
+
+class RequestStats:
+    __slots__ = ('route', 'started', 'statements', 'statement_seconds')
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.statement_seconds = 0.0
+
+
+class Metrics:
+
+    def __init__(self):
+        self._current = threading.local()
+        self.request_duration = Histogram(
+            'inventory_http_request_duration_seconds', 'Request latency by route', ('route', 'method')
+        )
+        self.requests = Counter('inventory_http_requests_total', 'Requests by route and status',
+                                ('route', 'method', 'status'))
+        self.statements_per_request = Histogram(
+            'inventory_sql_statements_per_request', 'SQL statements issued per request by route', ('route',),
+            buckets=COUNT_BUCKETS
+        )
+        self.sql_seconds_per_request = Histogram(
+            'inventory_sql_seconds_per_request', 'Time spent executing SQL per request by route', ('route',)
+        )
+        self.statements = Counter('inventory_sql_statements_total', 'SQL statements by route', ('route',))
+        self.statement_duration = Histogram(
+            'inventory_sql_statement_duration_seconds', 'SQL statement execution time by route', ('route',)
+        )
+        self.pool_checkout_wait = Histogram(
+            'inventory_db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection'
+        )
+        self.commit_duration = Histogram('inventory_db_session_commit_seconds', 'Session commit time')
+        self.collectors = [
+            self.request_duration, self.requests, self.statements_per_request, self.sql_seconds_per_request,
+            self.statements, self.statement_duration, self.pool_checkout_wait, self.commit_duration,
+        ]
+
+    def add_collector(self, collector):
+        """
+        Adds any object with render() -> list of Prometheus text lines to /metrics output
+        """
+        self.collectors.append(collector)
+
+    @property
+    def current(self):
+        return getattr(self._current, 'stats', None)
+
+    def begin_request(self, route):
+        self._current.stats = RequestStats(route)
+
+    def end_request(self, method, status):
+        stats = self.current
+        if stats is None:
+            return
+        self._current.stats = None
+        self.request_duration.observe(time.perf_counter() - stats.started, stats.route, method)
+        self.requests.inc(stats.route, method, str(status))
+        self.statements_per_request.observe(stats.statements, stats.route)
+        self.sql_seconds_per_request.observe(stats.statement_seconds, stats.route)
+
+    def init_app(self, app):
+        """
+        Times every request of a Flask app and serves the metrics on /metrics
+        """
+        from flask import Response, g, request
+
+        @app.before_request
+        def begin_request():
+            self.begin_request(request.url_rule.rule if request.url_rule else 'unmatched')
+
+        @app.after_request
+        def record_status(response):
+            g.metrics_status = response.status_code
+            return response
+
+        @app.teardown_request
+        def end_request(exception):
+            self.end_request(request.method, 500 if exception else g.get('metrics_status', 500))
+
+        app.add_url_rule(
+            '/metrics', 'metrics', lambda: Response(self.render(), mimetype='text/plain; version=0.0.4')
+        )
+
+    def instrument_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        if isinstance(engine.pool, TimedQueuePool):
+            event.listen(engine.pool, 'checkout', self._checkout)
+
+    def instrument_sessions(self, session_factory):
+        event.listen(session_factory, 'before_commit', self._before_commit)
+        event.listen(session_factory, 'after_commit', self._after_commit)
+
+    def render(self):
+        lines = []
+        for collector in self.collectors:
+            lines.extend(collector.render())
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        stats = self.current
+        route = stats.route if stats else 'none'
+        if stats:
+            stats.statements += 1
+            stats.statement_seconds += elapsed
+        self.statements.inc(route)
+        self.statement_duration.observe(elapsed, route)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        started = getattr(_checkout, 'started', None)
+        if started is not None:
+            _checkout.started = None
+            self.pool_checkout_wait.observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _before_commit(session):
+        session.info['commit_started'] = time.perf_counter()
+
+    def _after_commit(self, session):
+        started = session.info.pop('commit_started', None)
+        if started is not None:
+            self.commit_duration.observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool recording when a checkout starts, the pool checkout event then reports how long it waited
+    """
+
+    def _do_get(self):
+        _checkout.started = time.perf_counter()
+        return super()._do_get()
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _labels_with(labels, name, value):
+    return _braces(f'{labels},{name}="{value}"' if labels else f'{name}="{value}"')
+
+
+def _braces(labels):
+    return f'{{{labels}}}' if labels else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
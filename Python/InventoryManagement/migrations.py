@@ -0,0 +1,127 @@
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.orm import Session
+
+import rollups
+from models.agreement import Agreement  # noqa: F401 models below are imported to register them on Base.metadata
+from models.agreement_utilization import AgreementUtilization
+from models.archived_agreement import ArchivedAgreement  # noqa: F401
+from models.archived_order import ArchivedOrder  # noqa: F401
+from models.database import Base
+from models.id_sequence import IdSequence  # noqa: F401
+from models.load_checkpoint import LoadCheckpoint  # noqa: F401
+from models.order import Order  # noqa: F401
+from models.plant import Plant
+from models.plant_daily_delivery import PlantDailyDelivery  # noqa: F401
+from models.plant_earliest_delivery import PlantEarliestDelivery  # noqa: F401
+from models.vendor import Vendor
+from models.vendor_open_quantity import VendorOpenQuantity  # noqa: F401
+
+"""
+Idempotent schema migrations for databases created by an earlier version of the models. New tables and indexes are
+created from the model metadata, new columns on existing tables are added and backfilled by the migrations below.
+seed() inserts the reference data the app expects.
+"""
+
+
+def add_agreement_consumed_quantity(connection):
+    """
+    Adds agreement.consumed_quantity and backfills it from the orders placed against each agreement
+    """
+    if 'consumed_quantity' in {column['name'] for column in inspect(connection).get_columns('agreement')}:
+        return False
+
+    connection.execute(text('ALTER TABLE agreement ADD COLUMN consumed_quantity INTEGER NOT NULL DEFAULT 0'))
+    connection.execute(text(
+        'UPDATE agreement SET consumed_quantity = ('
+        ' SELECT COALESCE(SUM("order".quantity), 0) FROM "order" WHERE "order".agreement_id = agreement.agreement_id'
+        ')'
+    ))
+    return True
+
+
+def fill_order_plant_and_vendor_from_agreement(connection):
+    """
+    Orders under an agreement carry the plant and vendor of the agreement, fills them in for older orders
+    """
+    filled = connection.execute(text(
+        'UPDATE "order" SET '
+        ' plant_id = (SELECT agreement.plant_id FROM agreement WHERE agreement.agreement_id = "order".agreement_id),'
+        ' vendor_id = (SELECT agreement.vendor_id FROM agreement WHERE agreement.agreement_id = "order".agreement_id) '
+        'WHERE agreement_id IS NOT NULL AND (plant_id IS NULL OR vendor_id IS NULL)'
+    ))
+    return filled.rowcount > 0
+
+
+def add_version_columns(connection):
+    """
+    Adds the version column (see Agreement.version) to agreements and orders, live and archived, existing rows start
+    at version 1
+    """
+    added = False
+    for table in ('agreement', 'order', 'archived_agreement', 'archived_order'):
+        if 'version' in {column['name'] for column in inspect(connection).get_columns(table)}:
+            continue
+        connection.execute(text(f'ALTER TABLE "{table}" ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+        added = True
+    return added
+
+
+def build_rollups(connection):
+    """
+    Builds the rollup tables from the base tables when agreements exist but their rollups do not yet
+    """
+    if connection.execute(select(func.count()).select_from(AgreementUtilization)).scalar() or \
+            not connection.execute(select(func.count()).select_from(Agreement)).scalar():
+        return False
+
+    rollups.rebuild(connection)
+    return True
+
+
+MIGRATIONS = [
+    add_agreement_consumed_quantity,
+    fill_order_plant_and_vendor_from_agreement,
+    add_version_columns,
+    build_rollups,
+]
+
+
+def seed(session):
+    """
+    Reference data the app expects to exist
+    """
+    if not session.query(Plant).filter(Plant.plant_id == 1).first():
+        plant = Plant(plant_id=1, name='Plant A')
+        session.add(plant)
+        session.commit()
+
+    if not session.query(Vendor).filter(Vendor.vendor_id == 1).first():
+        vendor = Vendor(vendor_id=1, name='Vendor A')
+        session.add(vendor)
+        session.commit()
+
+
+def upgrade(engine):
+    """
+    Brings the schema of given engine up to date with the models, returns names of the column migrations applied
+    """
+    applied = []
+    with engine.begin() as connection:
+        Base.metadata.create_all(connection)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        for migration in MIGRATIONS:
+            if migration(connection):
+                applied.append(migration.__name__)
+    return applied
+
+
+def init_db(engine):
+    """
+    One-time setup of a database before the app serves from it: upgrade() and seed(), returns the migrations applied
+    """
+    applied = upgrade(engine)
+    with Session(bind=engine) as session:
+        seed(session)
+    return applied
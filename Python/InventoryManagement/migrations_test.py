@@ -0,0 +1,64 @@
+import os
+import unittest
+
+from sqlalchemy import create_engine, text
+
+import migrations
+import rollups
+
+
+class MigrationsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine('sqlite:///migrations_test.db')
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+        db_file = "migrations_test.db"
+        if os.path.exists(db_file):
+            os.remove(db_file)
+
+    def test_upgrade_backfills_agreement_consumed_quantity(self):
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                'CREATE TABLE agreement (agreement_id INTEGER PRIMARY KEY, plant_id INTEGER NOT NULL, '
+                'vendor_id INTEGER NOT NULL, agreement_date DATE NOT NULL, agreement_start DATE NOT NULL, '
+                'agreement_end DATE NOT NULL, quantity INTEGER NOT NULL)'
+            ))
+            connection.execute(text(
+                'CREATE TABLE "order" (order_id INTEGER PRIMARY KEY, agreement_id INTEGER, vendor_id INTEGER, '
+                'plant_id INTEGER, order_date DATE NOT NULL, delivery_date DATE, quantity INTEGER NOT NULL)'
+            ))
+            connection.execute(text(
+                "INSERT INTO agreement VALUES (1, 1, 1, '2023-01-01', '2023-01-01', '2024-01-01', 1000), "
+                "(2, 1, 1, '2023-01-01', '2023-01-01', '2024-01-01', 1000)"
+            ))
+            connection.execute(text(
+                "INSERT INTO \"order\" VALUES (1, 1, NULL, NULL, '2023-02-01', NULL, 100), "
+                "(2, 1, NULL, NULL, '2023-02-01', NULL, 250), (3, NULL, 1, 1, '2023-02-01', NULL, 50)"
+            ))
+
+        self.assertEqual(
+            migrations.upgrade(self.engine),
+            ['add_agreement_consumed_quantity', 'fill_order_plant_and_vendor_from_agreement', 'add_version_columns',
+             'build_rollups']
+        )
+        with self.engine.connect() as connection:
+            consumed = connection.execute(
+                text('SELECT agreement_id, consumed_quantity FROM agreement ORDER BY agreement_id')
+            ).all()
+            orders = connection.execute(text('SELECT order_id, plant_id, vendor_id FROM "order" ORDER BY order_id')).all()
+            versions = connection.execute(text('SELECT DISTINCT version FROM agreement')).scalars().all()
+            open_quantity = connection.execute(text('SELECT open_quantity FROM vendor_open_quantity')).scalar()
+            self.assertEqual(rollups.check_consistency(connection), [])
+        self.assertEqual([tuple(row) for row in consumed], [(1, 350), (2, 0)])
+        self.assertEqual([tuple(row) for row in orders], [(1, 1, 1), (2, 1, 1), (3, 1, 1)])
+        self.assertEqual(open_quantity, 400)
+        self.assertEqual(versions, [1])
+
+        # already migrated
+        self.assertEqual(migrations.upgrade(self.engine), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, Integer, ForeignKey
+from sqlalchemy import Column, Date, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from models.database import Base
@@ -6,6 +6,11 @@ from models.database import Base
 
 class Agreement(Base):
     __tablename__ = 'agreement'
+    __table_args__ = (
+        # agreements of a plant/vendor, keyset paginated by agreement_id
+        Index('ix_agreement_plant_id_agreement_id', 'plant_id', 'agreement_id'),
+        Index('ix_agreement_vendor_id_agreement_id', 'vendor_id', 'agreement_id'),
+    )
 
     agreement_id = Column(Integer, primary_key=True, autoincrement=True)
     plant_id = Column(Integer, ForeignKey('plant.plant_id'), nullable=False)
@@ -14,6 +19,10 @@ class Agreement(Base):
     agreement_start = Column(Date, nullable=False)
     agreement_end = Column(Date, nullable=False)
     quantity = Column(Integer, nullable=False)
+    # running total of ordered quantity against this agreement, maintained by InventoryManager.create_purchase_order
+    consumed_quantity = Column(Integer, nullable=False, default=0, server_default='0')
+    # bumped by every UPDATE of the row, the ETag of GET /agreements/<agreement_id>
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     orders = relationship('Order', back_populates='agreement')
     # we skip to back populate agreements on plant there can be too many agreements for a given plant
     plant = relationship('Plant')
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, ForeignKey
+
+from models.database import Base
+
+
+class AgreementUtilization(Base):
+    """
+    Rollup of ordered and received quantity per agreement, maintained by InventoryManager (see rollups.py)
+    """
+    __tablename__ = 'agreement_utilization'
+
+    # no foreign key, utilization of archived agreements is kept (see archiver.py)
+    agreement_id = Column(Integer, primary_key=True, autoincrement=False)
+    plant_id = Column(Integer, ForeignKey('plant.plant_id'), nullable=False)
+    vendor_id = Column(Integer, ForeignKey('vendor.vendor_id'), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    ordered_quantity = Column(Integer, nullable=False, default=0)
+    delivered_quantity = Column(Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            'agreement_id': self.agreement_id,
+            'plant_id': self.plant_id,
+            'vendor_id': self.vendor_id,
+            'quantity': self.quantity,
+            'ordered_quantity': self.ordered_quantity,
+            'delivered_quantity': self.delivered_quantity,
+            'remaining_quantity': self.quantity - self.ordered_quantity
+        }
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Date, Integer
+
+from models.database import Base
+
+
+class ArchivedAgreement(Base):
+    """
+    Closed agreement moved out of the agreement table by archiver.archive_agreements, same columns as Agreement
+    """
+    __tablename__ = 'archived_agreement'
+
+    agreement_id = Column(Integer, primary_key=True, autoincrement=False)
+    plant_id = Column(Integer, nullable=False)
+    vendor_id = Column(Integer, nullable=False)
+    agreement_date = Column(Date, nullable=False)
+    agreement_start = Column(Date, nullable=False)
+    agreement_end = Column(Date, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    consumed_quantity = Column(Integer, nullable=False)
+    # version of the agreement when it was archived
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    archived_date = Column(Date, nullable=False)
+
+    def serialize(self):
+        return {
+            'agreement_id': self.agreement_id,
+            'plant_id': self.plant_id,
+            'vendor_id': self.vendor_id,
+            'agreement_date': self.agreement_date.strftime('%Y-%m-%d'),
+            'agreement_start': self.agreement_start.strftime('%Y-%m-%d'),
+            'agreement_end': self.agreement_end.strftime('%Y-%m-%d'),
+            'quantity': self.quantity
+        }
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Date, Index, Integer
+
+from models.database import Base
+
+
+class ArchivedOrder(Base):
+    """
+    Delivered order moved out of the order table by archiver.archive_orders, same columns as Order. There are no
+    foreign keys, the agreement of an archived order may be archived as well
+    """
+    __tablename__ = 'archived_order'
+    __table_args__ = (
+        # earliest delivered order of a plant, see InventoryManager._query_earliest_plant_order_id
+        Index('ix_archived_order_plant_id_delivery_date', 'plant_id', 'delivery_date'),
+        Index('ix_archived_order_agreement_id', 'agreement_id'),
+    )
+
+    order_id = Column(Integer, primary_key=True, autoincrement=False)
+    agreement_id = Column(Integer)
+    vendor_id = Column(Integer)
+    plant_id = Column(Integer)
+    order_date = Column(Date, nullable=False)
+    delivery_date = Column(Date, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    # version of the order when it was archived
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    archived_date = Column(Date, nullable=False)
+
+    def serialize(self):
+        return {
+            'order_id': self.order_id,
+            'agreement_id': self.agreement_id,
+            'vendor_id': self.vendor_id,
+            'plant_id': self.plant_id,
+            'order_date': self.order_date.strftime('%Y-%m-%d'),
+            'delivery_date': self.delivery_date.strftime('%Y-%m-%d'),
+            'quantity': self.quantity
+        }
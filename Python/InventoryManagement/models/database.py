@@ -1,3 +1,77 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 Base = declarative_base()
+
+
+def make_engine(
+        url, echo=False, pool_size=10, max_overflow=10, pool_timeout=30, sqlite_journal_mode=None,
+        sqlite_busy_timeout_ms=None, poolclass=QueuePool, sqlite_query_only=False
+):
+    """
+    Creates an engine with a sized connection pool (poolclass, a QueuePool subclass). For a SQLite database file the
+    connections are shared across threads through the pool and given journal mode/busy timeout pragmas are applied on
+    every new connection, with sqlite_query_only the connections refuse to write
+    """
+    url = make_url(url)
+    engine = create_engine(url, echo=echo, **_pool_kwargs(url, poolclass, pool_size, max_overflow, pool_timeout))
+    _listen_sqlite_pragmas(engine, sqlite_journal_mode, sqlite_busy_timeout_ms, sqlite_query_only)
+    return engine
+
+
+def make_async_engine(
+        url, echo=False, pool_size=10, max_overflow=10, pool_timeout=30, sqlite_journal_mode=None,
+        sqlite_busy_timeout_ms=None
+):
+    """
+    Async counterpart of make_engine, a sqlite:// url is served by the aiosqlite driver
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = make_url(url)
+    if url.drivername == 'sqlite':
+        url = url.set(drivername='sqlite+aiosqlite')
+    engine = create_async_engine(
+        url, echo=echo, **_pool_kwargs(url, AsyncAdaptedQueuePool, pool_size, max_overflow, pool_timeout)
+    )
+    _listen_sqlite_pragmas(engine.sync_engine, sqlite_journal_mode, sqlite_busy_timeout_ms)
+    return engine
+
+
+def make_engine_from_config(config, engine_factory=make_engine, **kwargs):
+    return engine_factory(
+        config['DATABASE_URL'], echo=config['SQL_ECHO'], pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_MAX_OVERFLOW'], pool_timeout=config['DB_POOL_TIMEOUT'],
+        sqlite_journal_mode=config['SQLITE_JOURNAL_MODE'], sqlite_busy_timeout_ms=config['SQLITE_BUSY_TIMEOUT_MS'],
+        **kwargs
+    )
+
+
+def _pool_kwargs(url, poolclass, pool_size, max_overflow, pool_timeout):
+    pool_kwargs = {'poolclass': poolclass, 'pool_size': pool_size, 'max_overflow': max_overflow,
+                   'pool_timeout': pool_timeout}
+    if url.get_backend_name() != 'sqlite':
+        return {'pool_pre_ping': True, **pool_kwargs}
+    if url.database and url.database != ':memory:':
+        # SQLite drivers default to NullPool for files, pool them so that concurrent requests reuse connections
+        return {'connect_args': {'check_same_thread': False}, **pool_kwargs}
+    return {}
+
+
+def _listen_sqlite_pragmas(engine, journal_mode, busy_timeout_ms, query_only=False):
+    if engine.url.get_backend_name() != 'sqlite' or not (journal_mode or busy_timeout_ms or query_only):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if journal_mode:
+            cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        if busy_timeout_ms:
+            cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout_ms)}')
+        if query_only:
+            # after journal_mode, switching to WAL writes to the database
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String
+
+from models.database import Base
+
+
+class IdSequence(Base):
+    """
+    Last id handed out per id column (e.g. 'order.order_id') of a shard database, see sharding.ShardIdAllocator
+    """
+    __tablename__ = 'id_sequence'
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False)
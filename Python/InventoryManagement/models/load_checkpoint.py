@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String
+
+from models.database import Base
+
+
+class LoadCheckpoint(Base):
+    """
+    Progress of bulk_loader.py through an input file, committed in the same transaction as the rows loaded from it so
+    an interrupted load resumes after the last committed chunk
+    """
+    __tablename__ = 'load_checkpoint'
+
+    # kind of rows and absolute path of the file, e.g. 'orders:/data/orders.csv'
+    source = Column(String, primary_key=True)
+    # input rows consumed (loaded or rejected)
+    rows = Column(Integer, nullable=False)
+    loaded = Column(Integer, nullable=False)
+    rejected = Column(Integer, nullable=False)
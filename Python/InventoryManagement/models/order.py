@@ -1,4 +1,4 @@
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, Index
 from sqlalchemy import Column, Date, Integer, ForeignKey
 from sqlalchemy.orm import relationship
 
@@ -27,7 +27,16 @@ class Order(Base):
             # when agreement_id is NULL and vendor_id is NOT NULL, plant_id needs to be populated
             "(agreement_id IS NULL AND vendor_id IS NOT NULL AND plant_id IS NOT NULL) OR (agreement_id IS NOT NULL)",
             name="agreement_vendor_plant_check"
-        )
+        ),
+        # support earliest delivered order lookups per plant, for standalone orders and orders under an agreement
+        Index('ix_order_plant_id_delivery_date', 'plant_id', 'delivery_date'),
+        Index('ix_order_agreement_id_delivery_date', 'agreement_id', 'delivery_date'),
+        # keyset paginated listings filtered by plant/vendor/agreement, ordered by order_id
+        Index('ix_order_plant_id_order_id', 'plant_id', 'order_id'),
+        Index('ix_order_vendor_id_order_id', 'vendor_id', 'order_id'),
+        Index('ix_order_agreement_id_order_id', 'agreement_id', 'order_id'),
+        # listings/exports of an order date range across plants and vendors (found by query_advisor.py)
+        Index('ix_order_order_date', 'order_date'),
     )
 
     order_id = Column(Integer, primary_key=True, autoincrement=True)
@@ -39,6 +48,8 @@ class Order(Base):
     order_date = Column(Date, nullable=False)
     delivery_date = Column(Date)
     quantity = Column(Integer, nullable=False)
+    # bumped by every UPDATE of the row, the ETag of GET /orders/<order_id>
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     agreement = relationship('Agreement', back_populates='orders')
     vendor = relationship('Vendor', back_populates='orders')
 
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Date, Integer, ForeignKey
+
+from models.database import Base
+
+
+class PlantDailyDelivery(Base):
+    """
+    Rollup of received orders per plant per delivery date, maintained by InventoryManager (see rollups.py)
+    """
+    __tablename__ = 'plant_daily_delivery'
+
+    plant_id = Column(Integer, ForeignKey('plant.plant_id'), primary_key=True)
+    delivery_date = Column(Date, primary_key=True)
+    delivered_quantity = Column(Integer, nullable=False, default=0)
+    delivered_orders = Column(Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            'plant_id': self.plant_id,
+            'delivery_date': self.delivery_date.strftime('%Y-%m-%d'),
+            'delivered_quantity': self.delivered_quantity,
+            'delivered_orders': self.delivered_orders
+        }
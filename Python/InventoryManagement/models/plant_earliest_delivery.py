@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Date, Integer, ForeignKey
+
+from models.database import Base
+
+
+class PlantEarliestDelivery(Base):
+    """
+    Materialized earliest delivered order per plant, kept current by InventoryManager.receive_purchase_order so
+    get_earliest_plant_order does not need to scan every delivered order of the plant
+    """
+    __tablename__ = 'plant_earliest_delivery'
+
+    plant_id = Column(Integer, ForeignKey('plant.plant_id'), primary_key=True)
+    # no foreign key, the earliest order may have been moved to archived_order (see archiver.py)
+    order_id = Column(Integer, nullable=False)
+    delivery_date = Column(Date, nullable=False)
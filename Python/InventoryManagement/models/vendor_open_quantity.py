@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, ForeignKey
+
+from models.database import Base
+
+
+class VendorOpenQuantity(Base):
+    """
+    Rollup of ordered but not yet received quantity per vendor, maintained by InventoryManager (see rollups.py)
+    """
+    __tablename__ = 'vendor_open_quantity'
+
+    vendor_id = Column(Integer, ForeignKey('vendor.vendor_id'), primary_key=True)
+    open_quantity = Column(Integer, nullable=False, default=0)
+    open_orders = Column(Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            'vendor_id': self.vendor_id,
+            'open_quantity': self.open_quantity,
+            'open_orders': self.open_orders
+        }
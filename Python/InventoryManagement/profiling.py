@@ -0,0 +1,204 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from sqlalchemy import event
+
+"""
+On-demand profiling of single requests. Nothing here is registered unless profiling is enabled (PROFILING_ENABLED).
+
+A request is profiled when it sends the X-Inventory-Profile header with the configured secret, or when it is picked
+by the sampling rate. Its thread is profiled with cProfile (deterministic, saved as .pstats for pstats/snakeviz) while
+a sampler thread records its stacks every few ms (saved as .collapsed, "frame;frame;frame count" lines, the input of
+flamegraph.pl, speedscope or inferno). The root frame of every stack is the route, so profiles of different routes can
+be merged into one flamegraph. Profiles are tagged with route, status and SQL statement count/time.
+
+Sampled requests are kept when they took at least PROFILING_SLOW_MS, requested ones always. GET /admin/profiles
+(same header) lists the recent ones, newest first, and /admin/profiles/<file> downloads a profile file. One request is
+profiled at a time, a request arriving while another is profiled is not profiled.
+"""
+
+PROFILE_HEADER = 'X-Inventory-Profile'
+
+
+class RequestProfile:
+    __slots__ = ('profile_id', 'route', 'method', 'trigger', 'started_at', 'started', 'thread_id', 'profiler',
+                 'samples', 'statements', 'statement_seconds', 'duration_ms', 'status', 'files', '_stop_sampling',
+                 '_sampler')
+
+    def __init__(self, profile_id, route, method, trigger):
+        self.profile_id = profile_id
+        self.route = route
+        self.method = method
+        self.trigger = trigger
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.profiler = cProfile.Profile()
+        self.samples = Counter()
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.duration_ms = None
+        self.status = None
+        self.files = {}
+
+    def serialize(self):
+        return {
+            'profile_id': self.profile_id,
+            'route': self.route,
+            'method': self.method,
+            'status': self.status,
+            'trigger': self.trigger,
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'duration_ms': round(self.duration_ms, 3),
+            'statements': self.statements,
+            'sql_ms': round(self.statement_seconds * 1000, 3),
+            'files': self.files,
+        }
+
+
+class RequestProfiler:
+
+    def __init__(self, directory, secret=None, sample_rate=0.0, slow_ms=100.0, max_profiles=100,
+                 sample_interval_ms=1.0):
+        self.directory = directory
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sample_interval = sample_interval_ms / 1000
+        self.profiles = deque(maxlen=max_profiles)
+        self._current = threading.local()
+        # cProfile can not profile overlapping requests reliably, one profiled request at a time
+        self._busy = threading.Lock()
+        self._ids = iter(range(1, sys.maxsize))
+
+    def authorized(self, header_value):
+        return bool(self.secret) and hmac.compare_digest(header_value or '', self.secret)
+
+    def begin_request(self, route, method, header_value):
+        if self.authorized(header_value):
+            trigger = 'header'
+        elif self.sample_rate and random.random() < self.sample_rate:
+            trigger = 'sampled'
+        else:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+
+        profile = RequestProfile(next(self._ids), route, method, trigger)
+        self._current.profile = profile
+        profile._stop_sampling = threading.Event()
+        profile._sampler = threading.Thread(target=self._sample, args=(profile,), name='request-profile-sampler',
+                                            daemon=True)
+        profile._sampler.start()
+        profile.profiler.enable()
+        return profile
+
+    def end_request(self, status):
+        profile = getattr(self._current, 'profile', None)
+        if profile is None:
+            return None
+        self._current.profile = None
+        try:
+            profile.profiler.disable()
+            profile.duration_ms = (time.perf_counter() - profile.started) * 1000
+            profile._stop_sampling.set()
+            profile._sampler.join()
+            profile.status = status
+            if profile.trigger == 'header' or profile.duration_ms >= self.slow_ms:
+                self._save(profile)
+                self.profiles.appendleft(profile)
+        finally:
+            self._busy.release()
+        return profile
+
+    def recent(self, min_duration_ms=None):
+        return [
+            profile.serialize() for profile in list(self.profiles)
+            if min_duration_ms is None or profile.duration_ms >= min_duration_ms
+        ]
+
+    def instrument_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def init_app(self, app):
+        """
+        Profiles the requests of a Flask app that ask for it (or are sampled) and serves /admin/profiles
+        """
+        from flask import abort, g, jsonify, request, send_from_directory
+
+        @app.before_request
+        def begin_request():
+            self.begin_request(
+                request.url_rule.rule if request.url_rule else 'unmatched', request.method,
+                request.headers.get(PROFILE_HEADER)
+            )
+
+        @app.after_request
+        def record_status(response):
+            g.profile_status = response.status_code
+            return response
+
+        @app.teardown_request
+        def end_request(exception):
+            self.end_request(500 if exception else g.get('profile_status', 500))
+
+        def list_profiles():
+            if not self.authorized(request.headers.get(PROFILE_HEADER)):
+                abort(403)
+            min_duration_ms = request.args.get('min_duration_ms', type=float)
+            return jsonify({'profiles': self.recent(min_duration_ms)})
+
+        def download_profile(file_name):
+            if not self.authorized(request.headers.get(PROFILE_HEADER)):
+                abort(403)
+            return send_from_directory(os.path.abspath(self.directory), file_name, as_attachment=True)
+
+        app.add_url_rule('/admin/profiles', 'admin_profiles', list_profiles)
+        app.add_url_rule('/admin/profiles/<file_name>', 'admin_profile_file', download_profile)
+
+    def _sample(self, profile):
+        root = f'{profile.method} {profile.route}'
+        while not profile._stop_sampling.wait(self.sample_interval):
+            frame = sys._current_frames().get(profile.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            stack.append(root)
+            profile.samples[';'.join(reversed(stack))] += 1
+
+    def _save(self, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        # tags in the file name, so the files make sense without the listing
+        name = '{}-{:06d}_{}_{}_q{}'.format(
+            profile.started_at.strftime('%Y%m%dT%H%M%S'), profile.profile_id,
+            re.sub(r'[^A-Za-z0-9]+', '_', profile.route).strip('_') or 'root', profile.status, profile.statements
+        )
+        profile.profiler.dump_stats(os.path.join(self.directory, f'{name}.pstats'))
+        with open(os.path.join(self.directory, f'{name}.collapsed'), 'w') as collapsed:
+            collapsed.writelines(f'{stack} {count}\n' for stack, count in sorted(profile.samples.items()))
+        profile.files = {'pstats': f'{name}.pstats', 'collapsed': f'{name}.collapsed'}
+        # the profile data is on disk now
+        profile.profiler = None
+        profile.samples = None
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profile_query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['profile_query_started'].pop()
+        profile = getattr(self._current, 'profile', None)
+        if profile is not None:
+            profile.statements += 1
+            profile.statement_seconds += time.perf_counter() - started
@@ -0,0 +1,71 @@
+import os
+import pstats
+import shutil
+import unittest
+
+from app import create_app, init_db
+
+PROFILE_DIRECTORY = 'profiling_test_profiles'
+
+
+class RequestProfilerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = create_app({
+            'DATABASE_URL': 'sqlite:///profiling_test.db', 'CACHE_ENABLED': False, 'PROFILING_ENABLED': True,
+            'PROFILING_SECRET': 'secret', 'PROFILING_DIRECTORY': PROFILE_DIRECTORY, 'PROFILING_SLOW_MS': 10 ** 6
+        })
+        init_db(self.app)
+        self.client = self.app.test_client()
+        self.agreement = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 1, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        }).json
+
+    def tearDown(self) -> None:
+        self.app.extensions['inventory_session'].remove()
+        self.app.extensions['inventory_engine'].dispose()
+        shutil.rmtree(PROFILE_DIRECTORY, ignore_errors=True)
+        for db_file in ['profiling_test.db', 'profiling_test.db-wal', 'profiling_test.db-shm']:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_profile_requested_by_header(self):
+        headers = {'X-Inventory-Profile': 'secret'}
+        response = self.client.post('/get_purchase_agreement', json={'agreement_id': self.agreement['agreement_id']},
+                                    headers=headers)
+        self.assertEqual(response.json, self.agreement)
+
+        self.assertEqual(self.client.get('/admin/profiles').status_code, 403)
+        profiles = self.client.get('/admin/profiles', headers=headers).json['profiles']
+        self.assertEqual(len(profiles), 1)
+        profile = profiles[0]
+        self.assertEqual((profile['route'], profile['method'], profile['status'], profile['trigger']),
+                         ('/get_purchase_agreement', 'POST', 200, 'header'))
+        self.assertGreaterEqual(profile['statements'], 1)
+
+        stats = pstats.Stats(os.path.join(PROFILE_DIRECTORY, profile['files']['pstats']))
+        self.assertTrue(any(function == 'get_purchase_agreement' for _, _, function in stats.stats))
+        with open(os.path.join(PROFILE_DIRECTORY, profile['files']['collapsed'])) as collapsed:
+            for line in collapsed:
+                stack, count = line.rsplit(' ', 1)
+                self.assertTrue(stack.startswith('POST /get_purchase_agreement'))
+                self.assertGreater(int(count), 0)
+
+        downloaded = self.client.get(f'/admin/profiles/{profile["files"]["pstats"]}', headers=headers)
+        self.assertEqual(downloaded.status_code, 200)
+        self.assertEqual(self.client.get('/admin/profiles', headers=headers,
+                                         query_string={'min_duration_ms': 10 ** 6}).json, {'profiles': []})
+
+    def test_sampled_profiles_are_kept_when_slow(self):
+        profiler = self.app.extensions['inventory_profiler']
+        profiler.sample_rate = 1.0
+        self.client.post('/get_purchase_agreement', json={'agreement_id': self.agreement['agreement_id']},
+                         headers={'X-Inventory-Profile': 'wrong'})
+        self.assertEqual(len(profiler.profiles), 0)
+
+        profiler.slow_ms = 0
+        self.client.post('/get_purchase_agreement', json={'agreement_id': self.agreement['agreement_id']})
+        self.assertEqual([profile.trigger for profile in profiler.profiles], ['sampled'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import re
+import sys
+import unittest
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+"""
+Checks the query plans of every statement InventoryManager issues against the indexes of the schema.
+
+While capture() is active every SELECT/UPDATE/DELETE that SQLite runs for code in inventory_manager.py (and what it
+calls, e.g. rollups.py) is explained with EXPLAIN QUERY PLAN on the same connection. Full table scans and temporary
+B-tree sorts are reported per statement, with the method that issued it and an index that would avoid it, suggested
+from the columns the statement filters and sorts the table by.
+
+Some scans are expected (e.g. a listing without filters reads every row), they are kept in
+query_advisor_baseline.json. `python query_advisor.py` runs the InventoryManager tests under capture() and exits with
+an error on a finding that is not in the baseline, query_advisor_test runs the same check with the test suite.
+
+    python query_advisor.py                     # report, fail on new findings
+    python query_advisor.py --update-baseline   # accept the current findings
+"""
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_advisor_baseline.json')
+# test modules whose statements are checked
+DEFAULT_TEST_MODULES = (
+    'inventory_manager_test', 'rollups_test', 'archiver_test', 'sharding_test', 'group_commit_test', 'app_test'
+)
+# statements are attributed to the first frame of these files
+SOURCE_FILES = ('inventory_manager.py',)
+
+_EXPLAINED = re.compile(r'^\s*(SELECT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+_PARAMETER_LIST = re.compile(r'\(\?(?:, \?)*\)')
+# "SCAN order", "SCAN order USING INDEX ...", "SCAN TABLE order" before SQLite 3.36
+_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(?P<table>\w+)"?(?: AS \w+)?(?: USING (?P<index>.*))?$')
+_TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR (?P<purpose>.+)$')
+
+
+class QueryFinding:
+    __slots__ = ('origin', 'statement', 'detail', 'table', 'suggestion')
+
+    def __init__(self, origin, statement, detail, table=None, suggestion=None):
+        self.origin = origin
+        self.statement = statement
+        self.detail = detail
+        self.table = table
+        self.suggestion = suggestion
+
+    @property
+    def key(self):
+        return f'{self.origin} | {self.detail} | {self.statement}'
+
+    def serialize(self):
+        return {
+            'origin': self.origin,
+            'statement': self.statement,
+            'detail': self.detail,
+            'table': self.table,
+            'suggestion': self.suggestion,
+        }
+
+
+def normalize(statement):
+    """
+    statement with whitespace collapsed and expanded IN parameter lists folded, so the same query compares equal
+    whatever its parameters
+    """
+    return _PARAMETER_LIST.sub('(?)', ' '.join(statement.split()))
+
+
+def plan_findings(plan, statement, tables, origin='?'):
+    """
+    QueryFindings of an EXPLAIN QUERY PLAN result (rows of id, parent, notused, detail) of statement, tables are the
+    table names of the database (a scan of anything else, e.g. a subquery, reads rows already narrowed down)
+    """
+    findings = []
+    for row in plan:
+        detail = row[3]
+        scan = _SCAN.match(detail)
+        if scan and scan.group('table') in tables:
+            table = scan.group('table')
+            findings.append(QueryFinding(
+                origin, normalize(statement), detail, table, suggest_index(statement, table)
+            ))
+        elif _TEMP_SORT.search(detail):
+            findings.append(QueryFinding(origin, normalize(statement), detail))
+    return findings
+
+
+def suggest_index(statement, table):
+    """
+    Index declaration covering the columns statement compares table columns with (equality first) and orders by,
+    None when it does not filter table by any column
+    """
+    statement = ' '.join(statement.split())
+    where = re.split(r'\bWHERE\b', statement, maxsplit=1, flags=re.IGNORECASE)
+    if len(where) < 2:
+        return None
+    condition, order_by = where[1], ''
+    if re.search(r'\bORDER BY\b', condition, re.IGNORECASE):
+        condition, order_by = re.split(r'\bORDER BY\b', condition, maxsplit=1, flags=re.IGNORECASE)
+    column = rf'"?{re.escape(table)}"?\.(\w+)'
+    equal, ranges = [], []
+    for name, operator in re.findall(column + r'\s*(=|IN\b|IS\b|<=|>=|<|>|!=)', condition, re.IGNORECASE):
+        target = equal if operator.upper() in ('=', 'IN', 'IS') else ranges
+        if name not in equal + ranges:
+            target.append(name)
+    sorted_by = [name for name in re.findall(column, order_by) if name not in equal]
+    columns = equal + [name for name in ranges + sorted_by if name not in equal][:1]
+    if not columns:
+        return None
+    return f"Index('ix_{table}_{'_'.join(columns)}', {', '.join(repr(name) for name in columns)})"
+
+
+class QueryCapture:
+    """
+    Explains the statements issued from SOURCE_FILES on every engine while it is installed
+    """
+
+    def __init__(self, source_files=SOURCE_FILES):
+        self.source_files = source_files
+        self.statements = 0
+        self.findings = {}
+
+    def install(self):
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    def remove(self):
+        event.remove(Engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.dialect.name != 'sqlite' or executemany or not _EXPLAINED.match(statement):
+            return
+        origin = self._origin()
+        if origin is None:
+            return
+        self.statements += 1
+        explain = conn.connection.cursor()
+        try:
+            plan = explain.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            tables = {row[0] for row in explain.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            explain.close()
+        for finding in plan_findings(plan, statement, tables, origin):
+            self.findings.setdefault(finding.key, finding)
+
+    def _origin(self):
+        frame = sys._getframe(2)
+        while frame is not None:
+            if os.path.basename(frame.f_code.co_filename) in self.source_files:
+                return f'{os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]}.{frame.f_code.co_name}'
+            frame = frame.f_back
+        return None
+
+
+@contextmanager
+def capture(source_files=SOURCE_FILES):
+    query_capture = QueryCapture(source_files)
+    query_capture.install()
+    try:
+        yield query_capture
+    finally:
+        query_capture.remove()
+
+
+def run_tests(test_modules=DEFAULT_TEST_MODULES):
+    """
+    Runs test_modules under capture(), returns (QueryCapture, unittest result)
+    """
+    suite = unittest.defaultTestLoader.loadTestsFromNames(test_modules)
+    with capture() as query_capture, open(os.devnull, 'w') as stream:
+        result = unittest.TextTestRunner(stream=stream, verbosity=0).run(suite)
+    return query_capture, result
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as baseline:
+        return set(json.load(baseline)['accepted'])
+
+
+def new_findings(findings, baseline):
+    return [finding for key, finding in sorted(findings.items()) if key not in baseline]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='EXPLAIN QUERY PLAN check of the statements InventoryManager issues')
+    parser.add_argument('--tests', nargs='+', default=list(DEFAULT_TEST_MODULES), help='test modules to run')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='accept the current findings')
+    args = parser.parse_args(argv)
+
+    query_capture, result = run_tests(args.tests)
+    if not result.wasSuccessful():
+        sys.exit(f'{len(result.failures) + len(result.errors)} tests failed, fix them first')
+    print(f'Explained {query_capture.statements} statements, {len(query_capture.findings)} findings')
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline:
+            json.dump({'accepted': sorted(query_capture.findings)}, baseline, indent=2)
+            baseline.write('\n')
+        print(f'Baseline saved to {args.baseline}')
+        return
+
+    baseline = load_baseline(args.baseline)
+    new = new_findings(query_capture.findings, baseline)
+    for finding in new:
+        print(f'{finding.origin}: {finding.detail}\n  {finding.statement}')
+        if finding.suggestion:
+            print(f'  suggested: {finding.suggestion} on {finding.table}')
+    if new:
+        sys.exit(f'{len(new)} statements scan or sort without an index, add the index or --update-baseline')
+    print('No new unindexed scans or sorts')
+
+
+if __name__ == '__main__':
+    main()
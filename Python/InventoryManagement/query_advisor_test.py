@@ -0,0 +1,50 @@
+import os
+import unittest
+
+from sqlalchemy import Column, Integer, create_engine, select
+from sqlalchemy.orm import declarative_base
+
+import query_advisor
+
+
+class QueryAdvisorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine('sqlite:///query_advisor_test.db')
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+
+        db_file = 'query_advisor_test.db'
+        if os.path.exists(db_file):
+            os.remove(db_file)
+
+    def test_flags_unindexed_scan_and_suggests_index(self):
+        base = declarative_base()
+
+        class Shipment(base):
+            __tablename__ = 'shipment'
+            shipment_id = Column(Integer, primary_key=True)
+            plant_id = Column(Integer)
+            quantity = Column(Integer)
+
+        base.metadata.create_all(self.engine)
+        statement = select(Shipment.shipment_id).where(Shipment.plant_id == 1).order_by(Shipment.quantity)
+        with self.engine.connect() as connection:
+            sql = str(statement.compile(self.engine))
+            plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', (1,)).all()
+
+        findings = query_advisor.plan_findings(plan, sql, {'shipment'}, 'test')
+        self.assertEqual([finding.detail for finding in findings], ['SCAN shipment', 'USE TEMP B-TREE FOR ORDER BY'])
+        self.assertEqual(findings[0].suggestion, "Index('ix_shipment_plant_id_quantity', 'plant_id', 'quantity')")
+
+    def test_no_new_unindexed_statements(self):
+        # failures of the tests themselves are reported when they run on their own
+        query_capture, _ = query_advisor.run_tests()
+
+        self.assertGreater(query_capture.statements, 0)
+        new = query_advisor.new_findings(query_capture.findings, query_advisor.load_baseline())
+        self.assertEqual([finding.serialize() for finding in new], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+from sqlalchemy import case, delete, func, insert, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.agreement import Agreement
+from models.agreement_utilization import AgreementUtilization
+from models.archived_agreement import ArchivedAgreement
+from models.archived_order import ArchivedOrder
+from models.order import Order
+from models.plant_daily_delivery import PlantDailyDelivery
+from models.vendor_open_quantity import VendorOpenQuantity
+
+"""
+Rollup tables for planners' dashboards (delivered quantity per plant per day, open quantity per vendor, utilization
+per agreement). InventoryManager write methods call the record_* functions within their own transaction so the
+rollups change atomically with the base tables. rebuild() recomputes all the rollups from the base tables in one
+set-based pass and check_consistency() compares both.
+
+Every function takes a Session or a Connection.
+"""
+
+
+def record_agreement_created(executor, agreement):
+    executor.execute(insert(AgreementUtilization.__table__).values(
+        agreement_id=agreement.agreement_id, plant_id=agreement.plant_id, vendor_id=agreement.vendor_id,
+        quantity=agreement.quantity, ordered_quantity=0, delivered_quantity=0
+    ))
+
+
+def record_orders_created(executor, orders):
+    """
+    orders is an iterable of created orders (objects or dicts) with vendor_id, agreement_id and quantity
+    """
+    vendor_quantities, agreement_quantities = {}, {}
+    for order in orders:
+        vendor_id, agreement_id, quantity = _get(order, 'vendor_id'), _get(order, 'agreement_id'), _get(order, 'quantity')
+        open_quantity, open_orders = vendor_quantities.get(vendor_id, (0, 0))
+        vendor_quantities[vendor_id] = (open_quantity + quantity, open_orders + 1)
+        if agreement_id:
+            agreement_quantities[agreement_id] = agreement_quantities.get(agreement_id, 0) + quantity
+
+    for vendor_id, (open_quantity, open_orders) in vendor_quantities.items():
+        _increment(executor, VendorOpenQuantity.__table__, {'vendor_id': vendor_id},
+                   {'open_quantity': open_quantity, 'open_orders': open_orders})
+    for agreement_id, quantity in agreement_quantities.items():
+        table = AgreementUtilization.__table__
+        executor.execute(update(table).where(table.c.agreement_id == agreement_id).values(
+            ordered_quantity=table.c.ordered_quantity + quantity
+        ))
+
+
+def record_order_received(executor, order, previous_delivery_date):
+    """
+    order has just been received on order.delivery_date, previous_delivery_date is its delivery date before that
+    (None when it was not received yet)
+    """
+    if previous_delivery_date == order.delivery_date:
+        return
+
+    plant_daily_delivery = PlantDailyDelivery.__table__
+    if previous_delivery_date is None:
+        _increment(executor, VendorOpenQuantity.__table__, {'vendor_id': order.vendor_id},
+                   {'open_quantity': -order.quantity, 'open_orders': -1})
+        if order.agreement_id:
+            table = AgreementUtilization.__table__
+            executor.execute(update(table).where(table.c.agreement_id == order.agreement_id).values(
+                delivered_quantity=table.c.delivered_quantity + order.quantity
+            ))
+    else:
+        _increment(executor, plant_daily_delivery, {'plant_id': order.plant_id, 'delivery_date': previous_delivery_date},
+                   {'delivered_quantity': -order.quantity, 'delivered_orders': -1})
+    _increment(executor, plant_daily_delivery, {'plant_id': order.plant_id, 'delivery_date': order.delivery_date},
+               {'delivered_quantity': order.quantity, 'delivered_orders': 1})
+
+
+def rebuild(executor):
+    """
+    Recomputes every rollup table from the base tables
+    """
+    for table, statement in _expected_rollups().items():
+        executor.execute(delete(table))
+        executor.execute(insert(table).from_select([column.name for column in table.primary_key.columns] + [
+            column.name for column in table.columns if not column.primary_key
+        ], statement))
+
+
+def check_consistency(executor):
+    """
+    Compares every rollup table with the rollup computed from the base tables, returns a description of each row
+    that differs. Plant and vendor rows whose counts are all zero count as missing
+    """
+    differences = []
+    for table, statement in _expected_rollups().items():
+        key_length = len(table.primary_key.columns)
+        columns = list(table.primary_key.columns) + [column for column in table.columns if not column.primary_key]
+        expected = {tuple(row[:key_length]): tuple(row[key_length:]) for row in executor.execute(statement)}
+        actual = {
+            tuple(row[:key_length]): tuple(row[key_length:]) for row in executor.execute(select(*columns))
+            if table is AgreementUtilization.__table__ or any(row[key_length:])
+        }
+        for key in sorted(expected.keys() | actual.keys(), key=str):
+            if expected.get(key) != actual.get(key):
+                differences.append(
+                    f'{table.name} {dict(zip([column.name for column in columns], key))}: '
+                    f'expected {expected.get(key)}, found {actual.get(key)}'
+                )
+    return differences
+
+
+def _expected_rollups():
+    """
+    Rollup table -> select computing its rows from the base tables, columns in primary key then non key column order.
+    Archived orders and agreements (see archiver.py) count like the ones still in the base tables
+    """
+    orders = union_all(*[
+        select(table.c.plant_id, table.c.vendor_id, table.c.agreement_id, table.c.delivery_date, table.c.quantity)
+        for table in (Order.__table__, ArchivedOrder.__table__)
+    ]).subquery()
+    agreements = union_all(*[
+        select(table.c.agreement_id, table.c.plant_id, table.c.vendor_id, table.c.quantity)
+        for table in (Agreement.__table__, ArchivedAgreement.__table__)
+    ]).subquery()
+    delivered = orders.c.delivery_date != None
+    return {
+        PlantDailyDelivery.__table__: select(
+            orders.c.plant_id, orders.c.delivery_date, func.sum(orders.c.quantity), func.count()
+        ).where(delivered, orders.c.plant_id != None).group_by(orders.c.plant_id, orders.c.delivery_date),
+        VendorOpenQuantity.__table__: select(
+            orders.c.vendor_id, func.sum(orders.c.quantity), func.count()
+        ).where(orders.c.delivery_date == None, orders.c.vendor_id != None).group_by(orders.c.vendor_id),
+        AgreementUtilization.__table__: select(
+            agreements.c.agreement_id, agreements.c.plant_id, agreements.c.vendor_id, agreements.c.quantity,
+            func.coalesce(func.sum(orders.c.quantity), 0),
+            func.coalesce(func.sum(case((delivered, orders.c.quantity), else_=0)), 0)
+        ).outerjoin(orders, orders.c.agreement_id == agreements.c.agreement_id).group_by(agreements.c.agreement_id),
+    }
+
+
+# dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def _increment(executor, table, key, deltas):
+    """
+    Adds deltas (column -> amount) to the row of key (column -> value), inserting the row when it does not exist. Two
+    first writers of a key must not both insert it: an upsert where the database has one, otherwise an insert that
+    lost the race (IntegrityError, in a savepoint) turns into the update
+    """
+    bind = executor.get_bind() if isinstance(executor, Session) else executor
+    upsert_insert = UPSERT_INSERTS.get(bind.dialect.name)
+    if upsert_insert:
+        statement = upsert_insert(table).values({**key, **deltas})
+        executor.execute(statement.on_conflict_do_update(index_elements=list(key), set_={
+            column: table.c[column] + statement.excluded[column] for column in deltas
+        }))
+        return
+
+    increment = update(table).where(*[table.c[column] == value for column, value in key.items()]).values(
+        {table.c[column]: table.c[column] + amount for column, amount in deltas.items()}
+    )
+    if executor.execute(increment).rowcount:
+        return
+    try:
+        with executor.begin_nested():
+            executor.execute(insert(table).values({**key, **deltas}))
+    except IntegrityError:
+        executor.execute(increment)
+
+
+def _get(order, name):
+    return order[name] if isinstance(order, dict) else getattr(order, name)
@@ -0,0 +1,115 @@
+import os
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from sqlalchemy import create_engine, event, select, update
+from sqlalchemy.orm import sessionmaker
+
+import rollups
+from inventory_manager import InventoryManager
+from models.database import Base
+from models.plant import Plant
+from models.vendor import Vendor
+from models.vendor_open_quantity import VendorOpenQuantity
+
+
+class RollupsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.plant = Plant(name='Plant A')
+        self.vendor = Vendor(name='Vendor A')
+
+        self.engine = create_engine('sqlite:///rollups_test.db')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.add_all([self.plant, self.vendor])
+        self.session.commit()
+
+        self.inventory_manager = InventoryManager(self.session)
+        self.agreement = self.inventory_manager.create_purchase_agreement(
+            plant_id=self.plant.plant_id, vendor_id=self.vendor.vendor_id,
+            start=date.today() - timedelta(days=30), end=date.today() + timedelta(days=30), quantity=1000
+        )
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+
+        db_file = 'rollups_test.db'
+        if os.path.exists(db_file):
+            os.remove(db_file)
+
+    def test_rollups_follow_writes(self):
+        day_1, day_2 = date.today() - timedelta(days=2), date.today() - timedelta(days=1)
+        order_1 = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=day_1, agreement_id=self.agreement.agreement_id
+        )
+        self.inventory_manager.create_purchase_orders([
+            {'quantity': 50, 'order_date': day_1, 'agreement_id': self.agreement.agreement_id},
+            {'quantity': 20, 'order_date': day_1, 'vendor_id': self.vendor.vendor_id, 'plant_id': self.plant.plant_id},
+        ])
+        self.assertEqual({'vendor_id': self.vendor.vendor_id, 'open_quantity': 170, 'open_orders': 3},
+                         self.inventory_manager.get_vendor_open_quantity(self.vendor.vendor_id))
+
+        self.inventory_manager.receive_purchase_order(order_1.order_id, delivery_date=day_1)
+        # received again with a corrected date, moves between days
+        self.inventory_manager.receive_purchase_order(order_1.order_id, delivery_date=day_2)
+
+        self.assertEqual([{
+            'plant_id': self.plant.plant_id, 'delivery_date': day_2.strftime('%Y-%m-%d'), 'delivered_quantity': 100,
+            'delivered_orders': 1
+        }], self.inventory_manager.get_plant_daily_deliveries(self.plant.plant_id))
+        self.assertEqual([], self.inventory_manager.get_plant_daily_deliveries(self.plant.plant_id, date_to=day_1))
+        self.assertEqual({'vendor_id': self.vendor.vendor_id, 'open_quantity': 70, 'open_orders': 2},
+                         self.inventory_manager.get_vendor_open_quantity(self.vendor.vendor_id))
+
+        utilization = self.inventory_manager.get_agreement_utilization(self.agreement.agreement_id)
+        self.assertEqual((150, 100, 850), (
+            utilization['ordered_quantity'], utilization['delivered_quantity'], utilization['remaining_quantity']
+        ))
+        self.assertEqual([], rollups.check_consistency(self.session))
+
+    def test_rebuild_repairs_drift(self):
+        order = self.inventory_manager.create_purchase_order(
+            quantity=100, order_date=date.today(), agreement_id=self.agreement.agreement_id
+        )
+        self.inventory_manager.receive_purchase_order(order.order_id, delivery_date=date.today())
+        self.session.execute(update(VendorOpenQuantity).values(open_quantity=5, open_orders=1))
+        self.session.commit()
+
+        self.assertEqual(1, len(rollups.check_consistency(self.session)))
+
+        rollups.rebuild(self.session)
+        self.session.commit()
+        self.assertEqual([], rollups.check_consistency(self.session))
+        self.assertEqual(100, self.inventory_manager.get_plant_daily_deliveries(
+            self.plant.plant_id)[0]['delivered_quantity'])
+
+    def test_increment_of_a_key_a_concurrent_writer_inserted(self):
+        table = VendorOpenQuantity.__table__
+
+        @event.listens_for(self.engine, 'after_cursor_execute')
+        def concurrent_first_writer(conn, cursor, statement, parameters, context, executemany):
+            # the row shows up between the update that missed it and the insert
+            if statement.startswith('UPDATE vendor_open_quantity') and not cursor.rowcount:
+                cursor.connection.execute(
+                    'INSERT INTO vendor_open_quantity (vendor_id, open_quantity, open_orders) VALUES (99, 5, 1)'
+                )
+
+        # without an upsert (not on SQLite/PostgreSQL) the insert fails and the update is run again
+        with mock.patch.dict(rollups.UPSERT_INSERTS, clear=True):
+            rollups._increment(self.session, table, {'vendor_id': 99}, {'open_quantity': 10, 'open_orders': 1})
+        event.remove(self.engine, 'after_cursor_execute', concurrent_first_writer)
+        # upserted
+        rollups._increment(self.session, table, {'vendor_id': 98}, {'open_quantity': 10, 'open_orders': 1})
+        rollups._increment(self.session, table, {'vendor_id': 98}, {'open_quantity': 7, 'open_orders': 1})
+        self.session.commit()
+
+        self.assertEqual([(98, 17, 2), (99, 15, 2)], self.session.execute(
+            select(table.c.vendor_id, table.c.open_quantity, table.c.open_orders).where(table.c.vendor_id > 90)
+            .order_by(table.c.vendor_id)
+        ).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,331 @@
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, current_app, g, request, stream_with_context
+
+from api_requests import parse_date, parse_list_agreements_request, parse_list_orders_request, parse_optional_date, \
+    parse_purchase_order_request, parse_purchase_orders_request
+from exports import EXPORT_FORMATS
+from group_commit import WriterQueueFull, serialize_result
+from inventory_manager import AGREEMENT_COLUMNS, ORDER_COLUMNS, InventoryManager, InvalidListRequestException, \
+    PlantNotFoundException, PurchaseAgreementNotFound, PurchaseOrderNotFound
+from serializers import encode, etag, negotiate
+
+"""
+REST routes of the Inventory Management app, registered on the app by app.create_app()
+"""
+
+api = Blueprint('inventory', __name__)
+# header of a read asking to see the writes queued before it (single writer / group commit)
+READ_YOUR_WRITES_HEADER = 'X-Read-Your-Writes'
+
+
+def get_inventory_manager() -> InventoryManager:
+    """
+    InventoryManager of the request, a ShardedInventoryManager (same interface) when storage is sharded
+    """
+    if 'inventory_manager' not in g:
+        sessions = [Session() for Session in current_app.extensions['inventory_sessions']]
+        if len(sessions) > 1:
+            from sharding import ShardedInventoryManager
+            g.inventory_manager = ShardedInventoryManager(
+                sessions, cache=current_app.extensions['inventory_cache'],
+                plant_shards=current_app.config['PLANT_SHARDS'],
+                executor=current_app.extensions['inventory_shard_executor'],
+                agreement_indexes=current_app.extensions['inventory_agreement_indexes']
+            )
+        else:
+            g.inventory_manager = InventoryManager(
+                sessions[0], cache=current_app.extensions['inventory_cache'],
+                agreement_index=current_app.extensions['inventory_agreement_indexes'][0]
+            )
+    return g.inventory_manager
+
+
+def _write(operation, **kwargs):
+    """
+    Runs InventoryManager.<operation> through the writer (group commit/single writer) when enabled, returns the
+    serialized result
+    """
+    writer = current_app.extensions['inventory_writer']
+    if writer:
+        return _queued(writer.submit, operation, **kwargs)
+    return serialize_result(getattr(get_inventory_manager(), operation)(**kwargs))
+
+
+def _read(function):
+    """
+    function(InventoryManager) of the request, run on the writer after the writes queued so far when the request has
+    the READ_YOUR_WRITES_HEADER
+    """
+    writer = current_app.extensions['inventory_writer']
+    if writer and request.headers.get(READ_YOUR_WRITES_HEADER, '0') not in ('', '0'):
+        return _queued(writer.submit_read, function)
+    return function(get_inventory_manager())
+
+
+def _queued(submit, *args, **kwargs):
+    try:
+        future = submit(*args, **kwargs)
+    except WriterQueueFull as e:
+        abort(Response(e.message, status=503, headers={'Retry-After': '1'}))
+    return future.result()
+
+
+@api.route('/create_purchase_agreement', methods=['POST'])
+def create_purchase_agreement():
+    data = request.json
+    plant_id = int(data['plant_id'])
+    vendor_id = int(data['vendor_id'])
+    start_date = datetime.strptime(data['start'], '%Y-%m-%d').date()
+    end_date = datetime.strptime(data['end'], '%Y-%m-%d').date()
+    quantity = int(data['quantity'])
+    agreement = _write(
+        'create_purchase_agreement', plant_id=plant_id, vendor_id=vendor_id, start=start_date, end=end_date,
+        quantity=quantity
+    )
+    return _respond(agreement, 201)
+
+
+@api.route('/create_purchase_order', methods=['POST'])
+def create_purchase_order():
+    order_request = parse_purchase_order_request(request.json)
+    if 'allocation_policy' in request.json:
+        order_request['allocation_policy'] = request.json['allocation_policy']
+    order = _write('create_purchase_order', **order_request)
+    return _respond(order, 201)
+
+
+@api.route('/allocate_purchase_order', methods=['POST'])
+def allocate_purchase_order():
+    data = request.json
+    orders = _write(
+        'allocate_purchase_order', quantity=int(data['quantity']), plant_id=int(data['plant_id']),
+        vendor_id=int(data['vendor_id']), order_date=parse_date(data['order_date']),
+        allocation_policy=data.get('allocation_policy', 'earliest_expiring')
+    )
+    return _respond({'orders': orders}, 201)
+
+
+@api.route('/create_purchase_orders', methods=['POST'])
+def create_purchase_orders():
+    batch, batch_indexes, results = parse_purchase_orders_request(request.json)
+    for index, result in zip(batch_indexes, _write('create_purchase_orders', batch=batch)):
+        results[index] = result
+    return _respond({'results': results}, 201 if all('order' in result for result in results) else 207)
+
+
+@api.route('/receive_purchase_order', methods=['POST'])
+def receive_purchase_order():
+    data = request.json
+    order_id = int(data['order_id'])
+    delivery_date = datetime.strptime(data['delivery_date'], '%Y-%m-%d').date()
+    order = _write('receive_purchase_order', order_id=order_id, delivery_date=delivery_date)
+    return _respond(order, 201)
+
+
+@api.route('/get_purchase_agreement', methods=['POST'])
+def get_purchase_agreement():
+    data = request.json
+    agreement_id = int(data['agreement_id'])
+    agreement = _read(lambda inventory_manager: inventory_manager.get_serialized_purchase_agreement(agreement_id))
+    if agreement:
+        return _respond(agreement, 200)
+    else:
+        return f'Agreement not found for agreement_id: {agreement_id}', 404
+
+
+@api.route('/get_purchase_order', methods=['POST'])
+def get_purchase_order():
+    data = request.json
+    order_id = int(data['order_id']) if 'order_id' in data else None
+    plant_id = int(data['plant_id']) if 'plant_id' in data else None
+    order = None
+    if order_id:
+        order = _read(lambda inventory_manager: inventory_manager.get_serialized_purchase_order(order_id))
+    else:
+        if plant_id:
+            order = _read(lambda inventory_manager: inventory_manager.get_earliest_plant_order(plant_id).serialize())
+    if order:
+        return _respond(order, 200)
+    else:
+        return f'Order not found for order_id: {order_id} or plant_id: {plant_id}', 404
+
+
+@api.route('/list_purchase_orders', methods=['POST'])
+def list_purchase_orders():
+    list_request = parse_list_orders_request(request.json)
+    try:
+        orders, next_cursor = _read(lambda inventory_manager: inventory_manager.list_orders(**list_request))
+    except InvalidListRequestException as e:
+        return e.message, 400
+    return _respond({'orders': orders, 'next_cursor': next_cursor}, 200)
+
+
+@api.route('/list_purchase_agreements', methods=['POST'])
+def list_purchase_agreements():
+    list_request = parse_list_agreements_request(request.json)
+    try:
+        agreements, next_cursor = _read(lambda inventory_manager: inventory_manager.list_agreements(**list_request))
+    except InvalidListRequestException as e:
+        return e.message, 400
+    return _respond({'agreements': agreements, 'next_cursor': next_cursor}, 200)
+
+
+@api.route('/get_plant_daily_deliveries', methods=['POST'])
+def get_plant_daily_deliveries():
+    data = request.json
+    deliveries = _read(lambda inventory_manager: inventory_manager.get_plant_daily_deliveries(
+        int(data['plant_id']), date_from=parse_optional_date(data, 'date_from'),
+        date_to=parse_optional_date(data, 'date_to')
+    ))
+    return _respond({'deliveries': deliveries}, 200)
+
+
+@api.route('/get_vendor_open_quantity', methods=['POST'])
+def get_vendor_open_quantity():
+    data = request.json
+    vendor_id = int(data['vendor_id'])
+    return _respond(_read(lambda inventory_manager: inventory_manager.get_vendor_open_quantity(vendor_id)), 200)
+
+
+@api.route('/get_agreement_utilization', methods=['POST'])
+def get_agreement_utilization():
+    data = request.json
+    agreement_id = int(data['agreement_id'])
+    try:
+        return _respond(_read(
+            lambda inventory_manager: inventory_manager.get_agreement_utilization(agreement_id)
+        ), 200)
+    except PurchaseAgreementNotFound:
+        return f'Agreement not found for agreement_id: {agreement_id}', 404
+
+
+@api.route('/agreements/<int:agreement_id>', methods=['GET'])
+def get_agreement(agreement_id):
+    try:
+        return _conditional_get(
+            lambda inventory_manager: ('agreement', agreement_id,
+                                       inventory_manager.get_purchase_agreement_version(agreement_id)),
+            lambda inventory_manager: _versioned(
+                inventory_manager.get_purchase_agreement(agreement_id), 'agreement', agreement_id
+            )
+        )
+    except PurchaseAgreementNotFound:
+        return f'Agreement not found for agreement_id: {agreement_id}', 404
+
+
+@api.route('/orders/<int:order_id>', methods=['GET'])
+def get_order(order_id):
+    try:
+        return _conditional_get(
+            lambda inventory_manager: ('order', order_id, inventory_manager.get_purchase_order_version(order_id)),
+            lambda inventory_manager: _versioned(inventory_manager.get_purchase_order(order_id), 'order', order_id)
+        )
+    except PurchaseOrderNotFound:
+        return f'Order not found for order_id: {order_id}', 404
+
+
+@api.route('/plants/<int:plant_id>/earliest_order', methods=['GET'])
+def get_plant_earliest_order(plant_id):
+    def load(inventory_manager):
+        order = inventory_manager.get_earliest_plant_order(plant_id)
+        return _versioned(order, 'plant', plant_id, 'order', order.order_id)
+
+    try:
+        return _conditional_get(
+            lambda inventory_manager: ('plant', plant_id, 'order', *inventory_manager.get_earliest_plant_order_version(
+                plant_id
+            )), load
+        )
+    except PlantNotFoundException:
+        return f'Order not found for plant_id: {plant_id}', 404
+
+
+def _conditional_get(version_key, load):
+    """
+    Response of a versioned GET resource. version_key(inventory_manager) looks up the parts of its ETag (ending with
+    the version of the row), when If-None-Match has that ETag the response is a 304 without loading the resource.
+    Otherwise load(inventory_manager) returns (ETag parts, serialized resource) read together
+    """
+    mimetype = negotiate(request.headers.get('Accept'))
+    if_none_match = request.if_none_match
+
+    def read(inventory_manager):
+        key = version_key(inventory_manager)
+        if if_none_match.contains(etag(key, mimetype)):
+            return key, None
+        return load(inventory_manager)
+
+    key, payload = _read(read)
+    response = Response(status=304) if payload is None else Response(encode(payload, mimetype), mimetype=mimetype)
+    # representations differ by Accept, clients and caches revalidate before reusing them
+    response.set_etag(etag(key, mimetype))
+    response.headers['Vary'] = 'Accept'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _versioned(entity, *key):
+    return (*key, entity.version), entity.serialize()
+
+
+def _respond(payload, status):
+    """
+    Response of a JSON-like payload, as msgpack when the Accept header asks for it and JSON otherwise
+    """
+    mimetype = negotiate(request.headers.get('Accept'))
+    return Response(encode(payload, mimetype), status=status, mimetype=mimetype)
+
+
+@api.route('/export/orders', methods=['GET'])
+def export_orders():
+    chunks = get_inventory_manager().iter_orders(
+        plant_id=request.args.get('plant_id', type=int), vendor_id=request.args.get('vendor_id', type=int),
+        agreement_id=request.args.get('agreement_id', type=int), delivered=_bool_arg('delivered'),
+        order_date_from=_date_arg('order_date_from'), order_date_to=_date_arg('order_date_to'),
+        delivery_date_from=_date_arg('delivery_date_from'), delivery_date_to=_date_arg('delivery_date_to')
+    )
+    return _export_response(chunks, [column.key for column in ORDER_COLUMNS], 'orders')
+
+
+@api.route('/export/agreements', methods=['GET'])
+def export_agreements():
+    chunks = get_inventory_manager().iter_agreements(
+        plant_id=request.args.get('plant_id', type=int), vendor_id=request.args.get('vendor_id', type=int),
+        date_from=_date_arg('date_from'), date_to=_date_arg('date_to')
+    )
+    return _export_response(chunks, [column.key for column in AGREEMENT_COLUMNS], 'agreements')
+
+
+def _export_response(chunks, columns, name):
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        abort(400, f'format needs to be one of {", ".join(EXPORT_FORMATS)}')
+    mimetype, stream = EXPORT_FORMATS[export_format]
+    return Response(
+        stream_with_context(stream(chunks, columns)), mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={name}.{export_format}'}
+    )
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        abort(400, f'{name} needs to be a YYYY-MM-DD date')
+
+
+def _bool_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    if value.lower() not in ('true', 'false', '1', '0'):
+        abort(400, f'{name} needs to be true or false')
+    return value.lower() in ('true', '1')
+
+
+@api.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    cache = current_app.extensions['inventory_cache']
+    return _respond(cache.stats() if cache else {}, 200)
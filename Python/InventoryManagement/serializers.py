@@ -0,0 +1,94 @@
+import functools
+import json
+from datetime import date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+"""
+Response serialization straight from Core result rows. serialize_rows() works column by column: date columns are
+detected once per result and formatted through a memoized formatter, so a list of thousands of orders formats each
+distinct date once instead of calling strftime per field per row, and no ORM object is ever hydrated.
+
+Payloads are encoded with orjson when it is installed (json otherwise), or with msgpack when the client asks for it in
+the Accept header (and msgpack is installed).
+"""
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def format_date(value):
+    return value.strftime('%Y-%m-%d') if value is not None else None
+
+
+def serialize_rows(rows) -> list:
+    """
+    Rows of a Core result (or the Result itself) -> list of dicts keyed by column name, dates as YYYY-MM-DD strings
+    """
+    rows = rows if isinstance(rows, list) else rows.all()
+    if not rows:
+        return []
+
+    keys = rows[0]._fields
+    columns = list(zip(*rows))
+    for index, column in enumerate(columns):
+        sample = next((value for value in column if value is not None), None)
+        if isinstance(sample, date):
+            columns[index] = map(format_date, column)
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+def serialize_row(row) -> dict:
+    return serialize_rows([row])[0]
+
+
+def dumps_json(payload) -> bytes:
+    if orjson:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def negotiate(accept) -> str:
+    """
+    Response mimetype for an Accept header value: msgpack when it is installed and the client prefers it over JSON,
+    JSON otherwise
+    """
+    if not msgpack or not accept:
+        return JSON_MIMETYPE
+
+    best_mimetype, best_quality = JSON_MIMETYPE, 0.0
+    for media_range in accept.split(','):
+        mimetype, *parameters = [part.strip() for part in media_range.split(';')]
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if mimetype in MSGPACK_MIMETYPES + (JSON_MIMETYPE,) and quality > best_quality:
+            best_mimetype, best_quality = mimetype, quality
+    return best_mimetype
+
+
+def encode(payload, mimetype) -> bytes:
+    if mimetype in MSGPACK_MIMETYPES:
+        return msgpack.packb(payload)
+    return dumps_json(payload)
+
+
+def etag(key, mimetype) -> str:
+    """
+    Strong ETag of the parts of a resource key in mimetype, bytes change with the encoding
+    """
+    return '-'.join(str(part) for part in key) + '-' + mimetype.rsplit('/', 1)[-1]
@@ -0,0 +1,53 @@
+import os
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from inventory_manager import ORDER_COLUMNS
+from models.database import Base
+from models.order import Order
+from models.plant import Plant
+from models.vendor import Vendor
+from serializers import JSON_MIMETYPE, negotiate, serialize_rows
+
+
+class SerializersTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine('sqlite:///serializers_test.db')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        plant, vendor = Plant(name='Plant A'), Vendor(name='Vendor A')
+        self.session.add_all([plant, vendor])
+        self.session.flush()
+        self.session.add_all([
+            Order(vendor_id=vendor.vendor_id, plant_id=plant.plant_id, order_date=date(2023, 2, 1), quantity=10),
+            Order(vendor_id=vendor.vendor_id, plant_id=plant.plant_id, order_date=date(2023, 2, 1),
+                  delivery_date=date(2023, 2, 3), quantity=20),
+        ])
+        self.session.commit()
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+
+        db_file = 'serializers_test.db'
+        if os.path.exists(db_file):
+            os.remove(db_file)
+
+    def test_serialize_rows_matches_model_serialize(self):
+        rows = self.session.execute(select(*ORDER_COLUMNS).order_by(Order.order_id)).all()
+        orders = self.session.query(Order).order_by(Order.order_id).all()
+        self.assertEqual(serialize_rows(rows), [order.serialize() for order in orders])
+        self.assertEqual(serialize_rows([]), [])
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate(None), JSON_MIMETYPE)
+        self.assertEqual(negotiate('*/*'), JSON_MIMETYPE)
+        self.assertEqual(negotiate('application/x-msgpack'), 'application/x-msgpack')
+        self.assertEqual(negotiate('application/json;q=0.5, application/msgpack'), 'application/msgpack')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,247 @@
+import heapq
+from operator import itemgetter
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+import migrations
+from inventory_manager import InventoryManager, _encode_cursor
+from models.agreement import Agreement
+from models.id_sequence import IdSequence
+from models.order import Order
+
+"""
+Plant sharded storage: plants are mapped to N databases (shards), an agreement and its orders live in the shard of
+their plant, plants and vendors are seeded in every shard.
+
+Agreement and order ids are strided across shards, shard s (0 based) hands out s + 1, s + 1 + N, s + 1 + 2N, ... so
+ids stay globally unique and shard_of_id() resolves any id to its shard without a lookup. ShardedInventoryManager
+routes every InventoryManager call to the shard of its plant or id and fans reads without a plant (e.g. vendor-wide
+listings) out to all shards in parallel, merging their results by id.
+"""
+
+
+def shard_of_id(entity_id, shard_count):
+    return (entity_id - 1) % shard_count
+
+
+class ShardIdAllocator:
+    """
+    InventoryManager id_allocator of one shard, hands out the ids of the shard's stride from its id_sequence table.
+    The sequence row is updated before it is read, so concurrent writers of the shard are serialized by the database
+    write lock and never get the same ids
+    """
+
+    def __init__(self, shard_index, shard_count):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+
+    def __call__(self, session, column, count=1):
+        name, stride = _sequence_name(column), self.shard_count
+        table = IdSequence.__table__
+        advance = update(table).where(table.c.name == name).values(last_id=table.c.last_id + stride * count)
+        if not session.execute(advance).rowcount:
+            self.start_sequence(session, column)
+            session.execute(advance)
+        last_id = session.execute(select(table.c.last_id).where(table.c.name == name)).scalar()
+        return list(range(last_id - stride * (count - 1), last_id + 1, stride))
+
+    def start_sequence(self, session, column):
+        """
+        Creates the sequence of column, continuing after the largest id already in the shard
+        """
+        max_id = session.execute(select(func.max(column))).scalar() or 0
+        # largest id of this shard's stride not above max_id, may be <= 0 for an empty shard
+        last_id = max_id - (max_id - 1 - self.shard_index) % self.shard_count
+        session.execute(insert(IdSequence.__table__).values(name=_sequence_name(column), last_id=last_id))
+
+
+def init_shards(engines):
+    """
+    One-time setup of every shard database (migrations.init_db) and of their id sequences, returns the migrations
+    applied to any shard
+    """
+    applied = []
+    for shard_index, engine in enumerate(engines):
+        applied.extend(name for name in migrations.init_db(engine) if name not in applied)
+        allocator = ShardIdAllocator(shard_index, len(engines))
+        with Session(bind=engine) as session:
+            existing = set(session.execute(select(IdSequence.name)).scalars())
+            for column in (Agreement.agreement_id, Order.order_id):
+                if _sequence_name(column) not in existing:
+                    allocator.start_sequence(session, column)
+            session.commit()
+    return applied
+
+
+class ShardedInventoryManager:
+    """
+    InventoryManager interface over one session per shard. plant_shards maps plant ids to shard indexes, plants it
+    does not list go to plant_id % number of shards. executor (e.g. a ThreadPoolExecutor) runs fan-out reads in
+    parallel, without it shards are read one after the other. agreement_indexes are the AgreementIntervalIndex of
+    every shard (optional)
+    """
+
+    def __init__(self, sessions, cache=None, plant_shards=None, executor=None, agreement_indexes=None):
+        agreement_indexes = agreement_indexes or [None] * len(sessions)
+        self.managers = [
+            InventoryManager(
+                session, cache=cache, id_allocator=ShardIdAllocator(shard_index, len(sessions)),
+                agreement_index=agreement_indexes[shard_index]
+            ) for shard_index, session in enumerate(sessions)
+        ]
+        self.plant_shards = {int(plant_id): int(shard) for plant_id, shard in (plant_shards or {}).items()}
+        self.executor = executor
+
+    def shard_for_plant(self, plant_id):
+        return self.plant_shards.get(plant_id, plant_id % len(self.managers))
+
+    def create_purchase_agreement(self, plant_id, vendor_id, start, end, quantity) -> Agreement:
+        return self._plant_manager(plant_id).create_purchase_agreement(plant_id, vendor_id, start, end, quantity)
+
+    def create_purchase_order(
+            self, quantity, order_date=None, agreement_id=None, vendor_id=None, plant_id=None,
+            allocation_policy=None
+    ) -> Order:
+        return self.managers[self._shard_for_new_order(agreement_id, plant_id)].create_purchase_order(
+            quantity, order_date=order_date, agreement_id=agreement_id, vendor_id=vendor_id, plant_id=plant_id,
+            allocation_policy=allocation_policy
+        )
+
+    def allocate_purchase_order(
+            self, quantity, plant_id, vendor_id, order_date=None, allocation_policy='earliest_expiring'
+    ) -> list:
+        return self.managers[self._shard_for_new_order(None, plant_id)].allocate_purchase_order(
+            quantity, plant_id, vendor_id, order_date=order_date, allocation_policy=allocation_policy
+        )
+
+    def create_purchase_orders(self, batch) -> list:
+        """
+        Splits the batch by shard, each shard creates its part in one transaction (in parallel)
+        """
+        indexes_by_shard = {}
+        for index, item in enumerate(batch):
+            shard = self._shard_for_new_order(item.get('agreement_id'), item.get('plant_id'))
+            indexes_by_shard.setdefault(shard, []).append(index)
+
+        results = [None] * len(batch)
+        shard_results = self._fan_out(lambda shard: self.managers[shard].create_purchase_orders(
+            [batch[index] for index in indexes_by_shard[shard]]
+        ), list(indexes_by_shard))
+        for shard, shard_result in zip(indexes_by_shard, shard_results):
+            for index, result in zip(indexes_by_shard[shard], shard_result):
+                results[index] = result
+        return results
+
+    def receive_purchase_order(self, order_id, delivery_date=None) -> Order:
+        return self._id_manager(order_id).receive_purchase_order(order_id, delivery_date=delivery_date)
+
+    def get_purchase_agreement(self, agreement_id: int) -> Agreement:
+        return self._id_manager(agreement_id).get_purchase_agreement(agreement_id)
+
+    def get_purchase_order(self, order_id: int) -> Order:
+        return self._id_manager(order_id).get_purchase_order(order_id)
+
+    def get_serialized_purchase_agreement(self, agreement_id: int) -> dict:
+        return self._id_manager(agreement_id).get_serialized_purchase_agreement(agreement_id)
+
+    def get_serialized_purchase_order(self, order_id: int) -> dict:
+        return self._id_manager(order_id).get_serialized_purchase_order(order_id)
+
+    def get_purchase_agreement_version(self, agreement_id: int) -> int:
+        return self._id_manager(agreement_id).get_purchase_agreement_version(agreement_id)
+
+    def get_purchase_order_version(self, order_id: int) -> int:
+        return self._id_manager(order_id).get_purchase_order_version(order_id)
+
+    def get_earliest_plant_order_version(self, plant_id: int) -> tuple:
+        return self._plant_manager(plant_id).get_earliest_plant_order_version(plant_id)
+
+    def get_earliest_plant_order(self, plant_id: int) -> Order:
+        return self._plant_manager(plant_id).get_earliest_plant_order(plant_id)
+
+    def get_plant_daily_deliveries(self, plant_id: int, date_from=None, date_to=None) -> list:
+        return self._plant_manager(plant_id).get_plant_daily_deliveries(plant_id, date_from, date_to)
+
+    def get_vendor_open_quantity(self, vendor_id: int) -> dict:
+        shard_quantities = self._fan_out(lambda manager: manager.get_vendor_open_quantity(vendor_id), self.managers)
+        return {
+            'vendor_id': vendor_id,
+            'open_quantity': sum(quantity['open_quantity'] for quantity in shard_quantities),
+            'open_orders': sum(quantity['open_orders'] for quantity in shard_quantities),
+        }
+
+    def get_agreement_utilization(self, agreement_id: int) -> dict:
+        return self._id_manager(agreement_id).get_agreement_utilization(agreement_id)
+
+    def iter_orders(self, plant_id=None, chunk_size=1000, **filters):
+        if plant_id:
+            return self._plant_manager(plant_id).iter_orders(plant_id=plant_id, chunk_size=chunk_size, **filters)
+        return self._merged_chunks('iter_orders', 'order_id', chunk_size, filters)
+
+    def iter_agreements(self, plant_id=None, chunk_size=1000, **filters):
+        if plant_id:
+            return self._plant_manager(plant_id).iter_agreements(plant_id=plant_id, chunk_size=chunk_size, **filters)
+        return self._merged_chunks('iter_agreements', 'agreement_id', chunk_size, filters)
+
+    def list_orders(self, plant_id=None, cursor=None, limit=100, **filters):
+        if plant_id:
+            return self._plant_manager(plant_id).list_orders(plant_id=plant_id, cursor=cursor, limit=limit, **filters)
+        return self._merged_page('list_orders', 'order_id', cursor, limit, filters)
+
+    def list_agreements(self, plant_id=None, cursor=None, limit=100, **filters):
+        if plant_id:
+            return self._plant_manager(plant_id).list_agreements(
+                plant_id=plant_id, cursor=cursor, limit=limit, **filters
+            )
+        return self._merged_page('list_agreements', 'agreement_id', cursor, limit, filters)
+
+    def _plant_manager(self, plant_id):
+        return self.managers[self.shard_for_plant(plant_id)]
+
+    def _id_manager(self, entity_id):
+        return self.managers[shard_of_id(entity_id, len(self.managers))]
+
+    def _shard_for_new_order(self, agreement_id, plant_id):
+        if agreement_id:
+            return shard_of_id(agreement_id, len(self.managers))
+        # an order with neither agreement nor plant fails validation, any shard reports that
+        return self.shard_for_plant(plant_id) if plant_id else 0
+
+    def _fan_out(self, function, items):
+        if self.executor and len(items) > 1:
+            return list(self.executor.map(function, items))
+        return [function(item) for item in items]
+
+    def _merged_page(self, method, key, cursor, limit, filters):
+        """
+        One keyset page across shards: the page of every shard after the cursor, merged by key and cut to limit
+        """
+        pages = self._fan_out(
+            lambda manager: getattr(manager, method)(cursor=cursor, limit=limit, **filters), self.managers
+        )
+        rows = list(heapq.merge(*[shard_rows for shard_rows, _ in pages], key=itemgetter(key)))
+        has_more = len(rows) > limit or any(next_cursor for _, next_cursor in pages)
+        return rows[:limit], _encode_cursor(rows[limit - 1][key]) if has_more else None
+
+    def _merged_chunks(self, method, key, chunk_size, filters):
+        streams = [
+            _rows(getattr(manager, method)(chunk_size=chunk_size, **filters)) for manager in self.managers
+        ]
+        chunk = []
+        for row in heapq.merge(*streams, key=itemgetter(key)):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _rows(chunks):
+    for chunk in chunks:
+        yield from chunk
+
+
+def _sequence_name(column):
+    return f'{column.table.name}.{column.name}'
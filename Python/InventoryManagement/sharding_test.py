@@ -0,0 +1,127 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from sqlalchemy.orm import sessionmaker
+
+from app import create_app, init_db
+from models.agreement import Agreement
+from models.database import make_engine
+from models.order import Order
+from sharding import ShardedInventoryManager, init_shards, shard_of_id
+
+DB_FILES = [f'sharding_test_{shard}.db' for shard in range(3)]
+
+
+class ShardedInventoryManagerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # make_engine lets a session's connection be used from the fan-out threads
+        self.engines = [make_engine(f'sqlite:///{db_file}') for db_file in DB_FILES]
+        init_shards(self.engines)
+        self.sessions = [sessionmaker(bind=engine)() for engine in self.engines]
+        self.executor = ThreadPoolExecutor(3)
+        # plant 4 would go to shard 1 by default
+        self.inventory_manager = ShardedInventoryManager(self.sessions, plant_shards={'4': 0}, executor=self.executor)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+        for session, engine in zip(self.sessions, self.engines):
+            session.close()
+            engine.dispose()
+        for db_file in DB_FILES + [f'{db_file}-{suffix}' for db_file in DB_FILES for suffix in ('wal', 'shm')]:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def _create_agreement(self, plant_id):
+        return self.inventory_manager.create_purchase_agreement(
+            plant_id=plant_id, vendor_id=1, start=date(2023, 1, 1), end=date(2023, 12, 31), quantity=1000
+        )
+
+    def test_writes_are_routed_by_plant_and_id(self):
+        agreements = {plant_id: self._create_agreement(plant_id) for plant_id in (1, 2, 3, 4, 5)}
+        expected_shards = {1: 1, 2: 2, 3: 0, 4: 0, 5: 2}
+        for plant_id, agreement in agreements.items():
+            self.assertEqual(shard_of_id(agreement.agreement_id, 3), expected_shards[plant_id])
+        self.assertEqual(len({agreement.agreement_id for agreement in agreements.values()}), 5)
+
+        order = self.inventory_manager.create_purchase_order(
+            quantity=10, order_date=date(2023, 2, 1), agreement_id=agreements[2].agreement_id
+        )
+        standalone = self.inventory_manager.create_purchase_order(
+            quantity=5, order_date=date(2023, 2, 1), vendor_id=1, plant_id=4
+        )
+        self.assertEqual((shard_of_id(order.order_id, 3), shard_of_id(standalone.order_id, 3)), (2, 0))
+        self.assertEqual(self.sessions[2].query(Order).count(), 1)
+
+        self.inventory_manager.receive_purchase_order(order.order_id, delivery_date=date(2023, 2, 3))
+        self.assertEqual(self.inventory_manager.get_earliest_plant_order(2).order_id, order.order_id)
+        self.assertEqual(self.inventory_manager.get_purchase_agreement(agreements[5].agreement_id).plant_id, 5)
+        self.assertEqual(self.inventory_manager.get_vendor_open_quantity(1)['open_quantity'], 5)
+
+    def test_batch_is_split_by_shard(self):
+        agreements = [self._create_agreement(plant_id) for plant_id in (1, 2, 3)]
+        results = self.inventory_manager.create_purchase_orders([
+            {'agreement_id': agreement.agreement_id, 'order_date': date(2023, 2, 1), 'quantity': quantity}
+            for agreement, quantity in zip(agreements * 2, [10, 20, 30, 40, 50, 2000])
+        ])
+
+        self.assertEqual([result['order']['quantity'] for result in results[:5]], [10, 20, 30, 40, 50])
+        self.assertEqual(results[5]['error_type'], 'OrderQuantityExceedsAgreementException')
+        for agreement, result in zip(agreements * 2, results[:5]):
+            self.assertEqual(result['order']['agreement_id'], agreement.agreement_id)
+            self.assertEqual(shard_of_id(result['order']['order_id'], 3),
+                             shard_of_id(agreement.agreement_id, 3))
+
+    def test_vendor_listing_fans_out_and_merges(self):
+        for plant_id in (1, 2, 3, 1, 2):
+            self._create_agreement(plant_id)
+        expected = sorted(
+            agreement_id for session in self.sessions for agreement_id, in session.query(Agreement.agreement_id)
+        )
+
+        listed, cursor = [], None
+        while True:
+            agreements, cursor = self.inventory_manager.list_agreements(vendor_id=1, cursor=cursor, limit=2)
+            listed.extend(agreement['agreement_id'] for agreement in agreements)
+            if not cursor:
+                break
+        self.assertEqual(listed, expected)
+
+        exported = [row['agreement_id'] for chunk in self.inventory_manager.iter_agreements(chunk_size=2)
+                    for row in chunk]
+        self.assertEqual(exported, expected)
+
+
+class ShardedAppTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = create_app({
+            'SHARD_DATABASE_URLS': [f'sqlite:///{db_file}' for db_file in DB_FILES], 'CACHE_ENABLED': False
+        })
+        init_db(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self) -> None:
+        self.app.extensions['inventory_shard_executor'].shutdown()
+        for Session, engine in zip(self.app.extensions['inventory_sessions'], self.app.extensions['inventory_engines']):
+            Session.remove()
+            engine.dispose()
+        for db_file in DB_FILES + [f'{db_file}-{suffix}' for db_file in DB_FILES for suffix in ('wal', 'shm')]:
+            if os.path.exists(db_file):
+                os.remove(db_file)
+
+    def test_routes(self):
+        agreement = self.client.post('/create_purchase_agreement', json={
+            'plant_id': 2, 'vendor_id': 1, 'start': '2023-01-01', 'end': '2024-01-01', 'quantity': 1000
+        }).json
+        order = self.client.post('/create_purchase_order', json={
+            'agreement_id': agreement['agreement_id'], 'order_date': '2023-02-01', 'quantity': 100
+        }).json
+        self.assertEqual(shard_of_id(order['order_id'], 3), 2)
+        self.assertEqual(self.client.post('/get_purchase_order', json={'order_id': order['order_id']}).json, order)
+        listed = self.client.post('/list_purchase_orders', json={'vendor_id': 1}).json
+        self.assertEqual(listed, {'orders': [order], 'next_cursor': None})
+
+
+if __name__ == '__main__':
+    unittest.main()